@@ -20,8 +20,9 @@ import logging
 import os
 
 import requests
-from azure.storage.blob import ContainerClient, BlobProperties
+from azure.storage.blob import BlobProperties
 
+from storage.azure.client_factory import ClientFactory
 from storage.remote_file import RemoteFile
 from storage.storageaccess import StorageAccess
 
@@ -32,14 +33,17 @@ TYPE = 'azure'
 
 class AzureStorageAccess(StorageAccess):
 
+    def __init__(self):
+        super().__init__()
+        self._clients = ClientFactory()
+
     def list_content(self, access_token: str, organization: str, container: str, root_dir_name: str) -> list[
         RemoteFile]:
         logging.debug("list_content - Start")
 
         read_sas = _get_sas_token(access_token, organization, container, "read")
         logger.info("Creating container client...")
-        source_container_client = ContainerClient.from_container_url(
-            f'{_get_storage_url(organization, container)}?{read_sas}')
+        source_container_client = self._clients.container_client(_get_storage_url(organization, container), read_sas)
         logger.info("Creating container client...Done!")
         logger.info("Listing available blobs...")
         blobs = source_container_client.list_blobs(name_starts_with=f'{root_dir_name}/')
@@ -53,8 +57,7 @@ class AzureStorageAccess(StorageAccess):
         logging.debug("upload_file - Start")
 
         write_sas = _get_sas_token(access_token, organization, space, "upload")
-        container_client = ContainerClient.from_container_url(
-            f'{_get_storage_url(organization, "loadingzone")}?{write_sas}')
+        container_client = self._clients.container_client(_get_storage_url(organization, "loadingzone"), write_sas)
 
         path = f'{root_dir_name}/{file_name}'
 
@@ -0,0 +1,107 @@
+#  ****************************************************************************
+#  @copyright 2023 e:fs TechHub GmbH (sdk@efs-techhub.com)
+#
+#  @license Apache v2.0
+#  
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  
+#      http://www.apache.org/licenses/LICENSE-2.0
+#  
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+# -*- coding: utf-8 -*-
+import threading
+from collections import OrderedDict
+
+import requests
+from azure.core.pipeline.transport import RequestsTransport
+from azure.storage.blob import BlobClient, ContainerClient
+
+DEFAULT_POOL_SIZE = 10
+# SAS are renewed periodically - clients of expired SAS are evicted, the least recently used first
+MAX_CONTAINER_CLIENTS = 64
+
+
+class ClientFactory:
+    """
+    Hands out storage-clients that share a single transport, so connections (and TLS-sessions) are reused instead of
+    each client opening its own. Holds one ContainerClient per container-url and SAS (the MAX_CONTAINER_CLIENTS most
+    recently used) - blob-clients are derived from it and share its pipeline.
+    """
+
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE):
+        """
+        Parameters
+        ----------
+        pool_size : int
+            Number of pooled connections per host - should match the number of concurrent requests.
+        """
+        self._session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
+        self._transport = RequestsTransport(session=self._session, session_owner=False)
+        self._container_clients = OrderedDict()
+        self._lock = threading.Lock()
+
+    def container_client(self, container_url: str, sas: str) -> ContainerClient:
+        """
+        Returns the (cached) client of a container.
+
+        Parameters
+        ----------
+        container_url : str
+            Url of the container (without SAS).
+        sas : str
+            Shared Access Token of the container.
+
+        Returns
+        -------
+        ContainerClient
+            The container-client.
+        """
+        key = (container_url, sas)
+        with self._lock:
+            container_client = self._container_clients.get(key)
+            if container_client is not None:
+                self._container_clients.move_to_end(key)
+            else:
+                container_client = ContainerClient.from_container_url(f'{container_url}?{sas}',
+                                                                      transport=self._transport)
+                self._container_clients[key] = container_client
+                if len(self._container_clients) > MAX_CONTAINER_CLIENTS:
+                    # evicted clients stay usable by their holders, as they do not own the transport
+                    self._container_clients.popitem(last=False)
+            return container_client
+
+    def blob_client(self, container_url: str, sas: str, blob_name: str) -> BlobClient:
+        """
+        Returns a client of a blob, that shares the pipeline of its container-client.
+
+        Parameters
+        ----------
+        container_url : str
+            Url of the container (without SAS).
+        sas : str
+            Shared Access Token of the container.
+        blob_name : str
+            The blob-name (not url-encoded).
+
+        Returns
+        -------
+        BlobClient
+            The blob-client.
+        """
+        return self.container_client(container_url, sas).get_blob_client(blob_name)
+
+    def close(self):
+        """
+        Closes all pooled connections.
+        """
+        self._session.close()
@@ -0,0 +1,82 @@
+#  ****************************************************************************
+#  @copyright 2023 e:fs TechHub GmbH (sdk@efs-techhub.com)
+#
+#  @license Apache v2.0
+#  
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  
+#      http://www.apache.org/licenses/LICENSE-2.0
+#  
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+"""
+Memory-benchmark of the serialization of the index-document - compares the peak of traced memory (tracemalloc) of the
+former json.dumps of the complete document with the streamed index_payload, for growing numbers of massdata-objects.
+
+Usage: python benchmarks/payload_benchmark.py [number of objects ...]
+"""
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ingest.index_payload import index_payload  # noqa: E402
+from storage.massdata_object import MassdataList  # noqa: E402
+
+METADATA = {'title': 'benchmark', 'tags': ['a', 'b']}
+DATE_CREATED = datetime(2024, 1, 2, tzinfo=timezone.utc)
+
+
+def massdata_list(count: int) -> MassdataList:
+    massdata = MassdataList()
+    for i in range(count):
+        massdata.append(f'file{i}.bin', f'dataset/raw/file{i}.bin', DATE_CREATED, i)
+    return massdata
+
+
+def run_dumps(massdata: MassdataList) -> int:
+    index_dto = {'docid': 'docid', 'massdata': [obj.to_dict() for obj in massdata], 'metadata': METADATA,
+                 'organization': 'org', 'space': 'space', 'rootdir': 'dataset'}
+    return len(json.dumps(index_dto).encode())
+
+
+def run_streamed(massdata: MassdataList) -> int:
+    return sum(len(chunk) for chunk in index_payload('docid', METADATA, massdata, 'org', 'space', 'dataset'))
+
+
+def measure(function, massdata: MassdataList) -> tuple:
+    """
+    :return: tuple of size of the document in bytes, peak of traced memory in bytes and seconds
+    """
+    tracemalloc.start()
+    started_at = time.perf_counter()
+    size = function(massdata)
+    duration = time.perf_counter() - started_at
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return size, peak, duration
+
+
+def main(counts: list):
+    print(f'{"objects":>9} {"document":>12} {"json.dumps":>19} {"streamed":>17}')
+    for count in counts:
+        massdata = massdata_list(count)
+        size, dumps_peak, dumps_duration = measure(run_dumps, massdata)
+        streamed_size, streamed_peak, streamed_duration = measure(run_streamed, massdata)
+        assert size == streamed_size
+        print(f'{count:9d} {size / 2 ** 20:8.1f} MiB {dumps_peak / 2 ** 20:8.1f} MiB {dumps_duration:5.2f}s '
+              f'{streamed_peak / 2 ** 20:6.2f} MiB {streamed_duration:5.2f}s')
+
+
+if __name__ == '__main__':
+    main([int(count) for count in sys.argv[1:]] or [10_000, 100_000, 1_000_000])
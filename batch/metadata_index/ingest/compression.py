@@ -0,0 +1,141 @@
+#  ****************************************************************************
+#  @copyright 2023 e:fs TechHub GmbH (sdk@efs-techhub.com)
+#
+#  @license Apache v2.0
+#  
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  
+#      http://www.apache.org/licenses/LICENSE-2.0
+#  
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+import time
+import zlib
+from typing import Iterator, Optional, Union
+
+import zstandard
+
+GZIP = 'gzip'
+ZSTD = 'zstd'
+ENCODINGS = (GZIP, ZSTD)
+UNCOMPRESSED = ('', 'none', 'identity')
+
+DEFAULT_THRESHOLD = 64 * 1024  # bodies smaller than this are sent uncompressed
+GZIP_LEVEL = 1  # index-documents compress well already at the fastest levels
+ZSTD_LEVEL = 3
+
+
+def parse_encoding(value: Optional[str]) -> Optional[str]:
+    """
+    Normalises a configured content-encoding - case and surrounding whitespace are ignored
+
+    Parameters
+    ----------
+    value : str
+        The configured content-encoding - empty, 'none' or 'identity' (or None) for uncompressed bodies.
+
+    Returns
+    -------
+    Optional[str]
+        One of ENCODINGS - None if bodies are sent uncompressed.
+
+    Raises
+    ------
+    ValueError
+        If the content-encoding is not supported.
+    """
+    if value is None:
+        return None
+    encoding = value.strip().lower()
+    if encoding in UNCOMPRESSED:
+        return None
+    if encoding not in ENCODINGS:
+        raise ValueError(f'unknown content-encoding {value} - one of {", ".join(ENCODINGS)}')
+    return encoding
+
+
+class CompressedBody:
+    def __init__(self, chunks: Iterator[bytes], encoding: str = None, threshold: int = DEFAULT_THRESHOLD):
+        """
+        Request-body, compressed with gzip or zstd if it reaches the threshold - the chunks are buffered until the
+        threshold is reached, so small bodies are sent as they are (with Content-Length), larger ones are compressed
+        while they are streamed
+
+        Parameters
+        ----------
+        chunks : Iterator[bytes]
+            The chunks of the body.
+        encoding : str
+            The content-encoding - one of ENCODINGS (None to send the body uncompressed).
+        threshold : int
+            The size in bytes from which the body is compressed.
+        """
+        if encoding is not None and encoding not in ENCODINGS:
+            raise ValueError(f'unknown content-encoding {encoding} - one of {", ".join(ENCODINGS)}')
+        self._chunks = iter(chunks)
+        self._buffered = []
+        self.raw_size = 0
+        self.compressed_size = 0
+        self.duration = 0.0
+        if encoding is not None:
+            for chunk in self._chunks:
+                self._buffered.append(chunk)
+                self.raw_size += len(chunk)
+                if self.raw_size >= threshold:
+                    break
+            else:
+                encoding = None
+        self.content_encoding = encoding
+
+    @property
+    def data(self) -> Union[bytes, Iterator[bytes]]:
+        """
+        The body to send - bytes if the body is not compressed (the chunks are only iterated if it is compressed)
+        """
+        if self.content_encoding is None:
+            if self._buffered:
+                return b''.join(self._buffered)
+            return self._uncompressed()
+        return self._compressed()
+
+    @property
+    def ratio(self) -> float:
+        """
+        Ratio of uncompressed to compressed size (only complete after the body has been sent)
+        """
+        return self.raw_size / max(self.compressed_size, 1)
+
+    def _uncompressed(self) -> Iterator[bytes]:
+        for chunk in self._chunks:
+            self.raw_size += len(chunk)
+            yield chunk
+
+    def _compressed(self) -> Iterator[bytes]:
+        if self.content_encoding == GZIP:
+            compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        else:
+            compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+        for chunk in self._buffered:
+            compressed = self._compress(compressor.compress, chunk)
+            if compressed:
+                yield compressed
+        self._buffered = []
+        for chunk in self._chunks:
+            self.raw_size += len(chunk)
+            compressed = self._compress(compressor.compress, chunk)
+            if compressed:
+                yield compressed
+        yield self._compress(compressor.flush)
+
+    def _compress(self, function, *args) -> bytes:
+        started_at = time.monotonic()
+        compressed = function(*args)
+        self.duration += time.monotonic() - started_at
+        self.compressed_size += len(compressed)
+        return compressed
@@ -0,0 +1,67 @@
+#  ****************************************************************************
+#  @copyright 2023 e:fs TechHub GmbH (sdk@efs-techhub.com)
+#
+#  @license Apache v2.0
+#  
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  
+#      http://www.apache.org/licenses/LICENSE-2.0
+#  
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+import json
+from itertools import islice
+from typing import Iterator
+
+from storage.massdata_object import MassdataList
+
+BATCH_SIZE = 1000  # number of massdata-objects serialized per chunk
+
+
+def index_payload(docid: str, metadata: dict, massdata: MassdataList, organization: str, space: str,
+                  root_dir: str, batch_size: int = BATCH_SIZE) -> Iterator[bytes]:
+    """
+    Serializes the index-document of a dataset as a stream of JSON-chunks, so it can be sent with chunked
+    transfer-encoding without materializing the massdata-list (neither as dicts nor as a single string) - the joined
+    chunks are equal to json.dumps of the document
+
+    Parameters
+    ----------
+    docid : str
+        The document-id.
+    metadata : dict
+        The parsed meta.json.
+    massdata : MassdataList
+        The massdata-objects of the dataset.
+    organization : str
+        The organization.
+    space : str
+        The space.
+    root_dir : str
+        The root directory of the dataset.
+    batch_size : int
+        The number of massdata-objects per chunk.
+
+    Returns
+    -------
+    Iterator[bytes]
+        The chunks of the document.
+    """
+    yield f'{{"docid": {json.dumps(docid)}, "massdata": ['.encode()
+    objects = massdata.iter_dicts()
+    separator = ''
+    while True:
+        batch = list(islice(objects, batch_size))
+        if not batch:
+            break
+        # strip the brackets of the serialized batch
+        yield (separator + json.dumps(batch)[1:-1]).encode()
+        separator = ', '
+    yield (f'], "metadata": {json.dumps(metadata)}, "organization": {json.dumps(organization)}, '
+           f'"space": {json.dumps(space)}, "rootdir": {json.dumps(root_dir)}}}').encode()
@@ -15,9 +15,6 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 #  ****************************************************************************
-import json
-
-
 class IngestStatus:
     def __init__(self, organization=None, space=None, rootdir=None, userid=None, docid=None):
         self._organization = organization
@@ -76,8 +73,6 @@ class IngestStatus:
         }
 
     @classmethod
-    def load_from_json(cls, local_path: str):
-        with open(local_path, 'r') as f:
-            data = json.load(f)
+    def from_dict(cls, data: dict):
         return cls(organization=data['organization'], space=data['space'], rootdir=data['rootdir'].rstrip('/'),
-                            userid=data['userid'], docid=data['docid'])
+                   userid=data['userid'], docid=data['docid'])
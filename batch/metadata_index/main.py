@@ -22,18 +22,29 @@ import json
 import logging
 import os.path
 import re
+import threading
+import time
 import urllib
 import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
 import jwt
 import requests
 
+from ingest.compression import DEFAULT_THRESHOLD, CompressedBody, parse_encoding
+from ingest.index_payload import index_payload
 from ingest.ingeststatus import IngestStatus
 from storage.azure import azure_storageaccess as azure
 from storage.s3 import s3_storageaccess as s3
 from storage.storageaccess import StorageAccess
 
 ENV_STORAGE_TYPE = 'STORAGE_TYPE'
+ENV_WORKERS = 'INDEX_WORKERS'
+ENV_COMPRESSION = 'INDEX_COMPRESSION'
+ENV_COMPRESSION_THRESHOLD = 'INDEX_COMPRESSION_THRESHOLD'
+
+DEFAULT_WORKERS = 8
+TOKEN_RENEWAL_MARGIN = 60  # seconds before expiry the access-token is renewed
 
 
 def get_service_account_access_token(token_uri: str, client_id: str, client_secret: str):
@@ -128,48 +139,158 @@ def get_payload(payload: str):
     return payload
 
 
-def index(storage_access: StorageAccess, access_token: str, payload: dict) -> str:
+class UserContextToken:
+    def __init__(self, token_uri: str, user_name: str, client_id: str, client_secret: str):
+        """
+        Access-token in user context, that is renewed shortly before it expires - a backfill may take longer than the
+        lifetime of a single token
+        :param token_uri: token-uri
+        :param user_name: the user the token is requested for
+        :param client_id: client-id of confidential client
+        :param client_secret: client-secret of confidential client
+        """
+        self._token_uri = token_uri
+        self._user_name = user_name
+        self._client_id = client_id
+        self._client_secret = client_secret
+        self._lock = threading.Lock()
+        self._access_token = None
+        self._renew_at = 0
+
+    def get(self) -> str:
+        """
+        Returns the current access-token - renews it if it is about to expire
+        :return: access-token
+        """
+        with self._lock:
+            if self._access_token is None or time.monotonic() >= self._renew_at:
+                _, service_token = get_service_account_access_token(self._token_uri, self._client_id,
+                                                                    self._client_secret)
+                expires_in, self._access_token = get_user_context_token(self._token_uri, self._user_name,
+                                                                        self._client_id, self._client_secret,
+                                                                        service_token)
+                self._renew_at = time.monotonic() + max(int(expires_in) - TOKEN_RENEWAL_MARGIN, 0)
+            return self._access_token
+
+
+def index(storage_access: StorageAccess, access_token: str, payload: dict, session: requests.Session = None) -> str:
     # Extract organization, space and root_dir from the payload
     organization = payload['accountName']
     space = payload['storageName']
     root_dir = payload['rootDir'].rstrip('/')
 
-    dataset = storage_access.get_dataset(organization, space, root_dir, access_token)
-    with open(dataset.meta_json, 'r') as f:
-        data = f.read().encode('utf-8')
+    with storage_access.get_dataset(organization, space, root_dir, access_token) as dataset:
+        metadata = json.load(dataset.meta_json)
 
     # dataset might have ingest.json -> cleanup
     docid = str(uuid.uuid1())
-    index_dto = {
-        "docid": docid,
-        "massdata": [obj.to_dict() for obj in dataset.massdata],
-        "metadata": json.loads(data),
-        "organization": organization,
-        "space": space,
-        "rootdir": root_dir
-    }
+    if dataset.ingest_state is not None and dataset.ingest_state.docid is not None:
+        docid = dataset.ingest_state.docid
+        update = True
+    else:
+        update = False
 
     headers = {
         'Authorization': f'Bearer {access_token}',
         'Content-Type': 'application/json'
     }
-
-    if dataset.ingest_state is not None:
-        ingest_status = IngestStatus.load_from_json(dataset.ingest_state)
-        if ingest_status.docid is not None:
-            index_dto['docid'] = ingest_status.docid
-
-    if index_dto['docid'] != docid:  # index is read from ingest.json -> update
-        url = f'{os.environ["INDEXER_URL"]}/metadata/v1.0/index?organization={organization}&space={space}&docid={index_dto["docid"]}'
-        response = requests.put(url, headers=headers, data=json.dumps(index_dto))
+    # the document is streamed with chunked transfer-encoding - the massdata-list may hold millions of objects
+    document = CompressedBody(index_payload(docid, metadata, dataset.massdata, organization, space, root_dir),
+                              encoding=parse_encoding(os.getenv(ENV_COMPRESSION)),
+                              threshold=int(os.getenv(ENV_COMPRESSION_THRESHOLD, DEFAULT_THRESHOLD)))
+    if document.content_encoding is not None:
+        headers['Content-Encoding'] = document.content_encoding
+
+    http = session or requests
+    if update:  # index is read from ingest.json -> update
+        url = f'{os.environ["INDEXER_URL"]}/metadata/v1.0/index?organization={organization}&space={space}&docid={docid}'
+        response = http.put(url, headers=headers, data=document.data)
     else:  # create
         url = f'{os.environ["INDEXER_URL"]}/metadata/v1.0/index'
-        response = requests.post(url, headers=headers, data=json.dumps(index_dto))
+        response = http.post(url, headers=headers, data=document.data)
 
     response.raise_for_status()
 
+    if document.content_encoding is not None:
+        logger.info(f'sent index-document {document.content_encoding}-compressed: {document.raw_size} -> '
+                    f'{document.compressed_size} bytes (ratio {document.ratio:.1f}) in {document.duration * 1000:.0f} ms')
     logger.info('dataset indexed!')
-    return index_dto['docid']
+    return docid
+
+
+def index_dataset(storage_access: StorageAccess, access_token: str, payload: dict,
+                  session: requests.Session = None) -> str:
+    """
+    Indexes a dataset and stores the document-id in its ingest.json
+    :param storage_access: the storage-access-instance
+    :param access_token: access-token in user context
+    :param payload: the payload - accountName, storageName and rootDir
+    :param session: session to send the index-request with (optional)
+    :return: the document-id
+    """
+    organization = payload['accountName']
+    space = payload['storageName']
+    root_dir = payload['rootDir'].rstrip('/')
+
+    docid = index(storage_access, access_token, payload, session)
+    decoded = jwt.decode(access_token, options={
+        "verify_signature": False
+    })
+    user_id = decoded['sub']
+
+    state = IngestStatus(organization=organization, space=space, rootdir=root_dir, userid=user_id, docid=docid)
+    storage_access.store_status(access_token, organization, space, root_dir, state)
+    return docid
+
+
+def backfill(storage_access: StorageAccess, access_token: UserContextToken, organization: str, space: str,
+             workers: int = DEFAULT_WORKERS) -> tuple:
+    """
+    (Re-)indexes all datasets of a space - datasets are indexed concurrently, while the space is still being enumerated
+    :param storage_access: the storage-access-instance
+    :param access_token: access-token in user context
+    :param organization: the organization
+    :param space: the space
+    :param workers: number of datasets indexed concurrently
+    :return: number of indexed and failed datasets
+    """
+    # all index-requests share one pool of connections
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+    started_at = time.monotonic()
+    indexed = 0
+    failures = {}
+    in_flight = {}
+
+    def _collect(done):
+        nonlocal indexed
+        for future in done:
+            root_dir = in_flight.pop(future)
+            if future.exception() is not None:
+                logger.error(f'indexing {root_dir} failed: {future.exception()}')
+                failures[root_dir] = future.exception()
+            else:
+                indexed += 1
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for root_dir in storage_access.list_datasets(organization, space, access_token.get()):
+            # datasets are enumerated lazily - only a bounded number of them is queued
+            if len(in_flight) >= 2 * workers:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                _collect(done)
+            payload = {'accountName': organization, 'storageName': space, 'rootDir': root_dir}
+            in_flight[executor.submit(index_dataset, storage_access, access_token.get(), payload, session)] = root_dir
+        done, _ = wait(in_flight)
+        _collect(done)
+    session.close()
+
+    duration = time.monotonic() - started_at
+    logger.info(f'backfilled {indexed} datasets of {organization}/{space} in {duration:.1f}s '
+                f'({indexed / max(duration, 1e-9):.2f} datasets/s) - {len(failures)} failed')
+    return indexed, len(failures)
 
 
 def get_env(env_var_name: str):
@@ -223,16 +344,33 @@ if __name__ == '__main__':
         description='Script that analyses the Excels and stores the result in elasticsearch', )
 
     # Parameters are provided by the Workflow engine
-    parser.add_argument('--payload', '-p', dest='payload', type=str, required=True)
+    parser.add_argument('--payload', '-p', dest='payload', type=str, required=False)
+    parser.add_argument('--backfill', dest='backfill', action='store_true',
+                        help='(re-)index all datasets of a space instead of the dataset of the payload')
+    parser.add_argument('--organization', dest='organization', type=str, required=False,
+                        help='organization to backfill')
+    parser.add_argument('--space', dest='space', type=str, required=False, help='space to backfill')
+    parser.add_argument('--user', dest='user', type=str, required=False,
+                        help='user to backfill as (default: $<ORGANIZATION>.USERNAME or $USERNAME)')
+    parser.add_argument('--workers', '-w', dest='workers', type=int, required=False,
+                        help=f'number of datasets indexed concurrently when backfilling '
+                             f'(default: ${ENV_WORKERS} or {DEFAULT_WORKERS})')
 
     args = parser.parse_args()
-    if not args.payload:
-        raise Exception('no payload provided')
+    if args.backfill:
+        if not args.organization or not args.space:
+            raise Exception('--organization and --space must be provided for backfill')
+        payload = {'accountName': args.organization, 'storageName': args.space, 'userName': args.user}
+    else:
+        if not args.payload:
+            raise Exception('no payload provided')
 
-    origin = get_payload(args.payload)
-    payload = extract_notification(origin)
+        origin = get_payload(args.payload)
+        payload = extract_notification(origin)
 
     organization = payload['accountName']
+    # fail before indexing anything if the compression is misconfigured
+    parse_encoding(os.getenv(ENV_COMPRESSION))
 
     client_id = get_env('CLIENT_ID')
     client_secret = get_env('CLIENT_SECRET')
@@ -242,20 +380,16 @@ if __name__ == '__main__':
 
     logger.info(payload)
 
-    _, auth_header_service_connection = get_service_account_access_token(token_uri, client_id, client_secret)
-
     user_name = get_user(payload)
-    _, auth_header_user_context = get_user_context_token(token_uri, user_name, client_id, client_secret,
-                                                         auth_header_service_connection)
+    if not user_name:
+        raise Exception('no user provided - either provide --user or "USERNAME"')
+    user_context_token = UserContextToken(token_uri, user_name, client_id, client_secret)
 
     storage_access = _get_storage_access()
-    docid = index(storage_access, auth_header_user_context, payload)
-    decoded = jwt.decode(auth_header_user_context, options={
-        "verify_signature": False
-    })
-    user_id = decoded['sub']
-    space = payload['storageName']
-    root_dir = payload['rootDir'].rstrip('/')
-
-    state = IngestStatus(organization=organization, space=space, rootdir=root_dir, userid=user_id, docid=docid)
-    storage_access.store_status(auth_header_user_context, organization, space, root_dir, state)
+    if args.backfill:
+        workers = args.workers or int(os.environ.get(ENV_WORKERS, DEFAULT_WORKERS))
+        _, failed = backfill(storage_access, user_context_token, organization, payload['storageName'], workers)
+        if failed:
+            raise Exception(f'{failed} datasets could not be indexed')
+    else:
+        index_dataset(storage_access, user_context_token.get(), payload)
@@ -16,105 +16,243 @@
 #  limitations under the License.
 #  ****************************************************************************
 # -*- coding: utf-8 -*-
+import json
 import logging
 import os
-import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import BinaryIO, Callable, Iterator, Optional
 
 import requests
-from azure.storage.blob import BlobClient, ContainerClient, BlobProperties
+from azure.storage.blob import BlobClient, BlobPrefix
 
-from storage.dataset import DataSet
-from storage.massdata_object import MassdataObject
+from ingest.ingeststatus import IngestStatus
+from storage.azure.client_factory import ClientFactory
+from storage.dataset import DataSet, spooled_buffer
+from storage.massdata_object import MassdataList
 from storage.storageaccess import StorageAccess
 
 logger = logging.getLogger(__name__)
 
 TYPE = 'azure'
 
+SAS_PREFETCH_WORKERS = 2
+SAS_TOKEN_TTL = 300  # seconds a SAS-token is reused, before it is requested again
+LIST_DATASETS_WORKERS = 8
+
 
 class AzureStorageAccess(StorageAccess):
 
     def __init__(self):
         super().__init__()
+        self._clients = ClientFactory()
+        # SAS-tokens are requested in the background while other requests are running
+        self._sas_executor = ThreadPoolExecutor(max_workers=SAS_PREFETCH_WORKERS, thread_name_prefix='sas')
+        self._sas_tokens = {}  # (access_token, organization, space, reqtype) -> (future, expiry)
+        self._sas_lock = threading.Lock()
 
     def get_dataset(self, organization: str, space: str, root_dir_name: str, access_token: str) -> DataSet:
-        read_sas = _get_sas_token(access_token, organization, space, "read")
+        started_at = time.monotonic()
+        # the upload-token is needed to store the status afterwards - it is requested while listing
+        self._prefetch_sas_token(access_token, organization, space, "upload/main")
+        read_sas = self._get_sas_token(access_token, organization, space, "read")
         logger.debug("Creating container client...")
-        source_container_client = ContainerClient.from_container_url(
-            f'{_get_storage_url(organization, space)}?{read_sas}')
+        source_container_client = self._clients.container_client(_get_storage_url(organization, space), read_sas)
         logger.debug("Creating container client...Done!")
         logger.debug("Listing available blobs...")
 
         my_blobs = source_container_client.list_blobs(name_starts_with=f'{root_dir_name}/')
-        dataset = list(my_blobs)
 
-        logger.debug("Listing available blobs...Done!")
-        # create temporal directory
-        logger.debug("Creating temp directory...")
-        temp_dir = tempfile.mkdtemp()
-        logger.debug("Creating temp directory...Done!")
+        # the listing is consumed as it is paged in - only the massdata-objects are kept, in a compact form
+        dedup_manifest = f'{root_dir_name}/{self.DEDUP_MANIFEST}'
+        massdata = MassdataList()
+        meta_jsons = []
+        ingest_jsons = []
+        dedup_manifest_file = None
+        listed = 0
+        for file in my_blobs:
+            listed += 1
+            if file.name.endswith('/meta.json'):
+                meta_jsons.append(file)
+            elif file.name.endswith(f'/{self.INGEST_STATUS_FILE}'):
+                ingest_jsons.append(file.name)
+            elif file.name == dedup_manifest:
+                dedup_manifest_file = file
+            else:
+                massdata.append(name=file.name.split('/')[-1], location=file.name, date_created=file.creation_time,
+                                size=file.size)
 
-        massdata = [file for file in dataset if
-                    not file.name.endswith('/meta.json') and not file.name.endswith(f'/{self.INGEST_STATUS_FILE}')]
+        logger.debug("Listing available blobs...Done!")
+        listed_at = time.monotonic()
 
         # handle meta.json
-        meta_jsons = [file for file in dataset if file.name.endswith('/meta.json')]
         if len(meta_jsons) < 1:
             raise FileNotFoundError('no meta.json found!')
 
         meta_json = meta_jsons[0]
         logger.info(f"Checking file {meta_json.name}...")
 
-        # download meta.json
-        src_blob_client = BlobClient.from_blob_url(
-            f'{_get_storage_url(organization, space)}/{meta_json.name}?{read_sas}')
-        local_meta_json = self._download_file(meta_json, src_blob_client, temp_dir)
-
         # handle ingest.json
-        ingest_jsons = [file for file in dataset if file.name.endswith(f'/{self.INGEST_STATUS_FILE}')]
-        local_ingest_json = None
         if len(ingest_jsons) > 1:  # multiple ingest.jsom found -> error
             raise ValueError(f'Unexpected directory structure: multiple {self.INGEST_STATUS_FILE} files found')
         if len(ingest_jsons) > 0:
-            ingest_json = ingest_jsons[0]
-
-            # download ingest.json
-            src_blob_client = BlobClient.from_blob_url(
-                f'{_get_storage_url(organization, space)}/{ingest_json.name}?{read_sas}')
-            local_ingest_json = self._download_file(ingest_json, src_blob_client, temp_dir)
+            # the existing ingest.json has to be deleted before the status is stored
+            self._prefetch_sas_token(access_token, organization, space, "delete")
+
+        # download meta.json, ingest.json and references of deduplicated blobs concurrently - within one round trip
+        container_url = _get_storage_url(organization, space)
+        with ThreadPoolExecutor(max_workers=3, thread_name_prefix='download') as executor:
+            # meta.json is downloaded into a buffer that is only spilled to disk if meta.json is large
+            meta_json_future = executor.submit(_timed, self._download_file, meta_json,
+                                               self._clients.blob_client(container_url, read_sas, meta_json.name))
+            # ingest.json is small enough to be parsed right away
+            ingest_json_future = executor.submit(_timed, _download_json, ingest_jsons[0], self._clients.blob_client(
+                container_url, read_sas, ingest_jsons[0])) if ingest_jsons else None
+            # blobs deduplicated by move_data are part of the dataset, but stored under another location
+            manifest_future = executor.submit(_timed, self._download_manifest, self._clients.blob_client(
+                container_url, read_sas, dedup_manifest)) if dedup_manifest_file is not None else None
+        futures = [future for future in [meta_json_future, ingest_json_future, manifest_future] if future is not None]
+        errors = [future.exception() for future in futures if future.exception() is not None]
+        if errors:
+            if meta_json_future.exception() is None:
+                meta_json_future.result()[0].close()
+            raise errors[0]
+        downloaded_at = time.monotonic()
+
+        meta_json_buffer, _ = meta_json_future.result()
+        ingest_state = IngestStatus.from_dict(ingest_json_future.result()[0]) if ingest_json_future else None
+        if manifest_future is not None and manifest_future.result()[0] is None:
+            # a file of the user at the reserved location
+            massdata.append(name=dedup_manifest_file.name.split('/')[-1], location=dedup_manifest_file.name,
+                            date_created=dedup_manifest_file.creation_time, size=dedup_manifest_file.size)
+        elif manifest_future is not None:
+            for reference in manifest_future.result()[0]['references']:
+                massdata.append(name=reference['name'].split('/')[-1], location=reference['target'],
+                                date_created=datetime.fromisoformat(reference['dateCreated']), size=reference['size'])
+
+        sequential = sum(future.result()[1] for future in futures)
+        logger.info(f'fetched dataset {root_dir_name} in {_ms(downloaded_at - started_at)} ms - listing '
+                    f'{listed} blobs: {_ms(listed_at - started_at)} ms, downloading {len(futures)} files: '
+                    f'{_ms(downloaded_at - listed_at)} ms (sequentially: {_ms(sequential)} ms)')
+        return DataSet(meta_json=meta_json_buffer, ingest_state=ingest_state, massdata=massdata)
+
+    def _download_manifest(self, blob_client: BlobClient) -> Optional[dict]:
+        """
+        Downloads the manifest of deduplicated blobs
 
-        return DataSet(meta_json=local_meta_json, ingest_state=local_ingest_json,
-                       massdata=[_massdata_object(blob) for blob in massdata])
+        Parameters
+        ----------
+        blob_client : BlobClient
+            Client of the manifest.
 
-    def _download_file(self, file, src_blob_client, temp_dir):
+        Returns
+        -------
+        Optional[dict]
+            The parsed manifest - None if the file is no manifest (schema does not match).
+        """
+        try:
+            manifest = _download_json(blob_client.blob_name, blob_client)
+        except ValueError:
+            manifest = None
+        if not isinstance(manifest, dict) or manifest.get('schema') != self.DEDUP_MANIFEST_SCHEMA \
+                or not isinstance(manifest.get('references'), list):
+            logger.info(f'{blob_client.blob_name} is no manifest of deduplicated blobs - indexing it as massdata')
+            return None
+        return manifest
+
+    def list_datasets(self, organization: str, space: str, access_token: str) -> Iterator[str]:
+        read_sas = self._get_sas_token(access_token, organization, space, "read")
+        container_client = self._clients.container_client(_get_storage_url(organization, space), read_sas)
+        # walk the directories level by level (directories are listed concurrently) - the contents of a dataset are
+        # not listed beyond its root directory
+        with ThreadPoolExecutor(max_workers=LIST_DATASETS_WORKERS, thread_name_prefix='walk') as executor:
+            pending = {executor.submit(_walk_directory, container_client, '')}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    root_dir, directories = future.result()
+                    if root_dir is not None:
+                        yield root_dir
+                    pending.update(executor.submit(_walk_directory, container_client, directory)
+                                   for directory in directories)
+
+    def _download_file(self, file, src_blob_client) -> BinaryIO:
         logger.info(f'Download {file.name}...')
-        filename = file.name.replace("/", "_")
-        local_file = os.path.join(temp_dir, filename)
-        with open(local_file, "wb") as f:
-            data = src_blob_client.download_blob()
-            data.readinto(f)
-            f.close()
+        buffer = spooled_buffer()
+        try:
+            src_blob_client.download_blob().readinto(buffer)
+        except Exception:
+            buffer.close()
+            raise
+        buffer.seek(0)
 
         logger.info(f'Download {file.name}...Done!')
-        return local_file
+        return buffer
 
-    def upload_status(self, access_token: str, organization: str, space: str, root_dir: str, local_file: str):
+    def _prefetch_sas_token(self, access_token: str, organization: str, space: str, reqtype: str) -> Future:
+        """
+        Requests a SAS-token in the background - each token is reused for SAS_TOKEN_TTL seconds, failed requests are
+        not cached
+
+        Parameters
+        ----------
+        access_token : str
+            The access token.
+        organization : str
+            Organization the token shall be created for.
+        space : str
+            The space the token shall be created for.
+        reqtype : str
+            Type of request. read|upload|delete
+
+        Returns
+        -------
+        Future
+            Future of the SAS token.
+        """
+        key = (access_token, organization, space, reqtype)
+        now = time.monotonic()
+        with self._sas_lock:
+            cached = self._sas_tokens.get(key)
+            if cached is not None and cached[1] > now and not _failed(cached[0]):
+                return cached[0]
+            # expired tokens (e.g. of renewed access-tokens) are dropped, so the cache does not grow during a backfill
+            for expired in [k for k, (_, expiry) in self._sas_tokens.items() if expiry <= now]:
+                del self._sas_tokens[expired]
+            future = self._sas_executor.submit(_get_sas_token, *key)
+            self._sas_tokens[key] = (future, now + SAS_TOKEN_TTL)
+            return future
+
+    def _get_sas_token(self, access_token: str, organization: str, space: str, reqtype: str) -> str:
+        try:
+            return self._prefetch_sas_token(access_token, organization, space, reqtype).result()
+        except requests.RequestException as e:
+            # the failed request has been evicted by now - a transient error of the accessmanager is retried once
+            logger.warning(f'getting shared access signature failed ({e}) - retrying')
+            return self._prefetch_sas_token(access_token, organization, space, reqtype).result()
+
+    def upload_status(self, access_token: str, organization: str, space: str, root_dir: str, data: bytes):
         """
         Updates
         """
-        write_sas = _get_sas_token(access_token, organization, space, "upload/main")
+        write_sas = self._get_sas_token(access_token, organization, space, "upload/main")
         prefix = '' if root_dir == '' else root_dir + '/'
-        blob_path = prefix + os.path.basename(local_file)
-        container_client = ContainerClient.from_container_url(f'{_get_storage_url(organization, space)}?{write_sas}')
+        blob_path = prefix + self.INGEST_STATUS_FILE
+        container_client = self._clients.container_client(_get_storage_url(organization, space), write_sas)
         # delete ingest.json if already exists
         ingest_blobs = container_client.list_blobs(name_starts_with=blob_path)
         ingest_blobs_list = list(ingest_blobs)
         if len(ingest_blobs_list) > 0: # -> only 1
-            delete_sas = _get_sas_token(access_token, organization, space, "delete")
-            blob_client = BlobClient.from_blob_url(f'{_get_storage_url(organization, space)}/{blob_path}?{delete_sas}')
+            delete_sas = self._get_sas_token(access_token, organization, space, "delete")
+            blob_client = self._clients.blob_client(_get_storage_url(organization, space), delete_sas, blob_path)
             blob_client.delete_blob()
-        with open(local_file, 'rb') as data:
-            container_client.upload_blob(name=blob_path, data=data, validate_content=True)
+        container_client.upload_blob(name=blob_path, data=data, validate_content=True)
+
+
+def _failed(future: Future) -> bool:
+    return future.done() and future.exception() is not None
 
 
 def _get_sas_token(access_token: str, organization: str, space: str, reqtype: str):
@@ -167,6 +305,53 @@ def _get_storage_url(account: str, container: str):
     return f'https://{account}.blob.core.windows.net/{container}'
 
 
-def _massdata_object(blob: BlobProperties) -> MassdataObject:
-    return MassdataObject(name=blob.name.split('/')[-1], location=blob.name, date_created=blob.creation_time,
-                          size=blob.size)
+def _walk_directory(container_client, prefix: str) -> tuple:
+    """
+    Lists a single directory (non-recursive)
+
+    Parameters
+    ----------
+    container_client : ContainerClient
+        Client of the container.
+    prefix : str
+        The directory, ending with '/' (empty for the root of the container).
+
+    Returns
+    -------
+    tuple
+        The directory without trailing '/' if it is the root directory of a dataset (None otherwise), and its
+        sub-directories (empty for datasets).
+    """
+    directories = []
+    for item in container_client.walk_blobs(name_starts_with=prefix, delimiter='/'):
+        if isinstance(item, BlobPrefix):
+            directories.append(item.name)
+        elif prefix and item.name == f'{prefix}meta.json':
+            # remaining pages of the dataset's root directory are not needed
+            return prefix.rstrip('/'), []
+    return None, directories
+
+
+def _download_json(blob_name: str, blob_client: BlobClient):
+    logger.info(f'Download {blob_name}...')
+    data = json.loads(blob_client.download_blob().readall())
+    logger.info(f'Download {blob_name}...Done!')
+    return data
+
+
+def _timed(function: Callable, *args) -> tuple:
+    """
+    Calls a function and measures its duration
+
+    Returns
+    -------
+    tuple
+        The result of the function and its duration in seconds.
+    """
+    started_at = time.monotonic()
+    result = function(*args)
+    return result, time.monotonic() - started_at
+
+
+def _ms(seconds: float) -> int:
+    return round(seconds * 1000)
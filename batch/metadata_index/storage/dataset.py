@@ -15,23 +15,68 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 #  ****************************************************************************
-from storage.massdata_object import MassdataObject
+import tempfile
+from typing import BinaryIO
+
+from ingest.ingeststatus import IngestStatus
+from storage.massdata_object import MassdataList
+
+SPOOL_MAX_SIZE = 16 * 1024 * 1024  # files of a dataset are kept in memory up to this size, spilled to disk above
+
+
+def spooled_buffer() -> BinaryIO:
+    """
+    Creates a buffer for a file of a dataset, that is kept in memory unless it exceeds SPOOL_MAX_SIZE - spilled files
+    are removed as soon as the buffer is closed
+
+    Returns
+    -------
+    BinaryIO
+        The buffer.
+    """
+    return tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
 
 
 class DataSet:
-    def __init__(self, meta_json=None, ingest_state=None, massdata=None):
+    def __init__(self, meta_json: BinaryIO = None, ingest_state: IngestStatus = None,
+                 massdata: MassdataList = None):
+        """
+        Contents of a dataset - has to be closed after use
+
+        Parameters
+        ----------
+        meta_json : BinaryIO
+            Buffer holding the content of meta.json, positioned at its start.
+        ingest_state : IngestStatus
+            The parsed ingest.json (None if the dataset has not been indexed yet).
+        massdata : MassdataList
+            The massdata-objects of the dataset.
+        """
         self._meta_json = meta_json
         self._ingest_state = ingest_state
         self._massdata = massdata
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """
+        Releases the buffers of the dataset
+        """
+        if self._meta_json is not None:
+            self._meta_json.close()
+
     @property
-    def meta_json(self) -> str:
+    def meta_json(self) -> BinaryIO:
         return self._meta_json
 
     @property
-    def ingest_state(self) -> str:
+    def ingest_state(self) -> IngestStatus:
         return self._ingest_state
 
     @property
-    def massdata(self) -> list[MassdataObject]:
+    def massdata(self) -> MassdataList:
         return self._massdata
@@ -15,10 +15,16 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 #  ****************************************************************************
+from array import array
 from datetime import datetime
+from typing import Iterator
+
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%S%z"
 
 
 class MassdataObject:
+    __slots__ = ('_name', '_date_created', '_location', '_size')
+
     def __init__(self, name: str, location: str, date_created: datetime, size: int):
         self._name = name
         self._date_created = date_created
@@ -42,5 +48,91 @@ class MassdataObject:
         return self._size
 
     def to_dict(self):
-        return {'name': self._name, 'dateCreated': self._date_created.strftime("%Y-%m-%dT%H:%M:%S%z"), 'location': self._location,
+        return {'name': self._name, 'dateCreated': self._date_created.strftime(DATE_FORMAT), 'location': self._location,
                 'size': self._size}
+
+
+class MassdataList:
+    def __init__(self):
+        """
+        Column-oriented container of the massdata-objects of a dataset - datasets may consist of millions of blobs.
+        Locations are split into an interned directory and the basename, dates are stored once per distinct value and
+        formatted once, so a massdata-object costs little more than its basename
+        """
+        self._directories = []
+        self._directory_ids = {}
+        self._dates = []
+        self._formatted_dates = []
+        self._date_ids = {}
+        self._directory_column = array('L')
+        self._basename_column = []
+        # None if the name equals the basename of the location
+        self._name_column = []
+        self._date_column = array('L')
+        self._size_column = array('q')
+
+    def append(self, name: str, location: str, date_created: datetime, size: int):
+        """
+        Adds a massdata-object
+
+        Parameters
+        ----------
+        name : str
+            The name of the object.
+        location : str
+            The location of the object within the storage.
+        date_created : datetime
+            The creation-time of the object.
+        size : int
+            The size of the object in bytes.
+        """
+        separator = location.rfind('/') + 1
+        directory = location[:separator]
+        directory_id = self._directory_ids.get(directory)
+        if directory_id is None:
+            directory_id = self._directory_ids[directory] = len(self._directories)
+            self._directories.append(directory)
+        basename = location[separator:]
+
+        # equal datetimes of different timezones are formatted differently
+        date_key = (date_created, date_created.tzinfo)
+        date_id = self._date_ids.get(date_key)
+        if date_id is None:
+            date_id = self._date_ids[date_key] = len(self._dates)
+            self._dates.append(date_created)
+            self._formatted_dates.append(date_created.strftime(DATE_FORMAT))
+
+        self._directory_column.append(directory_id)
+        self._basename_column.append(basename)
+        self._name_column.append(None if name == basename else name)
+        self._date_column.append(date_id)
+        self._size_column.append(size)
+
+    def __len__(self) -> int:
+        return len(self._basename_column)
+
+    def __iter__(self) -> Iterator[MassdataObject]:
+        directories = self._directories
+        dates = self._dates
+        for directory_id, basename, name, date_id, size in zip(self._directory_column, self._basename_column,
+                                                               self._name_column, self._date_column,
+                                                               self._size_column):
+            yield MassdataObject(name=basename if name is None else name, location=directories[directory_id] + basename,
+                                 date_created=dates[date_id], size=size)
+
+    def iter_dicts(self) -> Iterator[dict]:
+        """
+        Iterates the massdata-objects as dictionaries, equal to MassdataObject.to_dict
+
+        Returns
+        -------
+        Iterator[dict]
+            The dictionaries of the massdata-objects.
+        """
+        directories = self._directories
+        formatted_dates = self._formatted_dates
+        for directory_id, basename, name, date_id, size in zip(self._directory_column, self._basename_column,
+                                                               self._name_column, self._date_column,
+                                                               self._size_column):
+            yield {'name': basename if name is None else name, 'dateCreated': formatted_dates[date_id],
+                   'location': directories[directory_id] + basename, 'size': size}
@@ -45,7 +45,11 @@ class S3StorageAccess(StorageAccess):
         logging.warning('get_dataset is not implemented yet!')
         pass
 
-    def upload_status(self, organization: str, space: str, root_dir: str, local_file: str):
+    def list_datasets(self, organization: str, space: str, access_token: str):
+        logging.warning('list_datasets is not implemented yet!')
+        return iter([])
+
+    def upload_status(self, access_token: str, organization: str, space: str, root_dir: str, data: bytes):
         logging.warning('upload_status is not implemented yet!')
         pass
 
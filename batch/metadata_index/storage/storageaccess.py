@@ -18,8 +18,7 @@
 # -*- coding: utf-8 -*-
 import json
 import logging
-import os
-import tempfile
+from typing import Iterator
 
 from ingest.ingeststatus import IngestStatus
 from storage.dataset import DataSet
@@ -29,6 +28,9 @@ logger = logging.getLogger(__name__)
 
 class StorageAccess:
     INGEST_STATUS_FILE = 'ingest.json'
+    # manifest of blobs deduplicated by move_data - reserved location within the dataset, identified by its schema
+    DEDUP_MANIFEST = '.sdk/dedup.json'
+    DEDUP_MANIFEST_SCHEMA = 'sdk-dedup-manifest/v1'
 
     def __init__(self):
         pass
@@ -51,7 +53,28 @@ class StorageAccess:
         Returns
         -------
         [DataSet]
-            DataSet of path of the local directory that contains the meta.json and ingest.json and list of massdata-objects.
+            DataSet with the content of meta.json, the parsed ingest.json and list of massdata-objects - has to be
+            closed after use.
+        """
+        pass
+
+    def list_datasets(self, organization: str, space: str, access_token: str) -> Iterator[str]:
+        """
+        Enumerates the root directories of all datasets (directories with a meta.json) of a space
+
+        Parameters
+        ----------
+        organization : str
+            The organization
+        space : str
+            The space to enumerate
+        access_token : str
+            The access token that shall be used.
+
+        Returns
+        -------
+        Iterator[str]
+            The root directories of the datasets.
         """
         pass
 
@@ -75,11 +98,23 @@ class StorageAccess:
             The state of ingest.
 
         """
-        temp_dir = tempfile.mkdtemp()
-        local_file = os.path.join(temp_dir, self.INGEST_STATUS_FILE)
-        with open(local_file, "w") as f:
-            json.dump(state.to_dict(), f)
-        self.upload_status(access_token, organization, space, root_dir, local_file)
+        self.upload_status(access_token, organization, space, root_dir, json.dumps(state.to_dict()).encode('utf-8'))
+
+    def upload_status(self, access_token: str, organization: str, space: str, root_dir: str, data: bytes):
+        """
+        Uploads the content of the status-file to rootdir in cloud-storage.
 
-    def upload_status(self, access_token: str, organization: str, space: str, root_dir: str, local_file: str):
+        Parameters
+        ----------
+        access_token : str
+            The access token that shall be used.
+        organization : str
+            The organization
+        space : str
+            The space the dataset is assigned to
+        root_dir : str
+            The root directory of the dataset.
+        data : bytes
+            The content of ingest.json.
+        """
         pass
@@ -0,0 +1,175 @@
+#  ****************************************************************************
+#  @copyright 2023 e:fs TechHub GmbH (sdk@efs-techhub.com)
+#
+#  @license Apache v2.0
+#  
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  
+#      http://www.apache.org/licenses/LICENSE-2.0
+#  
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+import datetime
+import gzip
+import io
+import json
+import logging
+import os
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import zstandard
+
+import main
+from ingest.compression import GZIP, ZSTD, CompressedBody, parse_encoding
+from storage.dataset import DataSet
+from storage.massdata_object import MassdataList
+
+
+class ParseEncodingTest(unittest.TestCase):
+    def test_case_and_whitespace_are_ignored(self):
+        self.assertEqual(parse_encoding('GZIP'), GZIP)
+        self.assertEqual(parse_encoding(' Zstd '), ZSTD)
+
+    def test_uncompressed(self):
+        for value in [None, '', ' ', 'none', 'Identity']:
+            self.assertIsNone(parse_encoding(value), value)
+
+    def test_unknown_encoding(self):
+        with self.assertRaises(ValueError):
+            parse_encoding('br')
+
+
+class CompressedBodyTest(unittest.TestCase):
+    CHUNKS = [b'{"massdata": [', *[b'{"name": "f%d.bin"},' % i for i in range(1000)], b'{}]}']
+
+    def test_small_body_is_not_compressed(self):
+        body = CompressedBody(iter([b'{}']), GZIP, threshold=1024)
+        self.assertIsNone(body.content_encoding)
+        self.assertEqual(body.data, b'{}')
+
+    def test_gzip(self):
+        body = CompressedBody(iter(self.CHUNKS), GZIP, threshold=1024)
+        self.assertEqual(body.content_encoding, GZIP)
+        self.assertEqual(gzip.decompress(b''.join(body.data)), b''.join(self.CHUNKS))
+        self.assertGreater(body.ratio, 1)
+
+    def test_zstd(self):
+        body = CompressedBody(iter(self.CHUNKS), ZSTD, threshold=1024)
+        self.assertEqual(body.content_encoding, ZSTD)
+        data = zstandard.ZstdDecompressor().decompressobj().decompress(b''.join(body.data))
+        self.assertEqual(data, b''.join(self.CHUNKS))
+
+
+class StandInIndexer(BaseHTTPRequestHandler):
+    """
+    Stand-in for the metadata-service - decodes (chunked and compressed) index-documents
+    """
+    received = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        if self.headers.get('Transfer-Encoding') == 'chunked':
+            data = b''
+            while True:
+                size = int(self.rfile.readline().strip(), 16)
+                if size == 0:
+                    self.rfile.readline()
+                    break
+                data += self.rfile.read(size)
+                self.rfile.readline()
+        else:
+            data = self.rfile.read(int(self.headers['Content-Length']))
+        encoding = self.headers.get('Content-Encoding')
+        if encoding == GZIP:
+            data = gzip.decompress(data)
+        elif encoding == ZSTD:
+            data = zstandard.ZstdDecompressor().decompressobj().decompress(data)
+        self.received.append((self.command, encoding, json.loads(data)))
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    do_PUT = do_POST
+
+
+class Storage:
+    def __init__(self, count: int):
+        self.count = count
+
+    def get_dataset(self, organization: str, space: str, root_dir: str, access_token: str) -> DataSet:
+        massdata = MassdataList()
+        created = datetime.datetime(2024, 1, 2, tzinfo=datetime.timezone.utc)
+        for i in range(self.count):
+            massdata.append(f'f{i}.bin', f'{root_dir}/f{i}.bin', created, i)
+        return DataSet(io.BytesIO(b'{"project": "p"}'), None, massdata)
+
+
+class IndexTest(unittest.TestCase):
+    PAYLOAD = {'accountName': 'org', 'storageName': 'space', 'rootDir': 'ds/'}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StandInIndexer)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        StandInIndexer.received.clear()
+        patchers = [mock.patch.object(main, 'logger', logging.getLogger('metadata_index'), create=True),
+                    mock.patch.dict(os.environ, {'INDEXER_URL': f'http://127.0.0.1:{self.server.server_port}',
+                                                 'INDEX_COMPRESSION_THRESHOLD': '1024'})]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _index(self, compression: str, count: int = 100) -> tuple:
+        with mock.patch.dict(os.environ, {'INDEX_COMPRESSION': compression}):
+            main.index(Storage(count), 'token', self.PAYLOAD)
+        self.assertEqual(len(StandInIndexer.received), 1)
+        return StandInIndexer.received[0]
+
+    def _assert_document(self, document: dict, count: int = 100):
+        self.assertEqual(document['metadata']['project'], 'p')
+        self.assertEqual(len(document['massdata']), count)
+        self.assertEqual(document['massdata'][-1]['location'], f'ds/f{count - 1}.bin')
+
+    def test_uncompressed(self):
+        method, encoding, document = self._index('')
+        self.assertEqual(method, 'POST')
+        self.assertIsNone(encoding)
+        self._assert_document(document)
+
+    def test_compression_is_case_insensitive(self):
+        for compression, expected in [('GZIP', GZIP), ('Zstd', ZSTD)]:
+            StandInIndexer.received.clear()
+            _, encoding, document = self._index(compression)
+            self.assertEqual(encoding, expected)
+            self._assert_document(document)
+
+    def test_small_document_is_not_compressed(self):
+        _, encoding, document = self._index('gzip', count=1)
+        self.assertIsNone(encoding)
+        self._assert_document(document, count=1)
+
+    def test_unknown_compression(self):
+        with self.assertRaises(ValueError):
+            self._index('brotli')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+#  ****************************************************************************
+#  @copyright 2023 e:fs TechHub GmbH (sdk@efs-techhub.com)
+#
+#  @license Apache v2.0
+#  
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  
+#      http://www.apache.org/licenses/LICENSE-2.0
+#  
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+"""
+Benchmark of the pooled clients against a local Azurite-emulator - compares a new BlobClient per blob (the former
+move) with blob-clients handed out by the ClientFactory, by the number of opened connections (each a TCP- and, on
+https, a TLS-handshake) and the latency of a properties-request per blob. Start Azurite first, e.g.
+`azurite-blob --loose` (or with `--cert`/`--key` and an https-endpoint to include TLS).
+
+Usage: python benchmarks/client_benchmark.py [number of blobs] [blob-endpoint]
+"""
+import datetime
+import os
+import sys
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+import urllib3
+from azure.storage.blob import BlobClient, ContainerClient, ContainerSasPermissions, generate_container_sas
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage.azure.client_factory import ClientFactory  # noqa: E402
+from storage.move_options import DEFAULT_WORKERS  # noqa: E402
+
+# well-known account of the emulator
+ACCOUNT_NAME = 'devstoreaccount1'
+ACCOUNT_KEY = 'Eby8vdM02xNOcqFlqUwJPLlmEtlCDXJ1OUzFT50uSRZ6IFsuFq2UVErCz4I6tq/K1SZFPTOtr/KBHBeksoGMGw=='
+CONTAINER = 'benchmark'
+DEFAULT_ENDPOINT = f'http://127.0.0.1:10000/{ACCOUNT_NAME}'
+
+connections = 0
+new_conn = urllib3.connection.HTTPConnection._new_conn
+
+
+def counting_new_conn(self):
+    global connections
+    connections += 1
+    return new_conn(self)
+
+
+def fill(container_url: str, sas: str, names: list):
+    container_client = ContainerClient.from_container_url(f'{container_url}?{sas}', connection_verify=False)
+    if not container_client.exists():
+        container_client.create_container()
+    with ThreadPoolExecutor(max_workers=DEFAULT_WORKERS) as executor:
+        list(executor.map(lambda name: container_client.upload_blob(name, b'x', overwrite=True), names))
+
+
+def run(names: list, blob_client) -> tuple:
+    """
+    Requests the properties of each blob with DEFAULT_WORKERS threads
+    :param names: the blob-names
+    :param blob_client: returns the client of a blob-name
+    :return: tuple of opened connections, total seconds and sorted latencies per blob in seconds
+    """
+    global connections
+    connections = 0
+    latencies = []
+
+    def get_properties(name):
+        started_at = time.perf_counter()
+        blob_client(name).get_blob_properties()
+        latencies.append(time.perf_counter() - started_at)
+
+    started_at = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=DEFAULT_WORKERS) as executor:
+        list(executor.map(get_properties, names))
+    return connections, time.perf_counter() - started_at, sorted(latencies)
+
+
+def main(count: int, endpoint: str):
+    urllib3.disable_warnings()
+    urllib3.connection.HTTPConnection._new_conn = counting_new_conn
+    container_url = f'{endpoint.rstrip("/")}/{CONTAINER}'
+    sas = generate_container_sas(ACCOUNT_NAME, CONTAINER, account_key=ACCOUNT_KEY,
+                                 permission=ContainerSasPermissions(read=True, write=True),
+                                 expiry=datetime.datetime.utcnow() + datetime.timedelta(hours=1))
+    names = [f'dataset/file{i}.csv' for i in range(count)]
+    fill(container_url, sas, names)
+
+    factory = ClientFactory(DEFAULT_WORKERS)
+    factory._transport.connection_config.verify = False
+    results = {
+        'BlobClient per blob': run(names, lambda name: BlobClient.from_blob_url(
+            f'{container_url}/{urllib.parse.quote(name)}?{sas}', connection_verify=False)),
+        'ClientFactory': run(names, lambda name: factory.blob_client(container_url, sas, name)),
+    }
+    factory.close()
+
+    print(f'{count} blobs on {endpoint}, {DEFAULT_WORKERS} threads')
+    for label, (opened, duration, latencies) in results.items():
+        p50, p99 = latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]
+        print(f'{label:<20} {opened:6d} connections {duration:7.2f} s {count / duration:7.0f} blobs/s '
+              f'p50 {p50 * 1000:6.1f} ms p99 {p99 * 1000:6.1f} ms')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000, sys.argv[2] if len(sys.argv) > 2 else DEFAULT_ENDPOINT)
@@ -0,0 +1,85 @@
+#  ****************************************************************************
+#  @copyright 2023 e:fs TechHub GmbH (sdk@efs-techhub.com)
+#
+#  @license Apache v2.0
+#  
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  
+#      http://www.apache.org/licenses/LICENSE-2.0
+#  
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+"""
+Benchmark of the blob-filter on a synthetic list of blob-names - compares BlobFilter with the former filter, which
+evaluated black- and whitelist with re.search per list and checked each blob for membership in the filtered result.
+
+Usage: python benchmarks/filter_benchmark.py [number of names]
+"""
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage.storageaccess import BlobFilter, wildcard2regex  # noqa: E402
+
+EXTENSIONS = ['csv', 'json', 'parquet', 'bin', 'exe', 'js', 'txt', 'mf4']
+BLACKLIST = '*.exe,*.js,*.bat,*.sh'
+WHITELIST = '*.csv,*.json,*.parquet,*.bin,*.mf4,raw/*'
+
+
+def legacy_filter(blobs: list, blacklist: str, whitelist: str):
+    def file_filter(wildcard):
+        pattern = wildcard2regex(wildcard)
+        return [blob for blob in blobs if re.search(pattern, blob, re.IGNORECASE)]
+
+    whitelisted = file_filter(whitelist) if whitelist else blobs
+    blacklisted = file_filter(blacklist) if blacklist else []
+    if whitelist:
+        return set(whitelisted) - set(blacklisted)
+    if blacklist:
+        return set(blobs) - set(blacklisted)
+    return blobs
+
+
+def run_legacy(blobs: list, blacklist: str, whitelist: str) -> int:
+    filtered = legacy_filter(blobs, blacklist, whitelist)
+    return sum(1 for blob in blobs if blob in filtered)
+
+
+def run_blob_filter(blobs: list, blacklist: str, whitelist: str) -> int:
+    blob_filter = BlobFilter(blacklist, whitelist)
+    if not blob_filter.active:
+        return len(blobs)
+    return sum(1 for blob in blobs if blob_filter.passes(blob))
+
+
+def measure(function, *args) -> tuple:
+    started_at = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started_at
+
+
+def main(count: int):
+    blobs = [f'ds/run{i // 10000}/part{i % 100}/file{i}.{EXTENSIONS[i % len(EXTENSIONS)]}' for i in range(count)]
+    for label, blacklist, whitelist, legacy_count in [('blacklist', BLACKLIST, None, count),
+                                                      ('black- and whitelist', BLACKLIST, WHITELIST, count),
+                                                      # the membership-check on the unfiltered list is quadratic
+                                                      ('no filter', None, None, min(count, 20000))]:
+        passed, duration = measure(run_blob_filter, blobs, blacklist, whitelist)
+        expected, legacy_duration = measure(run_legacy, blobs[:legacy_count], blacklist, whitelist)
+        if legacy_count == count and passed != expected:
+            raise AssertionError(f'{label}: {passed} != {expected} passed blobs')
+        print(f'{label:22} BlobFilter: {duration:6.2f}s for {count} names | '
+              f'legacy: {legacy_duration:6.2f}s for {legacy_count} names')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,130 @@
+#  ****************************************************************************
+#  @copyright 2023 e:fs TechHub GmbH (sdk@efs-techhub.com)
+#
+#  @license Apache v2.0
+#  
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  
+#      http://www.apache.org/licenses/LICENSE-2.0
+#  
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+"""
+Throughput-benchmark of the move on s3-storage against a moto-server, that delays each request to resemble a remote
+object-store - compares copying and deleting one object after the other with the concurrent move, that streams
+objects from read- to upload-scope. Requires boto3 and moto.
+
+Usage: python benchmarks/s3_benchmark.py [number of objects] [delay per request in seconds]
+"""
+import logging
+import os
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage.move_metrics import MoveMetrics  # noqa: E402
+from storage.move_options import MoveOptions  # noqa: E402
+
+BUCKET = 'sdk'
+OBJECT_SIZE = 1024
+WORKERS = [1, 16, 64]
+CREDENTIALS = {'AccessKeyId': 'key', 'SecretAccessKey': 'secret', 'SessionToken': 'token'}
+
+
+def serve(port: int, delay: float):
+    from moto.server import ThreadedMotoServer
+    from werkzeug.serving import WSGIRequestHandler
+
+    handle_one_request = WSGIRequestHandler.handle_one_request
+
+    def delayed(handler):
+        time.sleep(delay)
+        return handle_one_request(handler)
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    WSGIRequestHandler.handle_one_request = delayed
+    ThreadedMotoServer(ip_address='127.0.0.1', port=port, verbose=False).start()
+    while True:
+        time.sleep(60)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(port: int):
+    for _ in range(100):
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError('moto-server did not start')
+
+
+def fill(client, root_dir: str, count: int):
+    with ThreadPoolExecutor(max_workers=32) as executor:
+        list(executor.map(lambda i: client.put_object(Bucket=BUCKET, Key=f'org/loadingzone/{root_dir}/f{i}.csv',
+                                                      Body=b'x' * OBJECT_SIZE), range(count)))
+
+
+def run_serial(storage, client, count: int) -> float:
+    fill(client, 'serial', count)
+    started_at = time.monotonic()
+    for name, _ in storage.list_blobs('token', 'org', 'loadingzone', 'serial'):
+        data = client.get_object(Bucket=BUCKET, Key=f'org/loadingzone/{name}')['Body'].read()
+        client.put_object(Bucket=BUCKET, Key=f'org/main/{name}', Body=data)
+        client.delete_object(Bucket=BUCKET, Key=f'org/loadingzone/{name}')
+    return time.monotonic() - started_at
+
+
+def run_move(storage, client, count: int, workers: int) -> float:
+    root_dir = f'stream{workers}'
+    fill(client, root_dir, count)
+    started_at = time.monotonic()
+    storage.move_data('token', 'org', 'loadingzone', 'main', root_dir, None, None, MoveOptions(workers=workers),
+                      MoveMetrics())
+    return time.monotonic() - started_at
+
+
+def main(count: int, delay: float):
+    port = free_port()
+    server = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve', str(port), str(delay)])
+    try:
+        wait_for(port)
+        os.environ.update(STORAGE_DOMAIN=f'http://127.0.0.1:{port}', BUCKET=BUCKET, AWS_DEFAULT_REGION='us-east-1',
+                          READ_ENDPOINT='read', UPLOAD_ENDPOINT='upload', DELETE_ENDPOINT='delete')
+        from storage.s3 import s3_storageaccess
+        s3_storageaccess._get_credentials = lambda *args: CREDENTIALS
+        storage = s3_storageaccess.S3StorageAccess()
+        client = storage._client(CREDENTIALS, 64)
+        client.create_bucket(Bucket=BUCKET)
+
+        print(f'{count} objects of {OBJECT_SIZE} bytes, {delay * 1000:.0f} ms per request')
+        duration = run_serial(storage, client, count)
+        print(f'{"serial copy and delete":<28} {duration:7.2f} s {count / duration:8.0f} objects/s')
+        for workers in WORKERS:
+            duration = run_move(storage, client, count, workers)
+            label = f'streamed, {workers} workers'
+            print(f'{label:<28} {duration:7.2f} s {count / duration:8.0f} objects/s')
+    finally:
+        server.terminate()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--serve':
+        serve(int(sys.argv[2]), float(sys.argv[3]))
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000, float(sys.argv[2]) if len(sys.argv) > 2 else 0.02)
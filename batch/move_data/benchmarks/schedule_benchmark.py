@@ -0,0 +1,89 @@
+#  ****************************************************************************
+#  @copyright 2023 e:fs TechHub GmbH (sdk@efs-techhub.com)
+#
+#  @license Apache v2.0
+#  
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  
+#      http://www.apache.org/licenses/LICENSE-2.0
+#  
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+"""
+Simulation of the scheduling of copy-jobs on synthetic size-distributions - compares the makespan (duration until
+the last copy completed) of copying in listing-order with largest-first scheduling as done by the move (buffered) and
+with a full sort, against the lower bound max(largest job, total work / slots).
+
+Usage: python benchmarks/schedule_benchmark.py [number of blobs] [copy-slots] [schedule-buffer]
+"""
+import heapq
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage.move_options import DEFAULT_SCHEDULE_BUFFER, DEFAULT_WORKERS  # noqa: E402
+from storage.move_schedule import largest_first  # noqa: E402
+
+BANDWIDTH = 100e6  # bytes per second and copy-slot
+OVERHEAD = 0.05  # seconds per copy-job
+
+
+def duration(size: float) -> float:
+    return OVERHEAD + size / BANDWIDTH
+
+
+def makespan(sizes: list, slots: int) -> float:
+    """
+    Assigns each job in the given order to the copy-slot that is free first
+    :param sizes: the sizes of the blobs in the order they are started
+    :param slots: number of concurrent copies
+    :return: seconds until the last copy completed
+    """
+    free_at = [0.0] * slots
+    for size in sizes:
+        heapq.heappush(free_at, heapq.heappop(free_at) + duration(size))
+    return max(free_at)
+
+
+def lower_bound(sizes: list, slots: int) -> float:
+    durations = [duration(size) for size in sizes]
+    return max(max(durations), sum(durations) / slots)
+
+
+def distributions(count: int) -> dict:
+    def large_last():
+        return [random.uniform(0, 1e8) for _ in range(count - 3)] + [5e10] * 3
+
+    return {
+        'lognormal(10MB, sigma=2)': lambda: [random.lognormvariate(16.1, 2) for _ in range(count)],
+        'pareto(alpha=1.2, 1MB)': lambda: [1e6 * random.paretovariate(1.2) for _ in range(count)],
+        'uniform(0-100MB), 3x50GB last': large_last,
+        'uniform(0-100MB), 3x50GB random': lambda: random.sample(large_last(), count),
+    }
+
+
+def main(count: int, slots: int, buffer_size: int):
+    random.seed(1)
+    print(f'{count} blobs, {slots} copy-slots, schedule-buffer {buffer_size}, makespan in s')
+    print(f'{"distribution":<34} {"listing":>9} {"buffered":>9} {"sorted":>9} {"bound":>9} {"reduction":>10}')
+    for name, generate in distributions(count).items():
+        sizes = generate()
+        listing = makespan(sizes, slots)
+        buffered = makespan(list(largest_first(sizes, buffer_size, lambda size: size)), slots)
+        full_sort = makespan(sorted(sizes, reverse=True), slots)
+        print(f'{name:<34} {listing:9.0f} {buffered:9.0f} {full_sort:9.0f} {lower_bound(sizes, slots):9.0f} '
+              f'{(1 - buffered / listing) * 100:9.0f}%')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_WORKERS,
+         int(sys.argv[3]) if len(sys.argv) > 3 else DEFAULT_SCHEDULE_BUFFER)
@@ -27,11 +27,26 @@ import urllib.parse
 import requests
 
 from storage.azure import azure_storageaccess as azure
+from storage.move_metrics import MoveMetrics
+from storage.move_options import DEFAULT_BLOCK_COPY_THRESHOLD, DEFAULT_BLOCK_PARALLELISM, DEFAULT_BLOCK_SIZE, \
+    DEFAULT_PROGRESS_INTERVAL, DEFAULT_SCHEDULE_BUFFER, DEFAULT_SYNC_COPY_THRESHOLD, DEFAULT_WINDOW, DEFAULT_WORKERS, \
+    MODE_COPY, MODES, SCHEDULE_LARGEST_FIRST, SCHEDULES, VERIFY_AUTO, VERIFY_MODES, MoveOptions
+from storage.move_plan import DEFAULT_PLAN_DIR, DEFAULT_SHARD_MIN_SIZE, DEFAULT_SHARDS, MoveShard, plan_shards, \
+    read_plan, read_shard, write_plan
+from storage.move_progress import MoveProgress
 from storage.s3 import s3_storageaccess as s3
-from storage.storageaccess import StorageAccess
+from storage.storageaccess import MoveError, StorageAccess
 
 ENV_STORAGE_TYPE = 'STORAGE_TYPE'
 
+STAGE_MOVE = 'move'
+STAGE_PLAN = 'plan'
+STAGE_SHARD = 'shard'
+STAGE_FINALIZE = 'finalize'
+STAGES = [STAGE_MOVE, STAGE_PLAN, STAGE_SHARD, STAGE_FINALIZE]
+
+TRUE_VALUES = ['true', '1', 'yes']
+
 
 def get_service_account_access_token(token_uri: str, client_id: str, client_secret: str):
     """
@@ -125,12 +140,16 @@ def get_payload(payload: str):
     return payload
 
 
-def move_data(storage_access: StorageAccess, payload: dict, access_token: str, blacklist: str, whitelist: str):
+def move_data(storage_access: StorageAccess, payload: dict, access_token: str, blacklist: str, whitelist: str,
+              options: MoveOptions = None, metrics: MoveMetrics = None, shard: MoveShard = None):
     """
     moves data as provided by payload, assume that the payload consists of containerName (source-container), storageName (dest-container), accountName (storage-account) and directory name (the directory of the files to move)
     :param storage_access: the storage-access-instance
     :param payload: the payload
     :param access_token: the access-token
+    :param options: tuning-options for the move
+    :param metrics: metrics to record the move in (optional)
+    :param shard: only move the blobs of this shard (optional)
     """
     src_space = payload['containerName']
     dst_space = payload['storageName']
@@ -143,8 +162,77 @@ def move_data(storage_access: StorageAccess, payload: dict, access_token: str, b
 
     root_dir_name = payload['rootDir'].rstrip('/')
 
-    storage_access.move_data(access_token, organization, src_space, dst_space, root_dir_name, blacklist=blacklist,
-                             whitelist=whitelist)
+    metrics = metrics or MoveMetrics()
+    options = options or MoveOptions()
+    with metrics.duration.time(), MoveProgress(metrics, options.progress_interval):
+        storage_access.move_data(access_token, organization, src_space, dst_space, root_dir_name,
+                                 blacklist=blacklist, whitelist=whitelist, options=options, metrics=metrics,
+                                 shard=shard)
+
+
+def plan_move(storage_access: StorageAccess, payload: dict, access_token: str, shards: int, min_size: int,
+              plan_dir: str, options: MoveOptions = None):
+    """
+    Plans a sharded move: lists rootDir and splits its blobs into balanced shards, that may be moved by separate pods.
+    The manifest of each shard contains its blobs as listed, so the shards do not list rootDir again. Directories that
+    may be renamed and datasets smaller than min_size result in a single shard covering the whole rootDir, which is
+    moved as without sharding.
+    :param storage_access: the storage-access-instance
+    :param payload: the payload
+    :param access_token: the access-token
+    :param shards: the (maximum) number of shards
+    :param min_size: datasets smaller than this (in bytes) are not split
+    :param plan_dir: the directory to write the shard-manifests to
+    :param options: tuning-options for the move
+    """
+    options = options or MoveOptions()
+    organization = payload['accountName']
+    src_space = payload['containerName']
+    root_dir_name = payload['rootDir'].rstrip('/')
+
+    if shards <= 1 or (options.mode != MODE_COPY and
+                       storage_access.supports_rename(access_token, organization, src_space, root_dir_name)):
+        write_plan(plan_dir, [MoveShard(0)])
+        return
+    blobs = list(storage_access.list_entries(access_token, organization, src_space, root_dir_name))
+    size = sum(blob['size'] for blob in blobs)
+    logger.info(f'planning move of {len(blobs)} blobs ({size} bytes)')
+    if size < min_size:
+        write_plan(plan_dir, [MoveShard(0)])
+        return
+    planned = plan_shards(blobs, shards)
+    for shard in planned:
+        logger.info(f'shard {shard.index}: {len(shard.blob_names)} blobs ({shard.size} bytes)')
+    write_plan(plan_dir, planned)
+
+
+def finalize_move(storage_access: StorageAccess, payload: dict, access_token: str, plan_dir: str):
+    """
+    Checks that all shards of a sharded move finished - i.e. no planned blob is left in rootDir
+    :param storage_access: the storage-access-instance
+    :param payload: the payload
+    :param access_token: the access-token
+    :param plan_dir: the directory of the shard-manifests
+    :raises MoveError: if blobs of at least one shard have not been moved
+    """
+    organization = payload['accountName']
+    src_space = payload['containerName']
+    root_dir_name = payload['rootDir'].rstrip('/')
+
+    shards = read_plan(plan_dir)
+    shard_of = {name: shard.index for shard in shards if not shard.whole for name in shard.blob_names}
+    whole = any(shard.whole for shard in shards)
+    failures = {}
+    for blob_name, _ in storage_access.list_blobs(access_token, organization, src_space, root_dir_name):
+        if blob_name in shard_of:
+            failures[blob_name] = Exception(f'blob of shard {shard_of[blob_name]} has not been moved')
+        elif whole:
+            failures[blob_name] = Exception('blob has not been moved')
+        else:
+            logger.warning(f'{blob_name} has been added after planning the move - it has not been moved')
+    if failures:
+        raise MoveError(failures)
+    logger.info(f'all {len(shards)} shard(s) of {root_dir_name} finished')
 
 
 def get_env(env_var_name: str, obligatory: bool = True):
@@ -170,6 +258,71 @@ def get_env(env_var_name: str, obligatory: bool = True):
     return env_var_value.strip()
 
 
+def _get_option(arg_value, env_var_name: str, default):
+    """
+    returns arg_value, or value of environment-variable if arg_value is None, or default if neither is set
+    :param arg_value: the argument-value as passed by cli
+    :param env_var_name: the name of the fallback-environment-variable
+    :param default: the default-value
+    :return: the option-value
+    """
+    if arg_value is not None:
+        return arg_value
+    env_var_value = get_env(env_var_name, False)
+    return env_var_value if env_var_value else default
+
+
+def _int_or_none(value):
+    return None if value is None else int(value)
+
+
+def _get_move_options(args) -> MoveOptions:
+    """
+    returns the tuning-options for the move - cli-arguments take precedence over environment-variables
+    :param args: the parsed cli-arguments
+    :return: the tuning-options
+    """
+    return MoveOptions(
+        workers=int(_get_option(args.workers, 'MOVE_WORKERS', DEFAULT_WORKERS)),
+        max_workers=_int_or_none(_get_option(args.max_workers, 'MOVE_MAX_WORKERS', None)),
+        mode=_get_option(args.mode, 'MOVE_MODE', MODE_COPY).lower(),
+        window=int(_get_option(args.window, 'MOVE_WINDOW', DEFAULT_WINDOW)),
+        journal_dir=_get_option(args.journal_dir, 'MOVE_JOURNAL_DIR', None),
+        sync_copy_threshold=int(_get_option(args.sync_copy_threshold, 'MOVE_SYNC_COPY_THRESHOLD',
+                                            DEFAULT_SYNC_COPY_THRESHOLD)),
+        block_copy_threshold=int(_get_option(args.block_copy_threshold, 'MOVE_BLOCK_COPY_THRESHOLD',
+                                             DEFAULT_BLOCK_COPY_THRESHOLD)),
+        block_size=int(_get_option(args.block_size, 'MOVE_BLOCK_SIZE', DEFAULT_BLOCK_SIZE)),
+        block_parallelism=int(_get_option(args.block_parallelism, 'MOVE_BLOCK_PARALLELISM',
+                                          DEFAULT_BLOCK_PARALLELISM)),
+        schedule=_get_option(args.schedule, 'MOVE_SCHEDULE', SCHEDULE_LARGEST_FIRST).lower(),
+        schedule_buffer=int(_get_option(args.schedule_buffer, 'MOVE_SCHEDULE_BUFFER', DEFAULT_SCHEDULE_BUFFER)),
+        incremental=str(_get_option(args.incremental, 'MOVE_INCREMENTAL', False)).lower() in TRUE_VALUES,
+        verify=_get_option(args.verify, 'MOVE_VERIFY', VERIFY_AUTO).lower(),
+        dedup=str(_get_option(args.dedup, 'MOVE_DEDUP', False)).lower() in TRUE_VALUES,
+        progress_interval=float(_get_option(args.progress_interval, 'MOVE_PROGRESS_INTERVAL',
+                                            DEFAULT_PROGRESS_INTERVAL)),
+        rejected_file=_get_option(args.rejected_file, 'MOVE_REJECTED_FILE', None))
+
+
+def export_metrics(metrics: MoveMetrics, payload: dict, pushgateway: str, metrics_file: str, shard: int = None):
+    """
+    Exports the metrics of the move - failing to export does not fail the move
+    :param metrics: the metrics
+    :param payload: the payload
+    :param pushgateway: url of the pushgateway to push the metrics to (optional)
+    :param metrics_file: path of the file to write the metrics to (optional)
+    :param shard: index of the moved shard (optional)
+    """
+    try:
+        if pushgateway:
+            metrics.push(pushgateway, payload['accountName'], payload['storageName'], shard)
+        if metrics_file:
+            metrics.write(metrics_file)
+    except Exception as e:
+        logger.warning(f'exporting metrics failed: {e}')
+
+
 def _get_storage_access() -> StorageAccess:
     storage_type = azure.TYPE
     if ENV_STORAGE_TYPE in os.environ:
@@ -190,6 +343,66 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Script to move files', )
     
     parser.add_argument('--payload', '-p', dest='payload', type=str, required=True)
+    parser.add_argument('--workers', '-w', dest='workers', type=int, required=False,
+                        help=f'initial number of concurrent requests (default: $MOVE_WORKERS or {DEFAULT_WORKERS})')
+    parser.add_argument('--max-workers', dest='max_workers', type=int, required=False,
+                        help='maximum number of concurrent requests (default: $MOVE_MAX_WORKERS or 4 * workers)')
+    parser.add_argument('--mode', '-m', dest='mode', type=str, required=False, choices=MODES,
+                        help=f'how blobs are moved (default: $MOVE_MODE or {MODE_COPY})')
+    parser.add_argument('--window', dest='window', type=int, required=False,
+                        help=f'maximum number of blobs in flight (default: $MOVE_WINDOW or {DEFAULT_WINDOW})')
+    parser.add_argument('--journal-dir', dest='journal_dir', type=str, required=False,
+                        help='directory (e.g. mounted volume) to keep the move-journal in (default: $MOVE_JOURNAL_DIR)')
+    parser.add_argument('--sync-copy-threshold', dest='sync_copy_threshold', type=int, required=False,
+                        help=f'blobs smaller than this (in bytes) are copied synchronously, 0 disables '
+                             f'(default: $MOVE_SYNC_COPY_THRESHOLD or {DEFAULT_SYNC_COPY_THRESHOLD})')
+    parser.add_argument('--block-copy-threshold', dest='block_copy_threshold', type=int, required=False,
+                        help=f'blobs of at least this size (in bytes) are copied block by block, 0 disables '
+                             f'(default: $MOVE_BLOCK_COPY_THRESHOLD or {DEFAULT_BLOCK_COPY_THRESHOLD})')
+    parser.add_argument('--block-size', dest='block_size', type=int, required=False,
+                        help=f'block-size (in bytes) when copying block by block '
+                             f'(default: $MOVE_BLOCK_SIZE or {DEFAULT_BLOCK_SIZE})')
+    parser.add_argument('--block-parallelism', dest='block_parallelism', type=int, required=False,
+                        help=f'number of blocks staged concurrently '
+                             f'(default: $MOVE_BLOCK_PARALLELISM or {DEFAULT_BLOCK_PARALLELISM})')
+    parser.add_argument('--schedule', dest='schedule', type=str, required=False, choices=SCHEDULES,
+                        help=f'order blobs are moved in - largest first or in listing-order '
+                             f'(default: $MOVE_SCHEDULE or {SCHEDULE_LARGEST_FIRST})')
+    parser.add_argument('--schedule-buffer', dest='schedule_buffer', type=int, required=False,
+                        help=f'number of listed blobs buffered for reordering them largest first '
+                             f'(default: $MOVE_SCHEDULE_BUFFER or {DEFAULT_SCHEDULE_BUFFER})')
+    parser.add_argument('--incremental', dest='incremental', action='store_true', default=None,
+                        help='skip the copy of blobs already present at the destination (same size and content-md5) '
+                             '(default: $MOVE_INCREMENTAL or false)')
+    parser.add_argument('--dedup', dest='dedup', action='store_true', default=None,
+                        help='reference blobs whose content is already present in the target-space instead of copying '
+                             'them (default: $MOVE_DEDUP or false)')
+    parser.add_argument('--verify', dest='verify', type=str, required=False, choices=VERIFY_MODES,
+                        help=f'how copies are verified before deleting the source '
+                             f'(default: $MOVE_VERIFY or {VERIFY_AUTO})')
+    parser.add_argument('--progress-interval', dest='progress_interval', type=float, required=False,
+                        help=f'seconds between two progress-summaries, 0 only logs the final summary '
+                             f'(default: $MOVE_PROGRESS_INTERVAL or {DEFAULT_PROGRESS_INTERVAL})')
+    parser.add_argument('--rejected-file', dest='rejected_file', type=str, required=False,
+                        help='file to write the names of blobs to, that did not pass the filter-criteria '
+                             '(default: $MOVE_REJECTED_FILE)')
+    parser.add_argument('--stage', dest='stage', type=str, required=False, choices=STAGES, default=STAGE_MOVE,
+                        help=f'stage of a sharded move: {STAGE_PLAN} writes shard-manifests, {STAGE_SHARD} moves a '
+                             f'single shard and {STAGE_FINALIZE} checks that all shards finished '
+                             f'(default: {STAGE_MOVE} - move without sharding)')
+    parser.add_argument('--shards', dest='shards', type=int, required=False,
+                        help=f'maximum number of shards when planning (default: $MOVE_SHARDS or {DEFAULT_SHARDS})')
+    parser.add_argument('--shard-min-size', dest='shard_min_size', type=int, required=False,
+                        help=f'datasets smaller than this (in bytes) are moved as a single shard '
+                             f'(default: $MOVE_SHARD_MIN_SIZE or {DEFAULT_SHARD_MIN_SIZE})')
+    parser.add_argument('--plan-dir', dest='plan_dir', type=str, required=False,
+                        help=f'directory of the shard-manifests (default: $MOVE_PLAN_DIR or {DEFAULT_PLAN_DIR})')
+    parser.add_argument('--shard', dest='shard', type=int, required=False,
+                        help=f'index of the shard to move (only {STAGE_SHARD})')
+    parser.add_argument('--metrics-pushgateway', dest='metrics_pushgateway', type=str, required=False,
+                        help='url of a prometheus-pushgateway to push metrics to (default: $MOVE_METRICS_PUSHGATEWAY)')
+    parser.add_argument('--metrics-file', dest='metrics_file', type=str, required=False,
+                        help='file to write metrics to in prometheus text-format (default: $MOVE_METRICS_FILE)')
     
     args = parser.parse_args()
     if not args.payload:
@@ -217,4 +430,26 @@ if __name__ == '__main__':
     blacklist = get_env('BLACKLIST', False)
     organization = payload['accountName']
     whitelist = get_env(f'{organization}.WHITELIST'.upper(), False)
-    move_data(storage_access, payload, auth_header_user_context, blacklist=blacklist, whitelist=whitelist)
+    plan_dir = _get_option(args.plan_dir, 'MOVE_PLAN_DIR', DEFAULT_PLAN_DIR)
+    if args.stage == STAGE_PLAN:
+        plan_move(storage_access, payload, auth_header_user_context,
+                  shards=int(_get_option(args.shards, 'MOVE_SHARDS', DEFAULT_SHARDS)),
+                  min_size=int(_get_option(args.shard_min_size, 'MOVE_SHARD_MIN_SIZE', DEFAULT_SHARD_MIN_SIZE)),
+                  plan_dir=plan_dir, options=_get_move_options(args))
+    elif args.stage == STAGE_FINALIZE:
+        finalize_move(storage_access, payload, auth_header_user_context, plan_dir)
+    else:
+        shard = None
+        if args.stage == STAGE_SHARD:
+            if args.shard is None:
+                raise Exception(f'no shard provided - provide "--shard" with stage {STAGE_SHARD}')
+            shard = read_shard(plan_dir, args.shard)
+        metrics = MoveMetrics()
+        try:
+            move_data(storage_access, payload, auth_header_user_context, blacklist=blacklist, whitelist=whitelist,
+                      options=_get_move_options(args), metrics=metrics, shard=shard)
+        finally:
+            export_metrics(metrics, payload,
+                           pushgateway=_get_option(args.metrics_pushgateway, 'MOVE_METRICS_PUSHGATEWAY', None),
+                           metrics_file=_get_option(args.metrics_file, 'MOVE_METRICS_FILE', None),
+                           shard=args.shard if shard is not None else None)
@@ -0,0 +1,129 @@
+#  ****************************************************************************
+#  @copyright 2023 e:fs TechHub GmbH (sdk@efs-techhub.com)
+#
+#  @license Apache v2.0
+#  
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  
+#      http://www.apache.org/licenses/LICENSE-2.0
+#  
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+import logging
+import threading
+import time
+
+from azure.core.pipeline import PipelineResponse
+
+logger = logging.getLogger('move_data')
+
+THROTTLING_STATUS_CODES = [429, 503]
+THROTTLING_ERROR_CODES = ['ServerBusy']
+DECREASE_FACTOR = 0.5
+DECREASE_COOLDOWN = 1.0  # seconds - throttled responses within this period count as one congestion-event
+LOG_INTERVAL = 30.0
+
+
+class AdaptiveLimiter:
+    def __init__(self, initial: int, maximum: int, minimum: int = 1):
+        """
+        AIMD-controller for the number of concurrent requests against the storage: the limit is increased by one per
+        limit successful responses and halved on throttling (429/503/ServerBusy). A 'Retry-After' pauses all requests.
+        Install observe as 'raw_response_hook' of the clients, so retries of the client are observed as well.
+        :param initial: the initial limit
+        :param maximum: the upper bound of the limit
+        :param minimum: the lower bound of the limit
+        """
+        self._limit = float(initial)
+        self._maximum = maximum
+        self._minimum = minimum
+        self._active = 0
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._last_log = time.monotonic()
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def call(self, fn, *args, **kwargs):
+        """
+        Calls fn, as soon as the limit allows another concurrent request
+        :param fn: the request-function
+        :return: the result of fn
+        """
+        self._acquire()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self._release()
+
+    def observe(self, response: PipelineResponse):
+        """
+        Adjusts the limit according to a response - to be used as 'raw_response_hook'
+        :param response: the pipeline-response
+        """
+        http_response = response.http_response
+        if http_response.status_code in THROTTLING_STATUS_CODES or \
+                http_response.headers.get('x-ms-error-code') in THROTTLING_ERROR_CODES:
+            self._on_throttled(_retry_after(http_response.headers.get('Retry-After')))
+        elif http_response.status_code < 400:
+            self._on_success()
+
+    def _acquire(self):
+        with self._condition:
+            while True:
+                delay = self._paused_until - time.monotonic()
+                if delay > 0:
+                    self._condition.wait(delay)
+                elif self._active < int(self._limit):
+                    break
+                else:
+                    self._condition.wait()
+            self._active += 1
+
+    def _release(self):
+        with self._condition:
+            self._active -= 1
+            self._condition.notify()
+
+    def _on_success(self):
+        with self._condition:
+            previous = int(self._limit)
+            self._limit = min(self._maximum, self._limit + 1 / self._limit)
+            if int(self._limit) > previous:
+                self._condition.notify()
+            now = time.monotonic()
+            if now - self._last_log >= LOG_INTERVAL:
+                self._last_log = now
+                logger.info(f'concurrency-limit: {int(self._limit)} ({self._active} requests active)')
+
+    def _on_throttled(self, retry_after: float):
+        with self._condition:
+            now = time.monotonic()
+            if now - self._last_decrease >= DECREASE_COOLDOWN:
+                self._last_decrease = now
+                self._limit = max(self._minimum, self._limit * DECREASE_FACTOR)
+                logger.info(f'storage is throttling - reduced concurrency-limit to {int(self._limit)}')
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+                logger.info(f'storage requested to retry after {retry_after}s - pausing requests')
+
+
+def _retry_after(value: str) -> float:
+    """
+    Parses the 'Retry-After'-header (only delay-seconds are supported, http-dates are ignored)
+    :param value: the header-value
+    :return: seconds to wait - 0 if not provided
+    """
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return 0.0
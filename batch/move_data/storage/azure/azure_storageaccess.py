@@ -15,17 +15,30 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 #  ****************************************************************************
+import base64
+import datetime
 import logging
 import os
-import re
-import time
 import urllib.parse
-from typing import Union
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
 import requests
-from azure.storage.blob import BlobClient, ContainerClient
-
-from storage.storageaccess import StorageAccess, wildcard2regex
+from azure.core.exceptions import HttpResponseError, ResourceNotFoundError
+from azure.storage.blob import BlobClient, BlobProperties, BlobType, ContainerClient, ContentSettings
+from azure.storage.filedatalake import DataLakeDirectoryClient
+
+from storage.azure.adaptive_limiter import AdaptiveLimiter
+from storage.azure.batch_deleter import BatchDeleter
+from storage.azure.blob_listing import iter_blob_pages
+from storage.azure.blob_mover import BlobMover
+from storage.azure.deduplicator import Deduplicator
+from storage.move_journal import MoveJournal
+from storage.move_metrics import MoveMetrics
+from storage.move_options import MODE_COPY, MODE_RENAME, SCHEDULE_LARGEST_FIRST, MoveOptions
+from storage.move_plan import MoveShard
+from storage.move_progress import RejectedFiles
+from storage.move_schedule import largest_first
+from storage.storageaccess import BlobFilter, MoveError, StorageAccess
 
 logger = logging.getLogger('move_data')
 
@@ -37,7 +50,11 @@ class AzureStorageAccess(StorageAccess):
         super().__init__()
 
     def move_data(self, access_token: str, organization: str, src_space: str, dst_space: str, root_dir: str,
-                  blacklist: str, whitelist: str):
+                  blacklist: str, whitelist: str, options: MoveOptions = None, metrics: MoveMetrics = None,
+                  shard: MoveShard = None):
+        options = options or MoveOptions()
+        metrics = metrics or MoveMetrics()
+        blob_filter = BlobFilter(blacklist, whitelist)
 
         delete_sas = _get_sas_token(os.environ['DELETE_ENDPOINT'], access_token, organization, src_space)
         upload_sas = _get_sas_token(os.environ['UPLOAD_ENDPOINT'], access_token, organization, dst_space)
@@ -45,35 +62,335 @@ class AzureStorageAccess(StorageAccess):
 
         source_container_client = ContainerClient.from_container_url(
             f'{_get_storage_url(organization, src_space)}?{read_sas}')
-        my_blobs = source_container_client.list_blobs(name_starts_with=root_dir + "/")
-        blob_names = [blob.name for blob in my_blobs]
-        filtered = filter_blobs(blob_names, blacklist, whitelist)
-
-        # iterate over all blobs, move only filtered and delete other blobs
-        for blob_name in blob_names:
-            file_name = urllib.parse.quote(blob_name)
-
-            src_blob_client = BlobClient.from_blob_url(
-                f'{_get_storage_url(organization, src_space)}/{file_name}?{delete_sas}')
-
-            if blob_name in filtered:
-                dst_blob_client = BlobClient.from_blob_url(
-                    f'{_get_storage_url(organization, dst_space)}/{file_name}?{upload_sas}')
-
-                # Copy started
-                logger.info(f'moving file from {blob_name} to {blob_name}')
-                logger.debug(f'copying file from {src_blob_client.url} to {dst_blob_client.url}')
-                dst_blob_client.start_copy_from_url(src_blob_client.url)
-                props = dst_blob_client.get_blob_properties()
-                while props.copy.status == 'pending':
-                    time.sleep(10)
-                    logger.debug('copy-job still pending')
-                    props = dst_blob_client.get_blob_properties()
-            else:
-                logger.warning(
-                    f'file {file_name} did not pass filter-criteria (blacklist: \'{blacklist}\', whitelist: \'{whitelist}\') - will be deleted!')
-            logger.debug(f'deleting file from {src_blob_client.url}')
-            src_blob_client.delete_blob()
+
+        # a shard is only a part of root_dir and cannot be renamed
+        shard_names = shard.blob_names if shard is not None else None
+        if options.mode != MODE_COPY and shard_names is None:
+            if _is_hns_directory(organization, src_space, root_dir, read_sas):
+                try:
+                    # rejected blobs must not be part of the renamed directory
+                    if blob_filter.active:
+                        with RejectedFiles(options.rejected_file, blacklist, whitelist) as rejected:
+                            _delete_rejected(source_container_client, organization, src_space, root_dir, blob_filter,
+                                             delete_sas, options.workers, metrics, rejected)
+                    _rename_directory(organization, src_space, dst_space, root_dir, delete_sas, upload_sas)
+                    metrics.directory_renames.inc()
+                    return
+                except (HttpResponseError, MoveError) as e:
+                    if options.mode == MODE_RENAME:
+                        raise
+                    logger.warning(f'moving {root_dir} via rename failed ({e}) - falling back to copy')
+            elif options.mode == MODE_RENAME:
+                raise ValueError(f'{root_dir} is no directory of a storage-account with hierarchical namespace')
+
+        # stream over all blobs, move only filtered and delete other blobs - listing of further pages overlaps with
+        # moving, the number of blobs in flight is bounded by the window
+        logger.info(f'moving blobs with {options.workers} workers (window: {options.window}, '
+                    f'schedule: {options.schedule})')
+        journal = None
+        if options.journal_dir:
+            journal = MoveJournal.open(options.journal_dir, organization, src_space, dst_space, root_dir,
+                                       shard.index if shard is not None else None)
+        existing = None
+        deduplicator = None
+        if options.incremental or options.dedup:
+            dst_read_sas = _get_sas_token(os.environ['READ_ENDPOINT'], access_token, organization, dst_space)
+            dst_read_client = ContainerClient.from_container_url(
+                f'{_get_storage_url(organization, dst_space)}?{dst_read_sas}')
+            if options.incremental:
+                existing = _list_existing(dst_read_client, root_dir)
+            if options.dedup:
+                deduplicator = Deduplicator(dst_read_client, ContainerClient.from_container_url(
+                    f'{_get_storage_url(organization, dst_space)}?{upload_sas}'), root_dir, metrics, options.workers)
+        mover = BlobMover(_get_storage_url(organization, src_space), _get_storage_url(organization, dst_space),
+                          delete_sas, upload_sas, options, journal, metrics)
+        completed = False
+        rejected = RejectedFiles(options.rejected_file, blacklist, whitelist)
+        # checks for duplicates run concurrently - at most a window of blobs is being checked
+        checks = {}
+        try:
+            try:
+                # source-blobs of duplicates are deleted once their references have been recorded
+                duplicates = []
+
+                def _dispatch_checked(done):
+                    for future in done:
+                        checked = checks.pop(future)
+                        if future.result():
+                            duplicates.append(checked)
+                        else:
+                            mover.submit(checked, True)
+
+                if shard is not None and shard.blobs is not None:
+                    blobs = _shard_blobs(shard, metrics)
+                else:
+                    blobs = _iter_blobs(source_container_client, root_dir, shard_names, metrics)
+                if options.schedule == SCHEDULE_LARGEST_FIRST:
+                    blobs = largest_first(blobs, options.schedule_buffer, lambda blob: blob.size)
+                for blob in blobs:
+                    move = blob_filter.passes(blob.name)
+                    if not move:
+                        metrics.blobs_rejected.inc()
+                        rejected.add(blob.name)
+                    elif existing is not None and _is_present(blob, existing.get(blob.name), src_space):
+                        logger.debug(f'{blob.name} is already present in {dst_space} - deleting only')
+                        metrics.blobs_skipped.inc()
+                        move = False
+                    elif deduplicator is not None:
+                        if blob.name == deduplicator.manifest_name:
+                            raise ValueError(f'{blob.name} is reserved for the manifest of deduplicated blobs')
+                        checks[deduplicator.submit(blob)] = blob
+                        if len(checks) >= options.window:
+                            _dispatch_checked(wait(checks, return_when=FIRST_COMPLETED).done)
+                        continue
+                    mover.submit(blob, move)
+                _dispatch_checked(wait(checks).done)
+                if duplicates:
+                    deduplicator.write_manifest()
+                    for blob in duplicates:
+                        mover.submit(blob, False)
+            finally:
+                # blobs in flight are handled in any case, so the journal stays consistent
+                try:
+                    mover.join()
+                finally:
+                    if deduplicator is not None:
+                        deduplicator.close()
+                        # blobs still being checked have not been moved
+                        deduplicator.save_index({**mover.failures, **{blob.name: None for blob in checks.values()}})
+            completed = True
+        finally:
+            rejected.close()
+            if journal is not None:
+                journal.close(completed)
+
+    def list_blobs(self, access_token: str, organization: str, space: str, root_dir: str):
+        read_sas = _get_sas_token(os.environ['READ_ENDPOINT'], access_token, organization, space)
+        container_client = ContainerClient.from_container_url(f'{_get_storage_url(organization, space)}?{read_sas}')
+        for page in iter_blob_pages(container_client, root_dir + "/"):
+            for blob in page:
+                yield blob.name, blob.size
+
+    def list_entries(self, access_token: str, organization: str, space: str, root_dir: str):
+        read_sas = _get_sas_token(os.environ['READ_ENDPOINT'], access_token, organization, space)
+        container_client = ContainerClient.from_container_url(f'{_get_storage_url(organization, space)}?{read_sas}')
+        for page in iter_blob_pages(container_client, root_dir + "/", include=['metadata']):
+            for blob in page:
+                yield _blob_entry(blob)
+
+    def supports_rename(self, access_token: str, organization: str, space: str, root_dir: str) -> bool:
+        read_sas = _get_sas_token(os.environ['READ_ENDPOINT'], access_token, organization, space)
+        return _is_hns_directory(organization, space, root_dir, read_sas)
+
+
+def _iter_blobs(container_client: ContainerClient, root_dir: str, shard_names: frozenset, metrics: MoveMetrics):
+    """
+    Streams all blobs of root_dir (including metadata) in listing-order
+    :param container_client: client of the container to list the blobs from
+    :param root_dir: The root-directory
+    :param shard_names: only blobs of this set are returned (None for all blobs)
+    :param metrics: metrics to record listed blobs in
+    :return: iterator over the blobs
+    """
+    count = 0
+    for page in iter_blob_pages(container_client, root_dir + "/", include=['metadata']):
+        if shard_names is not None:
+            page = [blob for blob in page if blob.name in shard_names]
+        metrics.blobs_listed.inc(len(page))
+        count += len(page)
+        yield from page
+    logger.info(f'listed {count} blobs')
+
+
+def _shard_blobs(shard: MoveShard, metrics: MoveMetrics):
+    """
+    Streams the blobs of a shard as listed when planning the move
+    :param shard: the shard
+    :param metrics: metrics to record listed blobs in
+    :return: iterator over the blobs
+    """
+    metrics.blobs_listed.inc(len(shard.blobs))
+    logger.info(f'moving {len(shard.blobs)} blobs of shard {shard.index} as planned')
+    return (_blob_from_entry(entry) for entry in shard.blobs)
+
+
+def _blob_entry(blob: BlobProperties) -> dict:
+    """
+    Converts listed blob-properties to an entry of a shard-manifest
+    :param blob: the blob-properties (listed including metadata)
+    :return: json-serializable dict of the properties required to move the blob
+    """
+    content_settings = blob.content_settings
+    content_md5 = content_settings.content_md5 if content_settings else None
+    return {
+        'name': blob.name,
+        'size': blob.size,
+        'blobType': blob.blob_type.value if isinstance(blob.blob_type, BlobType) else blob.blob_type,
+        'lastModified': blob.last_modified.isoformat() if blob.last_modified else None,
+        'creationTime': blob.creation_time.isoformat() if blob.creation_time else None,
+        'metadata': blob.metadata,
+        'contentSettings': {
+            'contentType': content_settings.content_type,
+            'contentEncoding': content_settings.content_encoding,
+            'contentLanguage': content_settings.content_language,
+            'contentDisposition': content_settings.content_disposition,
+            'cacheControl': content_settings.cache_control,
+            'contentMd5': base64.b64encode(bytes(content_md5)).decode('ascii') if content_md5 else None
+        } if content_settings else None
+    }
+
+
+def _blob_from_entry(entry: dict) -> BlobProperties:
+    """
+    Restores the blob-properties of an entry of a shard-manifest
+    :param entry: the entry (see _blob_entry)
+    :return: the blob-properties
+    """
+    blob = BlobProperties()
+    blob.name = entry['name']
+    blob.size = entry['size']
+    blob.blob_type = BlobType(entry['blobType']) if entry['blobType'] else None
+    blob.last_modified = datetime.datetime.fromisoformat(entry['lastModified']) if entry['lastModified'] else None
+    blob.creation_time = datetime.datetime.fromisoformat(entry['creationTime']) if entry['creationTime'] else None
+    blob.metadata = entry['metadata']
+    settings = entry['contentSettings']
+    if settings is not None:
+        content_md5 = settings['contentMd5']
+        blob.content_settings = ContentSettings(
+            content_type=settings['contentType'], content_encoding=settings['contentEncoding'],
+            content_language=settings['contentLanguage'], content_disposition=settings['contentDisposition'],
+            cache_control=settings['cacheControl'],
+            content_md5=bytearray(base64.b64decode(content_md5)) if content_md5 else None)
+    return blob
+
+
+def _list_existing(container_client: ContainerClient, root_dir: str) -> dict:
+    """
+    Lists the blobs of root_dir that are already present at the destination
+    :param container_client: client of the destination-container (with read-permission)
+    :param root_dir: The root-directory
+    :return: blob-names mapped to tuples of size, content-md5, copy-source (path) and copy-completion-time
+    """
+    existing = {}
+    for page in iter_blob_pages(container_client, root_dir + "/", include=['copy']):
+        for blob in page:
+            content_md5 = blob.content_settings.content_md5 if blob.content_settings else None
+            copy_source = None
+            if blob.copy is not None and blob.copy.status == 'success' and blob.copy.source:
+                copy_source = urllib.parse.unquote(urllib.parse.urlparse(blob.copy.source).path)
+            existing[blob.name] = (blob.size, bytes(content_md5) if content_md5 else None, copy_source,
+                                   blob.copy.completion_time if copy_source else None)
+    logger.info(f'{len(existing)} blobs already present at destination')
+    return existing
+
+
+def _is_present(blob: BlobProperties, existing: tuple, src_space: str) -> bool:
+    """
+    Checks whether a source-blob is already present at the destination - sizes have to match and either the
+    content-md5 (copied along with the blob-properties) or, if the blob has no content-md5, the destination has to be
+    a completed server-side copy of the unchanged source-blob. ETags differ between source and destination and are
+    thus no identity.
+    :param blob: the source-blob
+    :param existing: the destination-blob as listed by _list_existing (None if not present)
+    :param src_space: The source-space
+    :return: True if the copy may be skipped
+    """
+    if existing is None:
+        return False
+    size, content_md5, copy_source, copy_completion_time = existing
+    if size != blob.size:
+        return False
+    src_md5 = blob.content_settings.content_md5 if blob.content_settings else None
+    if src_md5 and content_md5:
+        return bytes(src_md5) == content_md5
+    return copy_source == f'/{src_space}/{blob.name}' and blob.last_modified <= copy_completion_time
+
+
+def _is_hns_directory(organization: str, container: str, root_dir: str, sas: str) -> bool:
+    """
+    Checks whether root_dir is an actual directory, which is only the case for storage-accounts with hierarchical
+    namespace (ADLS Gen2) - blob-api exposes those as blob with metadata 'hdi_isfolder'
+    :param organization: The organization-name
+    :param container: The container-name
+    :param root_dir: The root-directory
+    :param sas: Shared Access Token with read-permission
+    :return: True if root_dir is a directory that may be renamed
+    """
+    blob_client = BlobClient.from_blob_url(
+        f'{_get_storage_url(organization, container)}/{urllib.parse.quote(root_dir)}?{sas}')
+    try:
+        props = blob_client.get_blob_properties()
+    except ResourceNotFoundError:
+        return False
+    return _is_directory(props)
+
+
+def _is_directory(blob: BlobProperties) -> bool:
+    """
+    Checks whether a blob is the marker of a directory (storage-accounts with hierarchical namespace only) - requires
+    metadata to be included in the listing
+    :param blob: the blob-properties
+    :return: True if the blob is a directory
+    """
+    return (blob.metadata or {}).get('hdi_isfolder', '').lower() == 'true'
+
+
+def _delete_rejected(container_client: ContainerClient, organization: str, container: str, root_dir: str,
+                     blob_filter: BlobFilter, delete_sas: str, workers: int, metrics: MoveMetrics,
+                     rejected: RejectedFiles):
+    """
+    Deletes all blobs of root_dir that do not pass the filter-criteria in batches (falling back to single deletes if
+    the Blob Batch API is not available) - directories are not subject to the filter-criteria and remain part of
+    root_dir
+    :param container_client: client of the container to list the blobs from
+    :param organization: The organization-name
+    :param container: The container-name
+    :param root_dir: The root-directory
+    :param blob_filter: the filter-criteria
+    :param delete_sas: Shared Access Token with delete-permission
+    :param workers: number of concurrent deletes
+    :param metrics: metrics to record listed, rejected and deleted blobs in
+    :param rejected: collects the rejected blobs
+    :raises MoveError: if at least one rejected blob could not be deleted
+    """
+    delete_client = ContainerClient.from_container_url(f'{_get_storage_url(organization, container)}?{delete_sas}')
+    failures = {}
+
+    def _on_deleted(blob_name: str, error: Exception = None):
+        if error is None:
+            metrics.blobs_deleted.inc()
+        else:
+            failures[blob_name] = error
+
+    # leaving the executor waits for all batches (including their fallback to single deletes)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        deleter = BatchDeleter(delete_client, executor, AdaptiveLimiter(workers, workers), _on_deleted)
+        for page in iter_blob_pages(container_client, root_dir + "/", include=['metadata']):
+            metrics.blobs_listed.inc(len(page))
+            for blob in page:
+                if not _is_directory(blob) and not blob_filter.passes(blob.name):
+                    rejected.add(blob.name)
+                    metrics.blobs_rejected.inc()
+                    deleter.add(blob.name)
+        deleter.flush()
+    if failures:
+        raise MoveError(failures)
+
+
+def _rename_directory(organization: str, src_space: str, dst_space: str, root_dir: str, delete_sas: str,
+                      upload_sas: str):
+    """
+    Moves root_dir with a single rename-operation
+    :param organization: The organization-name
+    :param src_space: The source-space
+    :param dst_space: The target-space
+    :param root_dir: The root-directory
+    :param delete_sas: Shared Access Token with delete-permission on the source-space
+    :param upload_sas: Shared Access Token with upload-permission on the target-space
+    """
+    logger.info(f'renaming {root_dir} from {src_space} to {dst_space}')
+    directory_client = DataLakeDirectoryClient(_get_dfs_url(organization), src_space, root_dir, credential=delete_sas)
+    directory_client.rename_directory(f'{dst_space}/{root_dir}?{upload_sas}')
 
 
 def _get_storage_url(organization: str, container: str):
@@ -86,6 +403,15 @@ def _get_storage_url(organization: str, container: str):
     return f'https://{organization}.blob.core.windows.net/{container}'
 
 
+def _get_dfs_url(organization: str):
+    """
+    Generates url of the data-lake-endpoint (only available for storage-accounts with hierarchical namespace)
+    :param organization: The organization-name
+    :return: data-lake-url
+    """
+    return f'https://{organization}.dfs.core.windows.net'
+
+
 def _get_sas_token(endpoint: str, access_token: str, organization: str, container: str):
     if 'api/v1.0' in endpoint:
         return _get_sas_token_v1(endpoint, access_token, organization, container)
@@ -142,46 +468,3 @@ def _get_sas_token_v1(endpoint: str, access_token: str, organization: str, conta
     logger.info("got shared access signature")
 
     return response.text
-
-
-def filter_blobs(blobs: list[str], blacklist: str, whitelist: str) -> Union[set[str], list[str]]:
-    """
-    Filter blobs as follows:
-
-    - if whitelist is provided - remove blacklisted blobs from whitelisted blobs
-    - if no whitelist, but blacklist is provided - remove blacklisted blobs from original blob-list
-    - if neither whitelist nor blacklist is provided - use the original blob-list
-
-    :param blobs: the original blob-list
-    :param blacklist: the blacklist-wildcard
-    :param whitelist: the whitelist-wildcard
-    :return: the filtered blob-list
-    """
-
-    whitelisted = blobs
-    if whitelist:
-        whitelisted = file_filter(whitelist, blobs)
-    blacklisted = []
-    if blacklist:
-        blacklisted = file_filter(blacklist, blobs)
-
-    # if whitelist -> remove blacklist from whitelist
-    if whitelist:
-        return set(set(whitelisted) - set(blacklisted))
-    # if no whitelist, but blacklist -> remove blacklist from original blob-list
-    elif blacklist:
-        return set(set(blobs) - set(blacklisted))
-
-    return blobs
-
-
-def file_filter(wildcard: str, blobnames: list[str]) -> list[str]:
-    """
-    Filter blobnames by wildcard
-
-    :param wildcard: the wildcard
-    :param blobnames: the blob-names
-    :return: the filtered blobnames
-    """
-    pattern = wildcard2regex(wildcard)
-    return [blob for blob in blobnames if re.search(pattern, blob, re.IGNORECASE)]
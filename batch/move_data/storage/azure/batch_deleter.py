@@ -0,0 +1,109 @@
+#  ****************************************************************************
+#  @copyright 2023 e:fs TechHub GmbH (sdk@efs-techhub.com)
+#
+#  @license Apache v2.0
+#  
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  
+#      http://www.apache.org/licenses/LICENSE-2.0
+#  
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+import logging
+import threading
+from concurrent.futures import Executor
+from typing import Callable
+
+from azure.core.exceptions import ResourceNotFoundError
+from azure.storage.blob import ContainerClient
+
+from storage.azure.adaptive_limiter import AdaptiveLimiter
+
+logger = logging.getLogger('move_data')
+
+MAX_BATCH_SIZE = 256  # limit of sub-requests per Blob Batch request
+NOT_FOUND = 404
+
+
+class BatchDeleter:
+    def __init__(self, container_client: ContainerClient, executor: Executor, limiter: AdaptiveLimiter,
+                 on_deleted: Callable[[str, Exception], None], batch_size: int = MAX_BATCH_SIZE):
+        """
+        Collects blobs for deletion and deletes them via Blob Batch API. Sub-requests that fail are retried as single
+        deletes. Blobs that are not found count as deleted - e.g. deleted by a previous attempt of a resumed move.
+        :param container_client: client of the container the blobs are deleted from (with delete-permission)
+        :param executor: the executor the batch-requests are run on
+        :param limiter: the limiter of concurrent requests
+        :param on_deleted: called with blob-name and error (None on success) for each blob
+        :param batch_size: number of blobs deleted per batch-request (at most 256)
+        """
+        if not 0 < batch_size <= MAX_BATCH_SIZE:
+            raise ValueError(f'batch_size must be between 1 and {MAX_BATCH_SIZE} (got {batch_size})')
+        self._container_client = container_client
+        self._executor = executor
+        self._limiter = limiter
+        self._on_deleted = on_deleted
+        self._batch_size = batch_size
+        self._lock = threading.Lock()
+        self._buffer = []
+
+    def add(self, blob_name: str):
+        """
+        Queues a blob for deletion - a batch is sent as soon as batch_size blobs are queued
+        :param blob_name: the blob-name
+        """
+        with self._lock:
+            self._buffer.append(blob_name)
+            if len(self._buffer) < self._batch_size:
+                return
+            batch, self._buffer = self._buffer, []
+        self._executor.submit(self._delete_batch, batch)
+
+    @property
+    def pending(self) -> int:
+        """
+        Number of blobs queued for deletion, that have not been sent yet
+        """
+        with self._lock:
+            return len(self._buffer)
+
+    def flush(self):
+        """
+        Sends the remaining queued blobs, even if the batch is not full
+        """
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        if batch:
+            self._executor.submit(self._delete_batch, batch)
+
+    def _delete_batch(self, blob_names: list[str]):
+        logger.debug(f'deleting {len(blob_names)} files via batch-request')
+        try:
+            responses = list(self._limiter.call(self._container_client.delete_blobs, *blob_names,
+                                                raise_on_any_failure=False))
+        except Exception as e:
+            logger.warning(f'batch-delete of {len(blob_names)} files failed ({e}) - falling back to single deletes')
+            responses = [None] * len(blob_names)
+
+        for blob_name, response in zip(blob_names, responses):
+            if response is not None and (200 <= response.status_code < 300 or response.status_code == NOT_FOUND):
+                self._on_deleted(blob_name, None)
+            else:
+                self._delete_single(blob_name)
+
+    def _delete_single(self, blob_name: str):
+        logger.debug(f'deleting file {blob_name}')
+        try:
+            self._limiter.call(self._container_client.delete_blob, blob_name)
+        except ResourceNotFoundError:
+            logger.debug(f'{blob_name} has already been deleted')
+        except Exception as e:
+            self._on_deleted(blob_name, e)
+            return
+        self._on_deleted(blob_name, None)
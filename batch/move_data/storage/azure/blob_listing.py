@@ -0,0 +1,73 @@
+#  ****************************************************************************
+#  @copyright 2023 e:fs TechHub GmbH (sdk@efs-techhub.com)
+#
+#  @license Apache v2.0
+#  
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  
+#      http://www.apache.org/licenses/LICENSE-2.0
+#  
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+import queue
+import threading
+from typing import Iterator
+
+from azure.storage.blob import BlobProperties, ContainerClient
+
+PAGE_SIZE = 5000  # maximum number of blobs per List Blobs request
+PREFETCH_PAGES = 2
+
+_END = object()
+
+
+def iter_blob_pages(container_client: ContainerClient, prefix: str, include: list[str] = None,
+                    prefetch: int = PREFETCH_PAGES) -> Iterator[list[BlobProperties]]:
+    """
+    Lists the blobs page by page. Pages are fetched in the background, so the next pages are already requested while
+    the current one is being processed - at most prefetch pages are buffered.
+    :param container_client: the container-client
+    :param prefix: the prefix the blob-names start with
+    :param include: additional datasets to include in the listing (e.g. 'metadata')
+    :param prefetch: number of pages fetched ahead
+    :return: generator of pages (lists of blob-properties)
+    """
+    pages = queue.Queue(maxsize=prefetch)
+    stop = threading.Event()
+
+    def _put(item) -> bool:
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _fetch():
+        try:
+            for page in container_client.list_blobs(name_starts_with=prefix, include=include,
+                                                   results_per_page=PAGE_SIZE).by_page():
+                if not _put(list(page)):
+                    return
+            _put(_END)
+        except Exception as e:
+            _put(e)
+
+    threading.Thread(target=_fetch, name='blob-listing', daemon=True).start()
+    try:
+        while True:
+            item = pages.get()
+            if item is _END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
@@ -0,0 +1,226 @@
+#  ****************************************************************************
+#  @copyright 2023 e:fs TechHub GmbH (sdk@efs-techhub.com)
+#
+#  @license Apache v2.0
+#  
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  
+#      http://www.apache.org/licenses/LICENSE-2.0
+#  
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from azure.storage.blob import BlobClient, BlobProperties, BlobType
+
+from storage.azure.adaptive_limiter import AdaptiveLimiter
+from storage.azure.batch_deleter import BatchDeleter
+from storage.azure.block_copy import copy_in_blocks
+from storage.azure.client_factory import ClientFactory
+from storage.azure.copy_tracker import CopyTracker
+from storage.azure.copy_verifier import CopyVerifier
+from storage.move_journal import MoveJournal
+from storage.move_metrics import MoveMetrics
+from storage.move_options import VERIFY_OFF, MoveOptions
+from storage.storageaccess import MoveError
+
+logger = logging.getLogger('move_data')
+
+METHOD_SYNC = 'sync'
+METHOD_BLOCK = 'block'
+METHOD_ASYNC = 'async'
+
+
+class BlobMover:
+    def __init__(self, src_container_url: str, dst_container_url: str, delete_sas: str, upload_sas: str,
+                 options: MoveOptions, journal: MoveJournal = None, metrics: MoveMetrics = None):
+        """
+        Moves blobs between two containers. Small block-blobs are copied synchronously (Put Blob From URL), very large
+        block-blobs are copied by staging their blocks in parallel (Put Block From URL), all other copies are started
+        concurrently and their status is polled by a shared CopyTracker. Each source-blob is queued for (batched)
+        deletion as soon as its copy succeeded and has been verified.
+        :param src_container_url: url of the source-container (without SAS)
+        :param dst_container_url: url of the destination-container (without SAS)
+        :param delete_sas: Shared Access Token with delete-permission on the source-container
+        :param upload_sas: Shared Access Token with upload-permission on the destination-container
+        :param options: tuning-options - workers/max_workers (initial/maximum concurrent requests), window (maximum
+            number of blobs in flight), sync_copy_threshold, block-copy-settings and verify
+        :param journal: journal to record confirmed copies and deletions in (optional)
+        :param metrics: metrics to record copies, deletions and failures in (optional)
+        """
+        self._src_container_url = src_container_url
+        self._dst_container_url = dst_container_url
+        self._delete_sas = delete_sas
+        self._upload_sas = upload_sas
+        self._window = options.window
+        self._sync_copy_threshold = options.sync_copy_threshold
+        self._block_copy_threshold = options.block_copy_threshold
+        self._block_size = options.block_size
+        self._block_executor = ThreadPoolExecutor(max_workers=options.block_parallelism)
+        self._journal = journal
+        self._metrics = metrics or MoveMetrics()
+        # requests are limited by the limiter - the executor only bounds the limit
+        self._limiter = AdaptiveLimiter(options.workers, options.max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=options.max_workers)
+        # all clients share one pool of connections - sized to the maximum number of concurrent requests
+        self._clients = ClientFactory(options.max_workers + options.block_parallelism,
+                                      raw_response_hook=self._observe_response)
+        self._tracker = CopyTracker(self._executor, self._limiter)
+        # ranges are hashed on the block-executor, as verifications wait for them on the executor
+        self._verifier = CopyVerifier(options.verify, self._block_executor, self._limiter) \
+            if options.verify != VERIFY_OFF else None
+        self._deleter = BatchDeleter(self._clients.container_client(src_container_url, delete_sas), self._executor,
+                                     self._limiter, self._finish)
+        self._condition = threading.Condition()
+        self._outstanding = 0
+        self._copying = 0
+        self._failures = {}
+
+    def submit(self, blob: BlobProperties, move: bool):
+        """
+        Schedules a blob for moving
+        :param blob: the blob as listed
+        :param move: whether the blob should be copied before deletion (False if it did not pass the filter-criteria)
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._outstanding < self._window or self._deletions_idle())
+            saturated = self._outstanding >= self._window
+        if saturated:
+            # window is exhausted and no batch is being deleted - send the queued blobs instead of waiting for the
+            # batch to be filled up, so copies don't run in lockstep with the deletion of whole windows
+            self._deleter.flush()
+        blob_name = blob.name
+        if move and self._journal is not None and self._journal.is_copied(blob_name):
+            logger.debug(f'{blob_name} has already been copied - deleting only')
+            move = False
+        with self._condition:
+            self._condition.wait_for(lambda: self._outstanding < self._window)
+            self._outstanding += 1
+            if move:
+                self._copying += 1
+        if move:
+            started_at = time.monotonic()
+            started = self._executor.submit(self._start_copy, blob)
+            started.add_done_callback(lambda f: self._on_copy_started(blob, started_at, f))
+        else:
+            self._deleter.add(blob_name)
+
+    @property
+    def failures(self) -> dict:
+        """
+        The blobs that could not be moved (so far) mapped to the error that occurred
+        """
+        with self._condition:
+            return dict(self._failures)
+
+    def join(self):
+        """
+        Waits until all submitted blobs are handled
+        :raises MoveError: if at least one blob could not be moved
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._copying == 0)
+        self._deleter.flush()
+        with self._condition:
+            self._condition.wait_for(lambda: self._outstanding == 0)
+        self._tracker.close()
+        self._metrics.copy_polls.inc(self._tracker.polls)
+        self._executor.shutdown()
+        self._block_executor.shutdown()
+        self._clients.close()
+        logger.info(f'final concurrency-limit: {self._limiter.limit}')
+        if self._failures:
+            raise MoveError(self._failures)
+
+    def _src_blob_client(self, blob_name: str) -> BlobClient:
+        return self._clients.blob_client(self._src_container_url, self._delete_sas, blob_name)
+
+    def _dst_blob_client(self, blob_name: str) -> BlobClient:
+        return self._clients.blob_client(self._dst_container_url, self._upload_sas, blob_name)
+
+    def _observe_response(self, response):
+        self._limiter.observe(response)
+        self._metrics.observe_response(response)
+
+    def _start_copy(self, blob: BlobProperties):
+        src_blob_client = self._src_blob_client(blob.name)
+        dst_blob_client = self._dst_blob_client(blob.name)
+        logger.debug(f'copying file from {src_blob_client.url} to {dst_blob_client.url}')
+        if blob.blob_type == BlobType.BlockBlob and blob.size < self._sync_copy_threshold:
+            # completes within the request - no copy-job to track
+            self._limiter.call(dst_blob_client.upload_blob_from_url, src_blob_client.url, overwrite=True,
+                               metadata=blob.metadata)
+            return dst_blob_client, 'success', METHOD_SYNC
+        if blob.blob_type == BlobType.BlockBlob and 0 < self._block_copy_threshold <= blob.size:
+            copy_in_blocks(src_blob_client.url, dst_blob_client, blob, self._block_size, self._block_executor,
+                           self._limiter)
+            return dst_blob_client, 'success', METHOD_BLOCK
+        copy = self._limiter.call(dst_blob_client.start_copy_from_url, src_blob_client.url)
+        return dst_blob_client, copy['copy_status'], METHOD_ASYNC
+
+    def _on_copy_started(self, blob: BlobProperties, started_at: float, started: Future):
+        if started.exception():
+            self._copy_done(blob.name, started.exception())
+            return
+        dst_blob_client, copy_status, method = started.result()
+        copied = self._tracker.track(blob.name, dst_blob_client, copy_status)
+        copied.add_done_callback(lambda f: self._on_copied(blob, dst_blob_client, method, started_at, f))
+
+    def _on_copied(self, blob: BlobProperties, dst_blob_client: BlobClient, method: str, started_at: float,
+                   copied: Future):
+        if copied.exception() is not None:
+            self._copy_done(blob.name, copied.exception())
+            return
+        self._metrics.blobs_copied.labels(method=method).inc()
+        self._metrics.bytes_copied.inc(blob.size)
+        self._metrics.copy_duration.labels(method=method).observe(time.monotonic() - started_at)
+        if self._verifier is None:
+            self._copy_done(blob.name)
+            return
+        # verifications run concurrently - the source is deleted (in batches) as soon as its copy is verified
+        verified = self._executor.submit(self._verifier.verify, blob, self._src_blob_client(blob.name),
+                                         dst_blob_client, copied.result(), method == METHOD_BLOCK)
+        verified.add_done_callback(lambda f: self._on_verified(blob.name, f))
+
+    def _on_verified(self, blob_name: str, verified: Future):
+        if verified.exception() is None:
+            self._metrics.blobs_verified.labels(method=verified.result()).inc()
+        self._copy_done(blob_name, verified.exception())
+
+    def _copy_done(self, blob_name: str, error: Exception = None):
+        if error is None:
+            if self._journal is not None:
+                self._journal.copied(blob_name)
+            self._deleter.add(blob_name)
+        else:
+            self._finish(blob_name, error)
+        with self._condition:
+            self._copying -= 1
+            self._condition.notify_all()
+
+    def _deletions_idle(self) -> bool:
+        # all blobs in flight, that are not being copied, are queued for deletion - none is being deleted
+        pending = self._deleter.pending
+        return pending > 0 and self._outstanding - self._copying == pending
+
+    def _finish(self, blob_name: str, error: Exception = None):
+        with self._condition:
+            if error is not None:
+                logger.error(f'moving file {blob_name} failed: {error}')
+                self._failures[blob_name] = error
+                self._metrics.blobs_failed.inc()
+            else:
+                self._metrics.blobs_deleted.inc()
+                if self._journal is not None:
+                    self._journal.deleted(blob_name)
+            self._outstanding -= 1
+            self._condition.notify_all()
@@ -0,0 +1,77 @@
+#  ****************************************************************************
+#  @copyright 2023 e:fs TechHub GmbH (sdk@efs-techhub.com)
+#
+#  @license Apache v2.0
+#  
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  
+#      http://www.apache.org/licenses/LICENSE-2.0
+#  
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+import logging
+from concurrent.futures import Executor
+
+from azure.core.exceptions import ResourceNotFoundError
+from azure.storage.blob import BlobBlock, BlobClient, BlobProperties
+
+from storage.azure.adaptive_limiter import AdaptiveLimiter
+
+logger = logging.getLogger('move_data')
+
+MAX_BLOCKS = 50000  # maximum number of blocks of a block-blob
+
+
+def copy_in_blocks(src_url: str, dst_blob_client: BlobClient, blob: BlobProperties, block_size: int,
+                   executor: Executor, limiter: AdaptiveLimiter):
+    """
+    Copies a block-blob by staging its ranges in parallel (Put Block From URL) and committing the block-list
+    afterwards. Block-ids are derived from block-size and index, so blocks that have been staged by an interrupted
+    copy are not staged again.
+    :param src_url: url of the source-blob (with SAS)
+    :param dst_blob_client: client of the destination-blob
+    :param blob: the source-blob as listed
+    :param block_size: size of each block in bytes (increased if the blob would exceed the maximum number of blocks)
+    :param executor: the executor the blocks are staged on
+    :param limiter: the limiter of concurrent requests
+    """
+    block_size = max(block_size, -(-blob.size // MAX_BLOCKS))
+    ranges = [(_block_id(block_size, index), offset, min(block_size, blob.size - offset))
+              for index, offset in enumerate(range(0, blob.size, block_size))]
+
+    staged = limiter.call(_get_uncommitted_blocks, dst_blob_client)
+    missing = [(block_id, offset, length) for block_id, offset, length in ranges if staged.get(block_id) != length]
+    logger.debug(f'copying {blob.name} in {len(ranges)} blocks ({len(ranges) - len(missing)} already staged)')
+
+    futures = [executor.submit(limiter.call, dst_blob_client.stage_block_from_url, block_id, src_url,
+                               source_offset=offset, source_length=length) for block_id, offset, length in missing]
+    for future in futures:
+        future.result()
+
+    limiter.call(dst_blob_client.commit_block_list, [BlobBlock(block_id) for block_id, _, _ in ranges],
+                 content_settings=blob.content_settings, metadata=blob.metadata)
+
+
+def _get_uncommitted_blocks(blob_client: BlobClient) -> dict[str, int]:
+    """
+    Returns the blocks that have been staged on the blob, but not committed yet
+    :param blob_client: the blob-client
+    :return: block-ids mapped to their size
+    """
+    try:
+        _, uncommitted = blob_client.get_block_list('uncommitted')
+    except ResourceNotFoundError:
+        # blob (and so any staged block) does not exist yet
+        return {}
+    return {block.id: block.size for block in uncommitted}
+
+
+def _block_id(block_size: int, index: int) -> str:
+    # all block-ids of a blob must have the same length - base64-encoding is done by the client
+    return f'{block_size:012d}-{index:06d}'
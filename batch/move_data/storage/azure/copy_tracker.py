@@ -0,0 +1,148 @@
+#  ****************************************************************************
+#  @copyright 2023 e:fs TechHub GmbH (sdk@efs-techhub.com)
+#
+#  @license Apache v2.0
+#  
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  
+#      http://www.apache.org/licenses/LICENSE-2.0
+#  
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Executor, Future
+
+from azure.storage.blob import BlobClient, BlobProperties
+
+from storage.azure.adaptive_limiter import AdaptiveLimiter
+
+logger = logging.getLogger('move_data')
+
+INITIAL_POLL_DELAY = 0.05
+MAX_POLL_DELAY = 10.0
+BACKOFF_FACTOR = 2.0
+
+
+class CopyFailedError(Exception):
+    def __init__(self, blob_name: str, status: str, description: str = None):
+        """
+        Raised if a server-side copy ended with status 'failed' or 'aborted'
+        :param blob_name: the blob-name
+        :param status: the final copy-status
+        :param description: the copy-status-description as reported by the service
+        """
+        super().__init__(f'copy of {blob_name} {status}: {description}')
+        self.blob_name = blob_name
+        self.status = status
+
+
+class CopyTracker:
+    def __init__(self, executor: Executor, limiter: AdaptiveLimiter, initial_delay: float = INITIAL_POLL_DELAY,
+                 max_delay: float = MAX_POLL_DELAY):
+        """
+        Tracks pending server-side copies. All copies that are due are polled together in one round (on the given
+        executor), each copy backs off exponentially from initial_delay up to max_delay between its polls.
+        :param executor: the executor the status-polls are run on
+        :param limiter: the limiter of concurrent requests
+        :param initial_delay: seconds until the first poll of a pending copy
+        :param max_delay: upper bound of seconds between two polls of the same copy
+        """
+        self._executor = executor
+        self._limiter = limiter
+        self._initial_delay = initial_delay
+        self._max_delay = max_delay
+        self._pending = []  # heap of (due, seq, blob_name, blob_client, delay, future)
+        self._seq = itertools.count()
+        self._condition = threading.Condition()
+        self._closed = False
+        self.polls = 0
+        self._thread = threading.Thread(target=self._run, name='copy-tracker', daemon=True)
+        self._thread.start()
+
+    def track(self, blob_name: str, dst_blob_client: BlobClient, copy_status: str,
+              description: str = None) -> Future:
+        """
+        Starts tracking a copy that has been started on dst_blob_client
+        :param blob_name: the blob-name
+        :param dst_blob_client: client of the destination-blob
+        :param copy_status: copy-status as returned when starting the copy
+        :param description: copy-status-description as returned when starting the copy
+        :return: future, that resolves to the properties of the destination-blob as polled (None if the copy did not
+            have to be polled) as soon as the copy succeeded - or fails with CopyFailedError
+        """
+        future = Future()
+        if copy_status == 'pending':
+            self._schedule(blob_name, dst_blob_client, self._initial_delay, future)
+        else:
+            _resolve(future, blob_name, copy_status, description)
+        return future
+
+    def close(self):
+        """
+        Stops polling - copies that are still pending are not resolved anymore
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+
+    def _schedule(self, blob_name: str, blob_client: BlobClient, delay: float, future: Future):
+        with self._condition:
+            heapq.heappush(self._pending,
+                           (time.monotonic() + delay, next(self._seq), blob_name, blob_client, delay, future))
+            self._condition.notify()
+
+    def _next_due(self) -> list:
+        """
+        Waits until at least one copy is due and takes all due copies off the heap
+        :return: the due copies - empty list if tracker has been closed
+        """
+        with self._condition:
+            while not self._closed:
+                now = time.monotonic()
+                if self._pending and self._pending[0][0] <= now:
+                    due = []
+                    while self._pending and self._pending[0][0] <= now:
+                        due.append(heapq.heappop(self._pending))
+                    return due
+                self._condition.wait(self._pending[0][0] - now if self._pending else None)
+            return []
+
+    def _run(self):
+        while True:
+            due = self._next_due()
+            if not due:
+                return
+            self.polls += len(due)
+            polls = [self._executor.submit(self._limiter.call, blob_client.get_blob_properties)
+                     for _, _, _, blob_client, _, _ in due]
+            for (_, _, blob_name, blob_client, delay, future), poll in zip(due, polls):
+                try:
+                    copy = poll.result().copy
+                except Exception as e:
+                    future.set_exception(e)
+                    continue
+                if copy.status == 'pending':
+                    logger.debug(f'copy-job of {blob_name} still pending ({copy.progress})')
+                    next_delay = min(delay * BACKOFF_FACTOR, self._max_delay)
+                    self._schedule(blob_name, blob_client, next_delay, future)
+                else:
+                    _resolve(future, blob_name, copy.status, copy.status_description, poll.result())
+
+
+def _resolve(future: Future, blob_name: str, copy_status: str, description: str = None,
+             properties: BlobProperties = None):
+    if copy_status == 'success':
+        future.set_result(properties)
+    else:
+        future.set_exception(CopyFailedError(blob_name, copy_status, description))
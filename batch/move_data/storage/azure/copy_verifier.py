@@ -0,0 +1,150 @@
+#  ****************************************************************************
+#  @copyright 2023 e:fs TechHub GmbH (sdk@efs-techhub.com)
+#
+#  @license Apache v2.0
+#  
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  
+#      http://www.apache.org/licenses/LICENSE-2.0
+#  
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+import hashlib
+import logging
+from collections import deque
+from concurrent.futures import Executor
+
+from azure.storage.blob import BlobClient, BlobProperties
+
+from storage.azure.adaptive_limiter import AdaptiveLimiter
+from storage.move_options import VERIFY_AUTO, VERIFY_CHECKSUM
+from storage.storageaccess import VerificationError
+
+logger = logging.getLogger('move_data')
+
+RANGE_SIZE = 64 * 1024 * 1024
+CONTENT_RANGE_SIZE = 8 * 1024 * 1024  # ranges of the destination are downloaded in parallel, but hashed in order
+CONTENT_PREFETCH = 8
+CONTENT_THRESHOLD = 64 * 1024 * 1024  # mode 'auto' verifies the content of blobs up to this size
+
+VERIFIED_PROPERTIES = 'properties'
+VERIFIED_CONTENT = 'content'
+VERIFIED_RANGES = 'ranges'
+VERIFIED_SIZE = 'size'
+
+
+class CopyVerifier:
+    def __init__(self, mode: str, executor: Executor, limiter: AdaptiveLimiter, range_size: int = RANGE_SIZE,
+                 content_threshold: int = CONTENT_THRESHOLD):
+        """
+        Verifies copies before their source is deleted. The service sets the content-md5 of a copy from the source, so
+        comparing the properties of source and destination only proves their consistency, not the content. Verifying
+        the content computes the md5 of the destination against the content-md5 of the source (without content-md5,
+        md5-hashes of ranges of source and destination are compared, that are streamed in parallel). The content is
+        verified for blobs copied in blocks and - depending on mode - for all blobs ('checksum') or blobs up to
+        content_threshold ('auto'), otherwise size and content-md5 properties are compared ('properties').
+        :param mode: one of 'auto', 'checksum' and 'properties'
+        :param executor: the executor ranges are hashed on - must not be the executor verify is called on
+        :param limiter: the limiter of concurrent requests
+        :param range_size: size of a range (in bytes) that is hashed by a single request
+        :param content_threshold: blobs up to this size (in bytes) are verified by content in mode 'auto'
+        """
+        self._mode = mode
+        self._executor = executor
+        self._limiter = limiter
+        self._range_size = range_size
+        self._content_threshold = content_threshold
+
+    def verify(self, blob: BlobProperties, src_blob_client: BlobClient, dst_blob_client: BlobClient,
+               dst_properties: BlobProperties = None, staged: bool = False) -> str:
+        """
+        Verifies that the destination-blob matches the source-blob
+        :param blob: the source-blob as listed
+        :param src_blob_client: client of the source-blob
+        :param dst_blob_client: client of the destination-blob
+        :param dst_properties: properties of the destination-blob, if already known (e.g. by polling the copy)
+        :param staged: whether the blob has been copied in blocks
+        :return: how the blob has been verified - 'content', 'ranges', 'properties' or 'size'
+        :raises VerificationError: if the destination does not match the source
+        """
+        if dst_properties is None:
+            dst_properties = self._limiter.call(dst_blob_client.get_blob_properties)
+        if dst_properties.size != blob.size:
+            raise VerificationError(blob.name, f'size {dst_properties.size} differs from {blob.size}')
+        src_md5 = _content_md5(blob)
+        if staged or self._mode == VERIFY_CHECKSUM or \
+                (self._mode == VERIFY_AUTO and blob.size <= self._content_threshold):
+            if src_md5:
+                if self._md5_of_blob(dst_blob_client, blob.size) != src_md5:
+                    raise VerificationError(blob.name, 'md5 of the content differs from content-md5 of the source')
+                return VERIFIED_CONTENT
+            self._compare_ranges(blob, src_blob_client, dst_blob_client)
+            return VERIFIED_RANGES
+        dst_md5 = _content_md5(dst_properties)
+        if src_md5 and dst_md5:
+            if src_md5 != dst_md5:
+                raise VerificationError(blob.name, 'content-md5 differs')
+            return VERIFIED_PROPERTIES
+        logger.warning(f'{blob.name} has no content-md5 - verified by size only')
+        return VERIFIED_SIZE
+
+    def _compare_ranges(self, blob: BlobProperties, src_blob_client: BlobClient, dst_blob_client: BlobClient):
+        ranges = [(offset, min(self._range_size, blob.size - offset))
+                  for offset in range(0, blob.size, self._range_size)]
+        hashes = [(self._executor.submit(self._hash_range, src_blob_client, offset, length),
+                   self._executor.submit(self._hash_range, dst_blob_client, offset, length))
+                  for offset, length in ranges]
+        try:
+            for (offset, length), (src_hash, dst_hash) in zip(ranges, hashes):
+                if src_hash.result() != dst_hash.result():
+                    raise VerificationError(blob.name, f'content differs within bytes {offset}-{offset + length - 1}')
+        finally:
+            for src_hash, dst_hash in hashes:
+                src_hash.cancel()
+                dst_hash.cancel()
+
+    def _md5_of_blob(self, blob_client: BlobClient, size: int) -> bytes:
+        md5 = hashlib.md5()
+        offsets = iter(range(0, size, CONTENT_RANGE_SIZE))
+        pending = deque()
+        try:
+            for offset in offsets:
+                pending.append(self._executor.submit(self._download_range, blob_client, offset,
+                                                     min(CONTENT_RANGE_SIZE, size - offset)))
+                # at most CONTENT_PREFETCH ranges are held in memory
+                if len(pending) >= CONTENT_PREFETCH:
+                    md5.update(pending.popleft().result())
+            while pending:
+                md5.update(pending.popleft().result())
+        finally:
+            for future in pending:
+                future.cancel()
+        return md5.digest()
+
+    def _download_range(self, blob_client: BlobClient, offset: int, length: int) -> bytes:
+        return self._limiter.call(_download_range, blob_client, offset, length)
+
+    def _hash_range(self, blob_client: BlobClient, offset: int, length: int) -> bytes:
+        return self._limiter.call(_md5_of_range, blob_client, offset, length)
+
+
+def _download_range(blob_client: BlobClient, offset: int, length: int) -> bytes:
+    return blob_client.download_blob(offset=offset, length=length).readall()
+
+
+def _md5_of_range(blob_client: BlobClient, offset: int, length: int) -> bytes:
+    md5 = hashlib.md5()
+    for chunk in blob_client.download_blob(offset=offset, length=length).chunks():
+        md5.update(chunk)
+    return md5.digest()
+
+
+def _content_md5(properties: BlobProperties) -> bytes:
+    content_settings = properties.content_settings
+    return bytes(content_settings.content_md5) if content_settings and content_settings.content_md5 else None
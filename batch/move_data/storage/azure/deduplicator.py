@@ -0,0 +1,209 @@
+#  ****************************************************************************
+#  @copyright 2023 e:fs TechHub GmbH (sdk@efs-techhub.com)
+#
+#  @license Apache v2.0
+#  
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  
+#      http://www.apache.org/licenses/LICENSE-2.0
+#  
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+import base64
+import json
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceExistsError, ResourceModifiedError, ResourceNotFoundError
+from azure.storage.blob import BlobProperties, ContainerClient
+
+from storage.content_index import ContentIndex
+from storage.move_metrics import MoveMetrics
+
+logger = logging.getLogger('move_data')
+
+INDEX_BLOB = '.dedup/content-index.gz'
+# reserved location within root_dir - the schema distinguishes the manifest from user-files
+MANIFEST_FILE = '.sdk/dedup.json'
+MANIFEST_SCHEMA = 'sdk-dedup-manifest/v1'
+MAX_SAVE_ATTEMPTS = 5
+
+
+class Deduplicator:
+    def __init__(self, read_container_client: ContainerClient, upload_container_client: ContainerClient,
+                 root_dir: str, metrics: MoveMetrics, workers: int = 1):
+        """
+        Detects blobs whose content is already present in the target-space, using a content-index of the space (stored
+        as blob). Instead of copying them again, a reference to the present blob is recorded in the manifest of the
+        dataset (.sdk/dedup.json within root_dir).
+        :param read_container_client: client of the target-container with read-permission
+        :param upload_container_client: client of the target-container with upload-permission
+        :param root_dir: The root-directory
+        :param metrics: metrics to record deduplicated blobs and bytes in
+        :param workers: number of concurrent checks of present blobs
+        """
+        self._read_container_client = read_container_client
+        self._upload_container_client = upload_container_client
+        self._manifest_name = f'{root_dir}/{MANIFEST_FILE}'
+        self._metrics = metrics
+        self._index, self._etag = self._load_index()
+        self._references, self._manifest_etag = self._load_references()
+        self._copied = {}
+        self._saved_bytes = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='dedup')
+        logger.info(f'loaded content-index of {len(self._index)} blobs')
+
+    @property
+    def manifest_name(self) -> str:
+        return self._manifest_name
+
+    def submit(self, blob: BlobProperties) -> Future:
+        """
+        Checks in the background whether the content of a blob is already present in the target-space (see
+        is_duplicate) - the properties of present blobs are requested concurrently
+        :param blob: the source-blob as listed
+        :return: future resolving to True if the blob does not need to be copied
+        """
+        return self._executor.submit(self.is_duplicate, blob)
+
+    def close(self):
+        """
+        Stops the background-checks
+        """
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def is_duplicate(self, blob: BlobProperties) -> bool:
+        """
+        Checks whether the content of a blob is already present in the target-space - and records a reference to it
+        if so. Blobs that are not present are added to the content-index as soon as they have been moved.
+        :param blob: the source-blob as listed
+        :return: True if the blob does not need to be copied
+        """
+        content_md5 = _content_md5(blob)
+        if not content_md5:
+            return False
+        with self._lock:
+            target = self._index.lookup(content_md5, blob.size)
+        if target is not None and target != blob.name:
+            properties = self._get_properties(target)
+            if properties is not None and properties.size == blob.size and _content_md5(properties) == content_md5:
+                self._record(blob, target, properties, content_md5)
+                logger.debug(f'{blob.name} is a duplicate of {target} - recording reference')
+                return True
+            logger.info(f'{target} is not present anymore - removing it from content-index')
+            with self._lock:
+                self._index.discard(content_md5, blob.size)
+        with self._lock:
+            self._copied[blob.name] = (content_md5, blob.size)
+        return False
+
+    def _record(self, blob: BlobProperties, target: str, properties: BlobProperties, content_md5: bytes):
+        with self._lock:
+            self._references[blob.name] = {
+                'name': blob.name,
+                'target': target,
+                'size': blob.size,
+                'contentMd5': base64.b64encode(content_md5).decode('ascii'),
+                'dateCreated': (properties.creation_time or blob.creation_time).isoformat()
+            }
+            self._saved_bytes += blob.size
+        self._metrics.blobs_deduplicated.inc()
+        self._metrics.bytes_deduplicated.inc(blob.size)
+
+    def write_manifest(self):
+        """
+        Writes the references of the dataset - has to be done before the source-blobs of duplicates are deleted
+        """
+        if not self._references:
+            return
+        references = self._references
+        # shards of a move write to the same manifest concurrently
+        for attempt in range(MAX_SAVE_ATTEMPTS):
+            manifest = {'schema': MANIFEST_SCHEMA,
+                        'references': sorted(references.values(), key=lambda reference: reference['name'])}
+            try:
+                self._upload(self._manifest_name, json.dumps(manifest).encode('utf-8'), self._manifest_etag)
+                break
+            except (ResourceExistsError, ResourceModifiedError):
+                logger.info(f'{self._manifest_name} has been modified concurrently - merging')
+                references, self._manifest_etag = self._load_references()
+                references.update(self._references)
+        else:
+            raise RuntimeError(f'{self._manifest_name} could not be written after {MAX_SAVE_ATTEMPTS} attempts')
+        logger.info(f'deduplicated {len(self._references)} blobs of {self._manifest_name.rsplit("/", 1)[0]} - '
+                    f'saved {self._saved_bytes} bytes in this run')
+
+    def save_index(self, failures: dict):
+        """
+        Adds all blobs moved in this run to the content-index - concurrent updates of other moves are merged
+        :param failures: blob-names that could not be moved
+        """
+        added = [(entry, name) for name, entry in self._copied.items() if name not in failures]
+        for attempt in range(MAX_SAVE_ATTEMPTS):
+            for (content_md5, size), name in added:
+                self._index.add(content_md5, size, name)
+            try:
+                self._upload(INDEX_BLOB, self._index.serialize(), self._etag)
+                logger.info(f'saved content-index of {len(self._index)} blobs')
+                return
+            except (ResourceExistsError, ResourceModifiedError):
+                logger.info('content-index has been modified concurrently - merging')
+                self._index, self._etag = self._load_index()
+        logger.warning(f'content-index could not be saved after {MAX_SAVE_ATTEMPTS} attempts - '
+                       f'{len(added)} blobs are not indexed')
+
+    def _upload(self, blob_name: str, data: bytes, etag: str):
+        # only succeeds if the blob has not been created or modified since it was read
+        if etag is None:
+            self._upload_container_client.upload_blob(blob_name, data, overwrite=False)
+        else:
+            self._upload_container_client.upload_blob(blob_name, data, overwrite=True, etag=etag,
+                                                      match_condition=MatchConditions.IfNotModified)
+
+    def _load_index(self) -> tuple:
+        try:
+            downloader = self._read_container_client.download_blob(INDEX_BLOB)
+        except ResourceNotFoundError:
+            return ContentIndex(), None
+        return ContentIndex.parse(downloader.readall()), downloader.properties.etag
+
+    def _load_references(self) -> tuple:
+        # references of a previous (failed) run have to be kept, as their source-blobs may be deleted already
+        try:
+            downloader = self._read_container_client.download_blob(self._manifest_name)
+        except ResourceNotFoundError:
+            return {}, None
+        manifest = json.loads(downloader.readall())
+        if not is_manifest(manifest):
+            raise ValueError(f'{self._manifest_name} is reserved for the manifest of deduplicated blobs')
+        return {reference['name']: reference for reference in manifest['references']}, downloader.properties.etag
+
+    def _get_properties(self, blob_name: str):
+        try:
+            return self._read_container_client.get_blob_client(blob_name).get_blob_properties()
+        except ResourceNotFoundError:
+            return None
+
+
+def is_manifest(manifest) -> bool:
+    """
+    Checks whether parsed JSON is a manifest of deduplicated blobs
+    :param manifest: the parsed JSON
+    :return: True if manifest is a manifest of deduplicated blobs
+    """
+    return isinstance(manifest, dict) and manifest.get('schema') == MANIFEST_SCHEMA \
+        and isinstance(manifest.get('references'), list)
+
+
+def _content_md5(properties: BlobProperties) -> bytes:
+    content_settings = properties.content_settings
+    return bytes(content_settings.content_md5) if content_settings and content_settings.content_md5 else None
@@ -0,0 +1,79 @@
+#  ****************************************************************************
+#  @copyright 2023 e:fs TechHub GmbH (sdk@efs-techhub.com)
+#
+#  @license Apache v2.0
+#  
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  
+#      http://www.apache.org/licenses/LICENSE-2.0
+#  
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+import gzip
+from typing import Optional
+
+
+class ContentIndex:
+    def __init__(self, entries: dict = None):
+        """
+        Index of the content of a space - blobs are identified by content-md5 and size, each content is mapped to the
+        name of one blob holding it
+        :param entries: tuples of content-md5 and size mapped to the blob-name
+        """
+        self._entries = entries if entries is not None else {}
+
+    @classmethod
+    def parse(cls, data: bytes):
+        """
+        Parses a serialized index - gzipped lines of hex-encoded content-md5, size and blob-name
+        :param data: the serialized index
+        :return: the index
+        """
+        entries = {}
+        for line in gzip.decompress(data).decode('utf-8').splitlines():
+            content_md5, size, name = line.split(' ', 2)
+            entries[(bytes.fromhex(content_md5), int(size))] = name
+        return cls(entries)
+
+    def serialize(self) -> bytes:
+        """
+        Serializes the index
+        :return: gzipped lines of hex-encoded content-md5, size and blob-name
+        """
+        lines = ''.join(f'{content_md5.hex()} {size} {name}\n' for (content_md5, size), name in self._entries.items())
+        return gzip.compress(lines.encode('utf-8'))
+
+    def lookup(self, content_md5: bytes, size: int) -> Optional[str]:
+        """
+        Looks up a blob with the given content
+        :param content_md5: the content-md5
+        :param size: the size in bytes
+        :return: name of the blob holding the content - None if not present
+        """
+        return self._entries.get((content_md5, size))
+
+    def add(self, content_md5: bytes, size: int, name: str):
+        """
+        Adds a blob to the index - existing entries of the same content are kept
+        :param content_md5: the content-md5
+        :param size: the size in bytes
+        :param name: the blob-name
+        """
+        self._entries.setdefault((content_md5, size), name)
+
+    def discard(self, content_md5: bytes, size: int):
+        """
+        Removes a content, whose blob does not exist anymore
+        :param content_md5: the content-md5
+        :param size: the size in bytes
+        """
+        self._entries.pop((content_md5, size), None)
+
+    def __len__(self):
+        return len(self._entries)
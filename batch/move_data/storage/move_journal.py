@@ -0,0 +1,116 @@
+#  ****************************************************************************
+#  @copyright 2023 e:fs TechHub GmbH (sdk@efs-techhub.com)
+#
+#  @license Apache v2.0
+#  
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  
+#      http://www.apache.org/licenses/LICENSE-2.0
+#  
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+import hashlib
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger('move_data')
+
+OP_COPIED = 'copied'
+OP_DELETED = 'deleted'
+
+
+class MoveJournal:
+    def __init__(self, path: str):
+        """
+        Append-only journal of a move. Each confirmed copy and each deletion of a source-blob is recorded as soon as it
+        happened, so a retried move may skip the copy of blobs that have already been copied.
+        :param path: path of the journal-file - entries of a previous (failed) run are loaded if it exists
+        """
+        self._path = path
+        self._lock = threading.Lock()
+        self._copied = set()
+        if os.path.exists(path):
+            self._load()
+            logger.info(f'resuming move from journal {path} - {len(self._copied)} blobs already copied')
+        self._file = open(path, 'a', encoding='utf-8')
+
+    @classmethod
+    def open(cls, journal_dir: str, organization: str, src_space: str, dst_space: str, root_dir: str,
+             shard: int = None):
+        """
+        Opens the journal of the given move within journal_dir (usually a mounted volume)
+        :param journal_dir: the directory journals are stored in
+        :param organization: The organization
+        :param src_space: The source-space
+        :param dst_space: The target-space
+        :param root_dir: The root-directory
+        :param shard: index of the shard, if only a shard of root_dir is moved
+        :return: the journal
+        """
+        move = f'{organization}/{src_space}/{dst_space}/{root_dir}'
+        suffix = ''
+        if shard is not None:
+            move += f'#{shard}'
+            suffix = f'_shard-{shard:04d}'
+        key = hashlib.sha1(move.encode('utf-8')).hexdigest()
+        os.makedirs(journal_dir, exist_ok=True)
+        return cls(os.path.join(journal_dir, f'{organization}_{src_space}_{dst_space}_{key}{suffix}.journal'))
+
+    def is_copied(self, blob_name: str) -> bool:
+        """
+        Checks whether the copy of the blob has been confirmed by a previous run
+        :param blob_name: the blob-name
+        :return: True if the blob only needs to be deleted from source
+        """
+        return blob_name in self._copied
+
+    def copied(self, blob_name: str):
+        """
+        Records that the copy of the blob has been confirmed
+        :param blob_name: the blob-name
+        """
+        self._append(OP_COPIED, blob_name)
+
+    def deleted(self, blob_name: str):
+        """
+        Records that the blob has been deleted from source
+        :param blob_name: the blob-name
+        """
+        self._append(OP_DELETED, blob_name)
+
+    def close(self, completed: bool):
+        """
+        Closes the journal
+        :param completed: whether the move completed - the journal is removed in that case
+        """
+        with self._lock:
+            self._file.close()
+        if completed:
+            os.remove(self._path)
+
+    def _append(self, op: str, blob_name: str):
+        line = json.dumps([op, blob_name]) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def _load(self):
+        with open(self._path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    op, blob_name = json.loads(line)
+                except ValueError:
+                    # last line may be incomplete if the previous run crashed while writing
+                    continue
+                if op == OP_COPIED:
+                    self._copied.add(blob_name)
+                elif op == OP_DELETED:
+                    self._copied.discard(blob_name)
@@ -0,0 +1,103 @@
+#  ****************************************************************************
+#  @copyright 2023 e:fs TechHub GmbH (sdk@efs-techhub.com)
+#
+#  @license Apache v2.0
+#  
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  
+#      http://www.apache.org/licenses/LICENSE-2.0
+#  
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+import logging
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, push_to_gateway, write_to_textfile
+
+logger = logging.getLogger('move_data')
+
+JOB = 'move_data'
+COPY_DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, 3600, float('inf'))
+NOT_RETRIED_STATUS_CODES = [501, 505]  # the storage-client retries 408 and all other 5xx
+
+
+class MoveMetrics:
+    def __init__(self):
+        """
+        Counters and histograms of a single move in a registry of its own, exported in Prometheus text-format - either
+        pushed to a pushgateway or written to a file (e.g. an argo-artifact). As a move is a one-shot job, throughput is
+        derived from the totals and move_duration_seconds (e.g. move_bytes_copied_total / move_duration_seconds).
+        """
+        self.registry = CollectorRegistry()
+        self.blobs_listed = Counter('move_blobs_listed', 'Blobs listed in rootDir', registry=self.registry)
+        self.blobs_rejected = Counter('move_blobs_rejected', 'Blobs that did not pass the filter-criteria',
+                                      registry=self.registry)
+        self.blobs_skipped = Counter('move_blobs_skipped', 'Blobs not copied as already present at the target-space',
+                                     registry=self.registry)
+        self.blobs_deduplicated = Counter('move_blobs_deduplicated', 'Blobs referenced instead of copied, as their '
+                                          'content is already present in the target-space', registry=self.registry)
+        self.bytes_deduplicated = Counter('move_bytes_deduplicated', 'Bytes not copied due to deduplication',
+                                          registry=self.registry)
+        self.blobs_copied = Counter('move_blobs_copied', 'Blobs copied to the target-space', ['method'],
+                                    registry=self.registry)
+        self.blobs_verified = Counter('move_blobs_verified', 'Copies verified before deleting the source', ['method'],
+                                      registry=self.registry)
+        self.blobs_deleted = Counter('move_blobs_deleted', 'Blobs deleted from the source-space',
+                                     registry=self.registry)
+        self.blobs_failed = Counter('move_blobs_failed', 'Blobs that could not be moved', registry=self.registry)
+        self.bytes_copied = Counter('move_bytes_copied', 'Bytes copied to the target-space', registry=self.registry)
+        self.copy_duration = Histogram('move_copy_duration_seconds', 'Duration from start to confirmation of a copy',
+                                       ['method'], buckets=COPY_DURATION_BUCKETS, registry=self.registry)
+        self.copy_polls = Counter('move_copy_polls', 'Status-polls of pending copies', registry=self.registry)
+        self.request_errors = Counter('move_request_errors', 'Storage-responses with a retryable error-status (per '
+                                      'attempt, including the last one)', ['status'], registry=self.registry)
+        self.directory_renames = Counter('move_directory_renames', 'Directories moved with a single rename',
+                                         registry=self.registry)
+        self.duration = Gauge('move_duration_seconds', 'Duration of the move', registry=self.registry)
+
+    def observe_response(self, response):
+        """
+        Counts responses with a status that the storage-client retries (408 and 5xx) - to be used as (part of)
+        'raw_response_hook', which is invoked for each attempt, so the last attempt of a request that is given up counts
+        as well
+        :param response: the pipeline-response of the storage-client
+        """
+        status_code = response.http_response.status_code
+        if status_code == 408 or (status_code >= 500 and status_code not in NOT_RETRIED_STATUS_CODES):
+            self.request_errors.labels(status=str(status_code)).inc()
+
+    @staticmethod
+    def total(counter: Counter) -> float:
+        """
+        Returns the current value of a counter - summed over all labels
+        :param counter: one of the counters of the metrics
+        :return: the value
+        """
+        return sum(sample.value for metric in counter.collect() for sample in metric.samples
+                   if sample.name.endswith('_total'))
+
+    def push(self, gateway: str, organization: str, space: str, shard: int = None):
+        """
+        Pushes the metrics to a pushgateway, grouped by organization and target-space (and shard of a sharded move)
+        :param gateway: url of the pushgateway
+        :param organization: The organization
+        :param space: The target-space
+        :param shard: index of the moved shard (optional)
+        """
+        grouping_key = {'organization': organization, 'space': space}
+        if shard is not None:
+            grouping_key['shard'] = str(shard)
+        push_to_gateway(gateway, job=JOB, registry=self.registry, grouping_key=grouping_key)
+        logger.info(f'pushed metrics to {gateway}')
+
+    def write(self, path: str):
+        """
+        Writes the metrics to a file
+        :param path: path of the file
+        """
+        write_to_textfile(path, self.registry)
+        logger.info(f'wrote metrics to {path}')
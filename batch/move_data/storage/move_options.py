@@ -0,0 +1,117 @@
+#  ****************************************************************************
+#  @copyright 2023 e:fs TechHub GmbH (sdk@efs-techhub.com)
+#
+#  @license Apache v2.0
+#  
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  
+#      http://www.apache.org/licenses/LICENSE-2.0
+#  
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+DEFAULT_WORKERS = 16
+MAX_WORKERS_FACTOR = 4
+DEFAULT_WINDOW = 4096
+DEFAULT_SYNC_COPY_THRESHOLD = 64 * 1024 * 1024
+MAX_SYNC_COPY_THRESHOLD = 5000 * 1024 * 1024  # limit of Put Blob From URL
+DEFAULT_BLOCK_COPY_THRESHOLD = 4 * 1024 * 1024 * 1024
+DEFAULT_BLOCK_SIZE = 256 * 1024 * 1024
+MAX_BLOCK_SIZE = 4000 * 1024 * 1024  # limit of Put Block From URL
+DEFAULT_BLOCK_PARALLELISM = 8
+DEFAULT_SCHEDULE_BUFFER = 16384
+DEFAULT_PROGRESS_INTERVAL = 60
+
+MODE_AUTO = 'auto'  # rename if supported by the storage, copy otherwise
+MODE_RENAME = 'rename'
+MODE_COPY = 'copy'
+MODES = [MODE_AUTO, MODE_RENAME, MODE_COPY]
+
+SCHEDULE_LARGEST_FIRST = 'largest-first'  # reorder blobs largest first within a buffer of listed blobs
+SCHEDULE_LISTING = 'listing'
+SCHEDULES = [SCHEDULE_LARGEST_FIRST, SCHEDULE_LISTING]
+
+VERIFY_AUTO = 'auto'  # content of blobs up to the content-threshold (checksum), properties of larger ones
+VERIFY_CHECKSUM = 'checksum'  # md5 of the content of the destination - ranged hashes if content-md5 is missing
+VERIFY_PROPERTIES = 'properties'  # consistency of size and content-md5 property - no data is transferred
+VERIFY_OFF = 'off'
+VERIFY_MODES = [VERIFY_AUTO, VERIFY_CHECKSUM, VERIFY_PROPERTIES, VERIFY_OFF]
+
+
+class MoveOptions:
+    def __init__(self, workers: int = DEFAULT_WORKERS, max_workers: int = None, mode: str = MODE_COPY,
+                 window: int = DEFAULT_WINDOW,
+                 journal_dir: str = None, sync_copy_threshold: int = DEFAULT_SYNC_COPY_THRESHOLD,
+                 block_copy_threshold: int = DEFAULT_BLOCK_COPY_THRESHOLD, block_size: int = DEFAULT_BLOCK_SIZE,
+                 block_parallelism: int = DEFAULT_BLOCK_PARALLELISM, schedule: str = SCHEDULE_LARGEST_FIRST,
+                 schedule_buffer: int = DEFAULT_SCHEDULE_BUFFER, incremental: bool = False,
+                 verify: str = VERIFY_AUTO, dedup: bool = False,
+                 progress_interval: float = DEFAULT_PROGRESS_INTERVAL, rejected_file: str = None):
+        """
+        Tuning-options for moving a dataset
+        :param workers: initial number of concurrent requests - adapted to throttling of the storage
+        :param max_workers: upper bound of concurrent requests (default: 4 * workers)
+        :param mode: one of 'auto', 'rename' and 'copy' - renaming directories (hierarchical namespace) is opt-in
+        :param window: maximum number of blobs in flight (listed, but not yet deleted from source)
+        :param journal_dir: directory to keep move-journals in, so retries resume (default: None - no journal)
+        :param sync_copy_threshold: blobs smaller than this (in bytes) are copied synchronously - 0 disables
+        :param block_copy_threshold: blobs of at least this size (in bytes) are copied block by block - 0 disables
+        :param block_size: size of a block (in bytes) when copying block by block
+        :param block_parallelism: number of blocks staged concurrently (shared by all blobs copied block by block)
+        :param schedule: order blobs are moved in - one of 'largest-first' and 'listing'
+        :param schedule_buffer: maximum number of listed blobs buffered for reordering them largest first
+        :param incremental: skip the copy of blobs that are already present at the destination (only delete them)
+        :param verify: how copies are verified before deleting the source - one of 'auto', 'checksum', 'properties' and
+            'off'
+        :param dedup: reference blobs whose content is already present in the target-space instead of copying them
+        :param progress_interval: seconds between two progress-summaries - 0 only logs the final summary
+        :param rejected_file: file to write the names of blobs to, that did not pass the filter-criteria (optional)
+        """
+        if workers < 1:
+            raise ValueError(f'workers must be at least 1 (got {workers})')
+        if max_workers is None:
+            max_workers = MAX_WORKERS_FACTOR * workers
+        if max_workers < workers:
+            raise ValueError(f'max_workers must be at least workers ({workers}) (got {max_workers})')
+        if window < 1:
+            raise ValueError(f'window must be at least 1 (got {window})')
+        if not 0 <= sync_copy_threshold <= MAX_SYNC_COPY_THRESHOLD:
+            raise ValueError(f'sync_copy_threshold must be between 0 and {MAX_SYNC_COPY_THRESHOLD} '
+                             f'(got {sync_copy_threshold})')
+        if block_copy_threshold < 0:
+            raise ValueError(f'block_copy_threshold must not be negative (got {block_copy_threshold})')
+        if not 0 < block_size <= MAX_BLOCK_SIZE:
+            raise ValueError(f'block_size must be between 1 and {MAX_BLOCK_SIZE} (got {block_size})')
+        if block_parallelism < 1:
+            raise ValueError(f'block_parallelism must be at least 1 (got {block_parallelism})')
+        if mode not in MODES:
+            raise ValueError(f'unknown mode {mode} - expected one of {MODES}')
+        if schedule not in SCHEDULES:
+            raise ValueError(f'unknown schedule {schedule} - expected one of {SCHEDULES}')
+        if verify not in VERIFY_MODES:
+            raise ValueError(f'unknown verify-mode {verify} - expected one of {VERIFY_MODES}')
+        if schedule_buffer < 1:
+            raise ValueError(f'schedule_buffer must be at least 1 (got {schedule_buffer})')
+        if progress_interval < 0:
+            raise ValueError(f'progress_interval must not be negative (got {progress_interval})')
+        self.workers = workers
+        self.max_workers = max_workers
+        self.mode = mode
+        self.window = window
+        self.journal_dir = journal_dir
+        self.sync_copy_threshold = sync_copy_threshold
+        self.block_copy_threshold = block_copy_threshold
+        self.block_size = block_size
+        self.block_parallelism = block_parallelism
+        self.schedule = schedule
+        self.schedule_buffer = schedule_buffer
+        self.incremental = incremental
+        self.verify = verify
+        self.dedup = dedup
+        self.progress_interval = progress_interval
+        self.rejected_file = rejected_file
@@ -0,0 +1,125 @@
+#  ****************************************************************************
+#  @copyright 2023 e:fs TechHub GmbH (sdk@efs-techhub.com)
+#
+#  @license Apache v2.0
+#  
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  
+#      http://www.apache.org/licenses/LICENSE-2.0
+#  
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+import heapq
+import json
+import logging
+import os
+from typing import Iterable, Optional
+
+logger = logging.getLogger('move_data')
+
+DEFAULT_SHARDS = 1
+DEFAULT_SHARD_MIN_SIZE = 100 * 1024 ** 3  # datasets smaller than this are moved by a single pod
+DEFAULT_PLAN_DIR = '/tmp/plan'
+SHARDS_FILE = 'shards.json'
+
+
+class MoveShard:
+    def __init__(self, index: int, blob_names: Optional[Iterable[str]] = None, size: int = 0,
+                 blobs: Optional[list] = None):
+        """
+        Part of a sharded move, that is moved by a single worker
+        :param index: index of the shard
+        :param blob_names: the blobs of this shard - None if the shard covers the whole rootDir
+        :param size: total size of the blobs in bytes
+        :param blobs: the blobs of this shard as listed when planning (see StorageAccess.list_entries), so they are
+            moved without listing rootDir again - None if they have to be listed (e.g. manifests without entries)
+        """
+        if blob_names is None and blobs is not None:
+            blob_names = [blob['name'] for blob in blobs]
+        self.index = index
+        self.blob_names = frozenset(blob_names) if blob_names is not None else None
+        self.size = size
+        self.blobs = blobs
+
+    @property
+    def whole(self) -> bool:
+        return self.blob_names is None
+
+    def to_dict(self) -> dict:
+        return {
+            'index': self.index,
+            'size': self.size,
+            'blobNames': sorted(self.blob_names) if self.blob_names is not None else None,
+            'blobs': self.blobs
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(data['index'], data['blobNames'], data['size'], data.get('blobs'))
+
+
+def plan_shards(blobs: Iterable[dict], shards: int) -> list:
+    """
+    Splits blobs into balanced shards - blobs are assigned largest first to the shard with the fewest bytes (and
+    fewest blobs on a tie), so both bytes and number of blobs are balanced
+    :param blobs: the blobs as listed - dicts with (at least) name and size
+    :param shards: number of shards
+    :return: the shards (MoveShard) - empty shards are omitted
+    """
+    if shards < 1:
+        raise ValueError(f'shards must be at least 1 (got {shards})')
+    heap = [(0, 0, index) for index in range(shards)]
+    entries = [[] for _ in range(shards)]
+    for blob in sorted(blobs, key=lambda entry: entry['size'], reverse=True):
+        total, count, index = heapq.heappop(heap)
+        entries[index].append(blob)
+        heapq.heappush(heap, (total + blob['size'], count + 1, index))
+    sizes = {index: total for total, _, index in heap}
+    planned = [(sizes[index], shard_blobs) for index, shard_blobs in enumerate(entries) if shard_blobs]
+    return [MoveShard(index, size=size, blobs=shard_blobs) for index, (size, shard_blobs) in enumerate(planned)]
+
+
+def write_plan(plan_dir: str, shards: list):
+    """
+    Writes a manifest per shard and the list of shard-indices (as consumed by argo's 'withParam') to plan_dir
+    :param plan_dir: the directory to write the plan to
+    :param shards: the shards
+    """
+    os.makedirs(plan_dir, exist_ok=True)
+    for shard in shards:
+        with open(_shard_path(plan_dir, shard.index), 'w', encoding='utf-8') as f:
+            json.dump(shard.to_dict(), f)
+    with open(os.path.join(plan_dir, SHARDS_FILE), 'w', encoding='utf-8') as f:
+        json.dump([shard.index for shard in shards], f)
+    logger.info(f'wrote plan of {len(shards)} shard(s) to {plan_dir}')
+
+
+def read_shard(plan_dir: str, index: int) -> MoveShard:
+    """
+    Reads the manifest of a shard
+    :param plan_dir: the directory of the plan
+    :param index: index of the shard
+    :return: the shard
+    """
+    with open(_shard_path(plan_dir, index), 'r', encoding='utf-8') as f:
+        return MoveShard.from_dict(json.load(f))
+
+
+def read_plan(plan_dir: str) -> list:
+    """
+    Reads all shards of a plan
+    :param plan_dir: the directory of the plan
+    :return: the shards
+    """
+    with open(os.path.join(plan_dir, SHARDS_FILE), 'r', encoding='utf-8') as f:
+        return [read_shard(plan_dir, index) for index in json.load(f)]
+
+
+def _shard_path(plan_dir: str, index: int) -> str:
+    return os.path.join(plan_dir, f'shard-{index:04d}.json')
@@ -0,0 +1,136 @@
+#  ****************************************************************************
+#  @copyright 2023 e:fs TechHub GmbH (sdk@efs-techhub.com)
+#
+#  @license Apache v2.0
+#  
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  
+#      http://www.apache.org/licenses/LICENSE-2.0
+#  
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+import datetime
+import logging
+import threading
+import time
+
+from storage.move_metrics import MoveMetrics
+
+logger = logging.getLogger('move_data')
+
+MIB = 1024 * 1024
+SAMPLED_REJECTED = 10  # rejected files named in the summary, if they are not written to a file
+
+
+class MoveProgress:
+    def __init__(self, metrics: MoveMetrics, interval: float):
+        """
+        Logs a summary of the progress of a move periodically - instead of a line per blob. Rates are derived from the
+        metrics of the move, the ETA refers to the blobs listed so far.
+        :param metrics: the metrics the move is recorded in
+        :param interval: seconds between two summaries - 0 only logs the final summary
+        """
+        self._metrics = metrics
+        self._interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._started_at = None
+        self._last = None
+
+    def __enter__(self):
+        self._started_at = time.monotonic()
+        self._last = (self._started_at, 0, 0)
+        if self._interval > 0:
+            self._thread = threading.Thread(target=self._run, name='move-progress', daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._report(final=True)
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            self._report()
+
+    def _report(self, final: bool = False):
+        now = time.monotonic()
+        total = self._metrics.total
+        listed = total(self._metrics.blobs_listed)
+        copied = total(self._metrics.blobs_copied)
+        done = total(self._metrics.blobs_deleted)
+        failed = total(self._metrics.blobs_failed)
+        copied_bytes = total(self._metrics.bytes_copied)
+        pending = max(listed - done - failed, 0)
+        last_at, last_copied, last_bytes = self._last if not final else (self._started_at, 0, 0)
+        elapsed = max(now - last_at, 1e-9)
+        self._last = (now, copied, copied_bytes)
+        message = f'{copied:.0f} copied, {done:.0f} done, {pending:.0f} pending, {failed:.0f} failed of {listed:.0f} ' \
+                  f'listed blobs - {(copied - last_copied) / elapsed:.1f} blobs/s, ' \
+                  f'{(copied_bytes - last_bytes) / elapsed / MIB:.1f} MiB/s'
+        if final:
+            logger.info(f'moved in {datetime.timedelta(seconds=round(now - self._started_at))}: {message}')
+            return
+        # blobs are done once deleted from the source - deletions are batched, so they lag behind the copies
+        rate = max(done, copied) / max(now - self._started_at, 1e-9)
+        eta = datetime.timedelta(seconds=round(pending / rate)) if rate > 0 else 'unknown'
+        logger.info(f'progress: {message} - ETA {eta}')
+
+
+class RejectedFiles:
+    def __init__(self, path: str, blacklist: str, whitelist: str):
+        """
+        Collects the files that did not pass the filter-criteria (and are deleted) - they are written to a file
+        (e.g. an argo-artifact) instead of logging a warning per file
+        :param path: path of the file to write the names to (optional - only a sample is logged otherwise)
+        :param blacklist: the blacklist-wildcard
+        :param whitelist: the whitelist-wildcard
+        """
+        self._path = path
+        self._blacklist = blacklist
+        self._whitelist = whitelist
+        self._file = None
+        self._count = 0
+        self._sample = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def add(self, blob_name: str):
+        """
+        Records a file that did not pass the filter-criteria
+        :param blob_name: the blob-name
+        """
+        logger.debug(f'file {blob_name} did not pass filter-criteria - will be deleted!')
+        self._count += 1
+        if len(self._sample) < SAMPLED_REJECTED:
+            self._sample.append(blob_name)
+        if self._path:
+            if self._file is None:
+                self._file = open(self._path, 'a', encoding='utf-8')
+            self._file.write(f'{blob_name}\n')
+
+    def close(self):
+        """
+        Closes the file and logs a summary
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if not self._count:
+            return
+        listed = f'listed in {self._path}' if self._path else \
+            f'e.g. {", ".join(self._sample)}' + (', ...' if self._count > len(self._sample) else '')
+        logger.warning(f'{self._count} files did not pass filter-criteria (blacklist: \'{self._blacklist}\', '
+                       f'whitelist: \'{self._whitelist}\') - deleted, {listed}')
@@ -0,0 +1,41 @@
+#  ****************************************************************************
+#  @copyright 2023 e:fs TechHub GmbH (sdk@efs-techhub.com)
+#
+#  @license Apache v2.0
+#  
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  
+#      http://www.apache.org/licenses/LICENSE-2.0
+#  
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+import heapq
+import itertools
+from typing import Callable, Iterable, Iterator
+
+
+def largest_first(items: Iterable, buffer_size: int, size: Callable[[object], int]) -> Iterator:
+    """
+    Reorders a stream of items largest first (LPT-scheduling), so that large items are started early and small items
+    are packed around them instead of a large item at the end of the stream determining the overall duration. At most
+    buffer_size items are buffered - the largest of them is yielded as soon as the buffer is full, the rest once the
+    stream is exhausted.
+    :param items: the items in listing-order
+    :param buffer_size: maximum number of items buffered for reordering
+    :param size: returns the size of an item
+    :return: the items, largest first within the buffer
+    """
+    heap = []
+    seq = itertools.count()  # keeps listing-order for equal sizes and avoids comparing items
+    for item in items:
+        heapq.heappush(heap, (-size(item), next(seq), item))
+        if len(heap) > buffer_size:
+            yield heapq.heappop(heap)[2]
+    while heap:
+        yield heapq.heappop(heap)[2]
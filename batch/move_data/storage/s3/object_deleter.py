@@ -0,0 +1,103 @@
+#  ****************************************************************************
+#  @copyright 2023 e:fs TechHub GmbH (sdk@efs-techhub.com)
+#
+#  @license Apache v2.0
+#  
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  
+#      http://www.apache.org/licenses/LICENSE-2.0
+#  
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+import logging
+import threading
+from concurrent.futures import Executor
+from typing import Callable
+
+logger = logging.getLogger('move_data')
+
+MAX_BATCH_SIZE = 1000  # limit of keys per DeleteObjects request
+
+
+class ObjectDeleter:
+    def __init__(self, client, bucket: str, executor: Executor, on_deleted: Callable[[str, Exception], None],
+                 batch_size: int = MAX_BATCH_SIZE):
+        """
+        Collects objects for deletion and deletes them via DeleteObjects. Keys that could not be deleted by the batch
+        are retried as single deletes.
+        :param client: s3-client with delete-permission on the bucket
+        :param bucket: the bucket the objects are deleted from
+        :param executor: the executor the delete-requests are run on
+        :param on_deleted: called with key and error (None on success) for each object
+        :param batch_size: number of objects deleted per request (at most 1000)
+        """
+        if not 0 < batch_size <= MAX_BATCH_SIZE:
+            raise ValueError(f'batch_size must be between 1 and {MAX_BATCH_SIZE} (got {batch_size})')
+        self._client = client
+        self._bucket = bucket
+        self._executor = executor
+        self._on_deleted = on_deleted
+        self._batch_size = batch_size
+        self._lock = threading.Lock()
+        self._buffer = []
+
+    def add(self, key: str):
+        """
+        Queues an object for deletion - a request is sent as soon as batch_size objects are queued
+        :param key: the object-key
+        """
+        with self._lock:
+            self._buffer.append(key)
+            if len(self._buffer) < self._batch_size:
+                return
+            batch, self._buffer = self._buffer, []
+        self._executor.submit(self._delete_batch, batch)
+
+    @property
+    def pending(self) -> int:
+        """
+        Number of objects queued for deletion, that have not been sent yet
+        """
+        with self._lock:
+            return len(self._buffer)
+
+    def flush(self):
+        """
+        Sends the remaining queued objects, even if the batch is not full
+        """
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        if batch:
+            self._executor.submit(self._delete_batch, batch)
+
+    def _delete_batch(self, keys: list[str]):
+        logger.debug(f'deleting {len(keys)} files via DeleteObjects')
+        try:
+            # quiet-mode only reports the keys that could not be deleted
+            response = self._client.delete_objects(Bucket=self._bucket, Delete={
+                'Objects': [{'Key': key} for key in keys], 'Quiet': True})
+            failed = {error['Key'] for error in response.get('Errors', [])}
+        except Exception as e:
+            logger.warning(f'batch-delete of {len(keys)} files failed ({e}) - falling back to single deletes')
+            failed = set(keys)
+
+        for key in keys:
+            if key in failed:
+                self._delete_single(key)
+            else:
+                self._on_deleted(key, None)
+
+    def _delete_single(self, key: str):
+        logger.debug(f'deleting file {key}')
+        try:
+            self._client.delete_object(Bucket=self._bucket, Key=key)
+        except Exception as e:
+            self._on_deleted(key, e)
+            return
+        self._on_deleted(key, None)
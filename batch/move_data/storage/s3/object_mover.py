@@ -0,0 +1,205 @@
+#  ****************************************************************************
+#  @copyright 2023 e:fs TechHub GmbH (sdk@efs-techhub.com)
+#
+#  @license Apache v2.0
+#  
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  
+#      http://www.apache.org/licenses/LICENSE-2.0
+#  
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from storage.move_journal import MoveJournal
+from storage.move_metrics import MoveMetrics
+from storage.move_options import VERIFY_OFF, MoveOptions
+from storage.s3.object_deleter import ObjectDeleter
+from storage.s3.streamed_copy import STREAM_PART_SIZE, stream_in_parts, stream_object
+from storage.storageaccess import MoveError, VerificationError
+
+logger = logging.getLogger('move_data')
+
+METHOD_STREAM = 'stream'
+
+VERIFIED_CONTENT = 'content'
+VERIFIED_SIZE = 'size'
+
+
+class S3Object:
+    def __init__(self, name: str, size: int, etag: str):
+        """
+        An object as listed
+        :param name: the object-key relative to the space
+        :param size: size in bytes
+        :param etag: the etag
+        """
+        self.name = name
+        self.size = size
+        self.etag = etag
+
+
+class ObjectMover:
+    def __init__(self, read_client, upload_client, delete_client, bucket: str, src_prefix: str, dst_prefix: str,
+                 options: MoveOptions, journal: MoveJournal = None, metrics: MoveMetrics = None):
+        """
+        Moves objects between two spaces. The credentials of a space do not permit access to other spaces, so objects
+        are streamed - downloaded with read_client and uploaded with upload_client, objects larger than
+        STREAM_PART_SIZE via multipart-upload with parts streamed in parallel. Each copy is verified (unless verify is
+        'off') and its source-object queued for (batched) deletion as soon as the copy succeeded.
+        :param read_client: s3-client with read-permission on the source-space
+        :param upload_client: s3-client with upload-permission on the target-space
+        :param delete_client: s3-client with delete-permission on the source-space
+        :param bucket: the bucket
+        :param src_prefix: key-prefix of the source-space
+        :param dst_prefix: key-prefix of the target-space
+        :param options: tuning-options - workers (concurrent copies), window (maximum number of objects in flight),
+            block_parallelism (parts streamed in parallel) and verify
+        :param journal: journal to record confirmed copies and deletions in (optional)
+        :param metrics: metrics to record copies, deletions and failures in (optional)
+        """
+        self._read_client = read_client
+        self._upload_client = upload_client
+        self._bucket = bucket
+        self._src_prefix = src_prefix
+        self._dst_prefix = dst_prefix
+        self._window = options.window
+        self._verify = options.verify != VERIFY_OFF
+        self._executor = ThreadPoolExecutor(max_workers=options.workers)
+        self._part_executor = ThreadPoolExecutor(max_workers=options.block_parallelism)
+        self._journal = journal
+        self._metrics = metrics or MoveMetrics()
+        self._deleter = ObjectDeleter(delete_client, bucket, self._executor, self._finish)
+        self._condition = threading.Condition()
+        self._outstanding = 0
+        self._copying = 0
+        self._failures = {}
+
+    def submit(self, obj: S3Object, move: bool):
+        """
+        Schedules an object for moving
+        :param obj: the object as listed
+        :param move: whether the object should be copied before deletion (False if it did not pass the filter-criteria)
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._outstanding < self._window or self._deletions_idle())
+            saturated = self._outstanding >= self._window
+        if saturated:
+            # window is exhausted and no batch is being deleted - send the queued objects instead of waiting for the
+            # batch to be filled up, so copies don't run in lockstep with the deletion of whole windows
+            self._deleter.flush()
+        if move and self._journal is not None and self._journal.is_copied(obj.name):
+            logger.debug(f'{obj.name} has already been copied - deleting only')
+            move = False
+        with self._condition:
+            self._condition.wait_for(lambda: self._outstanding < self._window)
+            self._outstanding += 1
+            if move:
+                self._copying += 1
+        if move:
+            started_at = time.monotonic()
+            copied = self._executor.submit(self._copy, obj)
+            copied.add_done_callback(lambda f: self._on_copied(obj, started_at, f))
+        else:
+            self._deleter.add(self._src_prefix + obj.name)
+
+    @property
+    def failures(self) -> dict:
+        """
+        The objects that could not be moved (so far) mapped to the error that occurred
+        """
+        with self._condition:
+            return dict(self._failures)
+
+    def join(self):
+        """
+        Waits until all submitted objects are handled
+        :raises MoveError: if at least one object could not be moved
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._copying == 0)
+        self._deleter.flush()
+        with self._condition:
+            self._condition.wait_for(lambda: self._outstanding == 0)
+        self._executor.shutdown()
+        self._part_executor.shutdown()
+        if self._failures:
+            raise MoveError(self._failures)
+
+    def _copy(self, obj: S3Object) -> str:
+        src_key = self._src_prefix + obj.name
+        dst_key = self._dst_prefix + obj.name
+        logger.debug(f'copying file from s3://{self._bucket}/{src_key} to s3://{self._bucket}/{dst_key}')
+        # the content is checked by s3 against the md5 of each upload
+        if obj.size > STREAM_PART_SIZE:
+            md5 = None
+            size = stream_in_parts(self._read_client, self._upload_client, self._bucket, src_key, dst_key, obj.size,
+                                   obj.etag, self._part_executor)
+        else:
+            md5, size = stream_object(self._read_client, self._upload_client, self._bucket, src_key, dst_key, obj.etag)
+        if self._verify:
+            if md5 is not None and _is_md5(obj.etag):
+                # the md5 of the downloaded content, that s3 checked the upload against
+                self._verify_md5(obj, md5.hex())
+            elif size != obj.size:
+                raise VerificationError(obj.name, f'size {size} does not match {obj.size}')
+            else:
+                self._metrics.blobs_verified.labels(method=VERIFIED_SIZE).inc()
+        return METHOD_STREAM
+
+    def _verify_md5(self, obj: S3Object, etag: str):
+        if etag.strip('"') != obj.etag.strip('"'):
+            raise VerificationError(obj.name, f'etag {etag} does not match {obj.etag}')
+        self._metrics.blobs_verified.labels(method=VERIFIED_CONTENT).inc()
+
+    def _on_copied(self, obj: S3Object, started_at: float, copied: Future):
+        if copied.exception() is not None:
+            self._finish(self._src_prefix + obj.name, copied.exception())
+        else:
+            method = copied.result()
+            self._metrics.blobs_copied.labels(method=method).inc()
+            self._metrics.bytes_copied.inc(obj.size)
+            self._metrics.copy_duration.labels(method=method).observe(time.monotonic() - started_at)
+            if self._journal is not None:
+                self._journal.copied(obj.name)
+            self._deleter.add(self._src_prefix + obj.name)
+        with self._condition:
+            self._copying -= 1
+            self._condition.notify_all()
+
+    def _deletions_idle(self) -> bool:
+        # all objects in flight, that are not being copied, are queued for deletion - none is being deleted
+        pending = self._deleter.pending
+        return pending > 0 and self._outstanding - self._copying == pending
+
+    def _finish(self, key: str, error: Exception = None):
+        name = key[len(self._src_prefix):]
+        with self._condition:
+            if error is not None:
+                logger.error(f'moving file {name} failed: {error}')
+                self._failures[name] = error
+                self._metrics.blobs_failed.inc()
+            else:
+                self._metrics.blobs_deleted.inc()
+                if self._journal is not None:
+                    self._journal.deleted(name)
+            self._outstanding -= 1
+            self._condition.notify_all()
+
+
+def _is_md5(etag: str) -> bool:
+    """
+    Checks whether an etag is the md5 of the content - not the case for objects uploaded in parts
+    :param etag: the etag
+    :return: True if the etag is an md5
+    """
+    return '-' not in etag
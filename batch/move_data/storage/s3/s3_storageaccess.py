@@ -18,7 +18,18 @@
 import logging
 import os
 
-from storage.storageaccess import StorageAccess
+import boto3
+import requests
+from botocore.config import Config
+
+from storage.move_journal import MoveJournal
+from storage.move_metrics import MoveMetrics
+from storage.move_options import MODE_RENAME, SCHEDULE_LARGEST_FIRST, VERIFY_CHECKSUM, MoveOptions
+from storage.move_plan import MoveShard
+from storage.move_progress import RejectedFiles
+from storage.move_schedule import largest_first
+from storage.s3.object_mover import ObjectMover, S3Object
+from storage.storageaccess import BlobFilter, StorageAccess
 
 ENV_STORAGE_DOMAIN = 'STORAGE_DOMAIN'
 ENV_BUCKET = 'BUCKET'
@@ -28,9 +39,12 @@ PROP_SECRET_KEY = 'SecretAccessKey'
 PROP_SESSION_TOKEN = 'SessionToken'
 NS_KEY = 'sts'
 
+PAGE_SIZE = 1000  # maximum number of objects per ListObjectsV2 request
+MAX_ATTEMPTS = 10
+
 TYPE = 's3'
 
-logger = logging.getLogger(__name__)
+logger = logging.getLogger('move_data')
 
 
 class S3StorageAccess(StorageAccess):
@@ -41,9 +55,162 @@ class S3StorageAccess(StorageAccess):
         self.bucket = os.getenv(ENV_BUCKET)
 
     def move_data(self, access_token: str, organization: str, src_space: str, dst_space: str, root_dir: str,
-                  blacklist: str, whitelist: str):
-        logging.warning('move_data is not implemented yet!')
-        pass
+                  blacklist: str, whitelist: str, options: MoveOptions = None, metrics: MoveMetrics = None,
+                  shard: MoveShard = None):
+        options = options or MoveOptions()
+        metrics = metrics or MoveMetrics()
+        if options.mode == MODE_RENAME:
+            raise ValueError('directories cannot be renamed on s3-storage')
+        if options.incremental:
+            raise ValueError('incremental moves are not supported on s3-storage')
+        if options.dedup:
+            raise ValueError('deduplication is not supported on s3-storage')
+        if options.verify == VERIFY_CHECKSUM:
+            raise ValueError(f'verify-mode {VERIFY_CHECKSUM} is not supported on s3-storage')
+        blob_filter = BlobFilter(blacklist, whitelist)
+
+        # all clients share one pool of connections per credentials - sized to the maximum number of concurrent
+        # requests
+        pool_size = options.workers + options.block_parallelism
+        delete_client = self._client(_get_credentials(os.environ['DELETE_ENDPOINT'], access_token, organization,
+                                                      src_space), pool_size)
+        read_client = self._client(_get_credentials(os.environ['READ_ENDPOINT'], access_token, organization,
+                                                    src_space), pool_size)
+        # the credentials of a space do not permit access to other spaces - objects are streamed from read- to
+        # upload-scope
+        upload_client = self._client(_get_credentials(os.environ['UPLOAD_ENDPOINT'], access_token, organization,
+                                                      dst_space), pool_size)
+
+        logger.info(f'moving objects with {options.workers} workers (window: {options.window}, '
+                    f'schedule: {options.schedule})')
+        journal = None
+        if options.journal_dir:
+            journal = MoveJournal.open(options.journal_dir, organization, src_space, dst_space, root_dir,
+                                       shard.index if shard is not None else None)
+        src_prefix = _get_prefix(organization, src_space)
+        mover = ObjectMover(read_client, upload_client, delete_client, self.bucket, src_prefix,
+                            _get_prefix(organization, dst_space), options, journal, metrics)
+        completed = False
+        rejected = RejectedFiles(options.rejected_file, blacklist, whitelist)
+        try:
+            try:
+                if shard is not None and shard.blobs is not None:
+                    objects = _shard_objects(shard, metrics)
+                else:
+                    objects = _iter_objects(read_client, self.bucket, src_prefix, root_dir,
+                                            shard.blob_names if shard is not None else None, metrics)
+                if options.schedule == SCHEDULE_LARGEST_FIRST:
+                    objects = largest_first(objects, options.schedule_buffer, lambda obj: obj.size)
+                for obj in objects:
+                    move = blob_filter.passes(obj.name)
+                    if not move:
+                        metrics.blobs_rejected.inc()
+                        rejected.add(obj.name)
+                    mover.submit(obj, move)
+            finally:
+                # objects in flight are handled in any case, so the journal stays consistent
+                mover.join()
+            completed = True
+        finally:
+            rejected.close()
+            if journal is not None:
+                journal.close(completed)
+
+    def list_blobs(self, access_token: str, organization: str, space: str, root_dir: str):
+        read_client = self._client(_get_credentials(os.environ['READ_ENDPOINT'], access_token, organization, space))
+        for obj in _iter_objects(read_client, self.bucket, _get_prefix(organization, space), root_dir):
+            yield obj.name, obj.size
+
+    def list_entries(self, access_token: str, organization: str, space: str, root_dir: str):
+        read_client = self._client(_get_credentials(os.environ['READ_ENDPOINT'], access_token, organization, space))
+        for obj in _iter_objects(read_client, self.bucket, _get_prefix(organization, space), root_dir):
+            yield {'name': obj.name, 'size': obj.size, 'etag': obj.etag}
+
+    def _client(self, credentials: dict, pool_size: int = 10):
+        """
+        Creates an s3-client - throttled requests are retried and the request-rate adapts to throttling
+        :param credentials: temporary credentials
+        :param pool_size: maximum number of pooled connections
+        :return: the s3-client
+        """
+        endpoint_url = self.storage_domain if '://' in self.storage_domain else f'https://{self.storage_domain}'
+        return boto3.session.Session().client(
+            's3', endpoint_url=endpoint_url, aws_access_key_id=credentials[PROP_ACCESS_KEY],
+            aws_secret_access_key=credentials[PROP_SECRET_KEY], aws_session_token=credentials.get(PROP_SESSION_TOKEN),
+            config=Config(max_pool_connections=pool_size, retries={'mode': 'adaptive', 'max_attempts': MAX_ATTEMPTS}))
+
+
+def _iter_objects(client, bucket: str, prefix: str, root_dir: str, shard_names: frozenset = None,
+                  metrics: MoveMetrics = None):
+    """
+    Streams all objects of root_dir in listing-order
+    :param client: s3-client with read-permission
+    :param bucket: the bucket
+    :param prefix: key-prefix of the space
+    :param root_dir: The root-directory
+    :param shard_names: only objects of this set are returned (None for all objects)
+    :param metrics: metrics to record listed objects in (optional)
+    :return: iterator over the objects (names relative to the space)
+    """
+    count = 0
+    paginator = client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=f'{prefix}{root_dir}/',
+                                   PaginationConfig={'PageSize': PAGE_SIZE}):
+        objects = [S3Object(item['Key'][len(prefix):], item['Size'], item['ETag']) for item in page.get('Contents', [])]
+        if shard_names is not None:
+            objects = [obj for obj in objects if obj.name in shard_names]
+        if metrics is not None:
+            metrics.blobs_listed.inc(len(objects))
+        count += len(objects)
+        yield from objects
+    logger.info(f'listed {count} objects')
+
+
+def _shard_objects(shard: MoveShard, metrics: MoveMetrics):
+    """
+    Streams the objects of a shard as listed when planning the move
+    :param shard: the shard
+    :param metrics: metrics to record listed objects in
+    :return: iterator over the objects (names relative to the space)
+    """
+    metrics.blobs_listed.inc(len(shard.blobs))
+    logger.info(f'moving {len(shard.blobs)} objects of shard {shard.index} as planned')
+    return (S3Object(entry['name'], entry['size'], entry['etag']) for entry in shard.blobs)
+
+
+def _get_prefix(organization: str, space: str) -> str:
+    """
+    Generates the key-prefix of a space - all spaces are stored within one bucket
+    :param organization: The organization-name
+    :param space: The space-name
+    :return: key-prefix
+    """
+    return f'{organization}/{space}/'
+
+
+def _get_credentials(endpoint: str, access_token: str, organization: str, space: str) -> dict:
+    """
+    Generates temporary credentials via accessmanager
+    :param endpoint: which endpoint to use
+    :param access_token: The OAuth access-token
+    :param organization: The organization-name
+    :param space: The space-name
+    :return: credentials - AccessKeyId, SecretAccessKey and SessionToken
+    """
+    logger.info("getting temporary credentials")
+    url = f'{endpoint}?organization={organization}&space={space}'
+
+    headers = {
+        'Authorization': f'Bearer {access_token}'
+    }
+
+    response = requests.post(url, headers=headers, data={})
+
+    response.raise_for_status()
+
+    logger.info("got temporary credentials")
+
+    return response.json()[NS_KEY]
 
 
 def _validate():
@@ -0,0 +1,100 @@
+#  ****************************************************************************
+#  @copyright 2023 e:fs TechHub GmbH (sdk@efs-techhub.com)
+#
+#  @license Apache v2.0
+#  
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  
+#      http://www.apache.org/licenses/LICENSE-2.0
+#  
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+import base64
+import hashlib
+import logging
+from concurrent.futures import Executor
+
+logger = logging.getLogger('move_data')
+
+MAX_PARTS = 10000  # maximum number of parts of a multipart-upload
+MIN_PART_SIZE = 5 * 1024 ** 2  # minimum size of all parts but the last one
+MAX_PART_SIZE = 5 * 1024 ** 3
+# properties of the source that are set on the destination
+COPIED_HEADERS = ['CacheControl', 'ContentDisposition', 'ContentEncoding', 'ContentLanguage', 'ContentType',
+                  'Metadata']
+STREAM_PART_SIZE = 16 * 1024 * 1024  # objects are streamed through memory in parts of (at least) this size
+
+
+def stream_object(read_client, upload_client, bucket: str, src_key: str, dst_key: str, etag: str) -> tuple:
+    """
+    Copies an object by downloading it with read_client and uploading it with upload_client - for credentials that
+    are limited to a single space. The upload is checked by s3 against the md5 of the downloaded content.
+    :param read_client: s3-client with read-permission on the source-space
+    :param upload_client: s3-client with upload-permission on the target-space
+    :param bucket: the bucket
+    :param src_key: the source-key
+    :param dst_key: the destination-key
+    :param etag: etag of the source-object as listed - the copy fails if the source has been replaced since
+    :return: md5 and size of the content
+    """
+    source = read_client.get_object(Bucket=bucket, Key=src_key, IfMatch=etag)
+    data = source['Body'].read()
+    md5 = hashlib.md5(data).digest()
+    headers = {name: source[name] for name in COPIED_HEADERS if name in source}
+    upload_client.put_object(Bucket=bucket, Key=dst_key, Body=data, ContentMD5=base64.b64encode(md5).decode('ascii'),
+                             **headers)
+    return md5, len(data)
+
+
+def stream_in_parts(read_client, upload_client, bucket: str, src_key: str, dst_key: str, size: int, etag: str,
+                    executor: Executor) -> int:
+    """
+    Copies a large object via multipart-upload, whose parts are downloaded (ranged GetObject) and uploaded in parallel
+    - at most one part per thread of executor is held in memory. The upload is aborted if any part fails.
+    :param read_client: s3-client with read-permission on the source-space
+    :param upload_client: s3-client with upload-permission on the target-space
+    :param bucket: the bucket
+    :param src_key: the source-key
+    :param dst_key: the destination-key
+    :param size: size of the source-object in bytes
+    :param etag: etag of the source-object as listed - the copy fails if the source has been replaced since
+    :param executor: the executor the parts are copied on
+    :return: number of bytes copied
+    """
+    part_size = min(max(STREAM_PART_SIZE, MIN_PART_SIZE, -(-size // MAX_PARTS)), MAX_PART_SIZE)
+    ranges = [(number, offset, min(offset + part_size, size) - 1)
+              for number, offset in enumerate(range(0, size, part_size), start=1)]
+    logger.debug(f'streaming {src_key} in {len(ranges)} parts')
+
+    source = read_client.head_object(Bucket=bucket, Key=src_key, IfMatch=etag)
+    headers = {name: source[name] for name in COPIED_HEADERS if name in source}
+    upload_id = upload_client.create_multipart_upload(Bucket=bucket, Key=dst_key, **headers)['UploadId']
+
+    def _stream_part(number: int, first: int, last: int) -> tuple:
+        data = read_client.get_object(Bucket=bucket, Key=src_key, Range=f'bytes={first}-{last}',
+                                      IfMatch=etag)['Body'].read()
+        md5 = base64.b64encode(hashlib.md5(data).digest()).decode('ascii')
+        part = upload_client.upload_part(Bucket=bucket, Key=dst_key, UploadId=upload_id, PartNumber=number,
+                                         Body=data, ContentMD5=md5)
+        return part['ETag'], len(data)
+
+    futures = []
+    try:
+        futures += [executor.submit(_stream_part, number, first, last) for number, first, last in ranges]
+        results = [future.result() for future in futures]
+        upload_client.complete_multipart_upload(
+            Bucket=bucket, Key=dst_key, UploadId=upload_id,
+            MultipartUpload={'Parts': [{'PartNumber': number, 'ETag': part_etag}
+                                       for (number, _, _), (part_etag, _) in zip(ranges, results)]})
+    except Exception:
+        for future in futures:
+            future.cancel()
+        upload_client.abort_multipart_upload(Bucket=bucket, Key=dst_key, UploadId=upload_id)
+        raise
+    return sum(length for _, length in results)
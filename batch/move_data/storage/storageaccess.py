@@ -17,13 +17,41 @@
 #  ****************************************************************************
 import re
 
+from storage.move_metrics import MoveMetrics
+from storage.move_options import MoveOptions
+from storage.move_plan import MoveShard
+
+
+class MoveError(Exception):
+    def __init__(self, failures: dict[str, Exception]):
+        """
+        Raised after a move finished, if at least one blob could not be moved
+        :param failures: the failed blob-names mapped to the error that occurred
+        """
+        names = sorted(failures)
+        listed = ', '.join(names[:10]) + (', ...' if len(names) > 10 else '')
+        super().__init__(f'{len(failures)} blob(s) could not be moved: {listed}')
+        self.failures = failures
+
+
+class VerificationError(Exception):
+    def __init__(self, blob_name: str, reason: str):
+        """
+        Raised if the destination-blob does not match the source-blob after copying
+        :param blob_name: the blob-name
+        :param reason: what does not match
+        """
+        super().__init__(f'verification of {blob_name} failed: {reason}')
+        self.blob_name = blob_name
+
 
 class StorageAccess:
     def __init__(self):
         pass
 
     def move_data(self, access_token: str, organization: str, src_space: str, dst_space: str, root_dir: str,
-                  blacklist: str, whitelist: str):
+                  blacklist: str, whitelist: str, options: MoveOptions = None, metrics: MoveMetrics = None,
+                  shard: MoveShard = None):
         """
         Moves a directory from one space to another
         :param access_token: The access-token.
@@ -33,18 +61,58 @@ class StorageAccess:
         :param root_dir: The root-directory
         :param blacklist: files matching this wildcard will not be moved
         :param whitelist: files matching this wildcard will be moved
+        :param options: tuning-options (default: MoveOptions())
+        :param metrics: metrics to record the move in (optional)
+        :param shard: only move the blobs of this shard (optional - default: whole root-directory) - the directory
+            is not listed if the shard contains the listed blobs
+        :raises MoveError: if at least one blob could not be moved
         """
         pass
 
+    def list_blobs(self, access_token: str, organization: str, space: str, root_dir: str):
+        """
+        Lists all blobs of a directory
+        :param access_token: The access-token.
+        :param organization: The organization.
+        :param space: The space
+        :param root_dir: The root-directory
+        :return: iterable of tuples of blob-name and size
+        """
+        pass
+
+    def list_entries(self, access_token: str, organization: str, space: str, root_dir: str):
+        """
+        Lists all blobs of a directory with the properties required to move them - written to the shard-manifests,
+        so a shard is moved without listing the directory again
+        :param access_token: The access-token.
+        :param organization: The organization.
+        :param space: The space
+        :param root_dir: The root-directory
+        :return: iterable of json-serializable dicts with (at least) name and size
+        """
+        for name, size in self.list_blobs(access_token, organization, space, root_dir):
+            yield {'name': name, 'size': size}
+
+    def supports_rename(self, access_token: str, organization: str, space: str, root_dir: str) -> bool:
+        """
+        Checks whether a directory may be moved with a single rename-operation
+        :param access_token: The access-token.
+        :param organization: The organization.
+        :param space: The space
+        :param root_dir: The root-directory
+        :return: True if the directory may be renamed
+        """
+        return False
+
 
 def wildcard2regex(wildcard: str):
     """
-    Convert wildcard to regular expression, so that '*.exe,*.js' will be converted to '^(.*\\.exe)|(.*\\.js)$' - so it doesn't accidentially find .json within .js-filter!
+    Convert wildcard to regular expression, so that '*.exe,*.js' will be converted to '^((.*\\.exe)|(.*\\.js))$' - so it doesn't accidentially find .json within .js-filter!
 
     - escape wildcard
     - replace '\\*' with '.*', '\\?' with '.'
     - split wildcard by ',', strip each part and surround with braces
-    - force start- and end-of-line-assertion ('^'/'$')
+    - force start- and end-of-line-assertion ('^'/'$') for all parts
 
     :param wildcard: the wildcard in a comma-separated manner
     :return: the regular expression
@@ -55,6 +123,79 @@ def wildcard2regex(wildcard: str):
     # Convert the escaped pattern to a regex pattern
     parts = escaped_pattern.replace("\\*", ".*").replace("\\?", ".").split(",")  # Split the string on commas
     # surround each part with "(...)"
-    trimmed_parts = [f'({part.strip()})' for part in parts]  # Trim whitespace from each part and surround with "(..)"
+    trimmed_parts = [f'({part.strip()})' for part in parts if part.strip()]  # Trim whitespace from each part and surround with "(..)"
     joined = "|".join(trimmed_parts)  # Join the trimmed parts with a pipe
-    return f'^{joined}$'
+    return f'^({joined})$'
+
+
+class WildcardMatcher:
+    def __init__(self, wildcard: str):
+        """
+        Compiled, case-insensitive matcher for a comma-separated wildcard. Parts without wildcard-characters are matched
+        via set-lookup, pure suffix-parts like '*.exe' via a set of suffixes (a bare '*' matches everything) - only the
+        remaining parts are combined to a regular expression.
+        :param wildcard: the wildcard in a comma-separated manner
+        """
+        self._names = set()
+        self._match_all = False
+        self._suffixes = {}  # suffix-length -> suffixes
+        patterns = []
+        for part in wildcard.split(','):
+            part = part.strip().lower()
+            if not part:
+                continue
+            if '*' not in part and '?' not in part:
+                self._names.add(part)
+            elif part == '*':
+                self._match_all = True
+            elif part.startswith('*') and '*' not in part[1:] and '?' not in part:
+                self._suffixes.setdefault(len(part) - 1, set()).add(part[1:])
+            else:
+                patterns.append(part)
+        self._regex = re.compile(wildcard2regex(','.join(patterns)), re.IGNORECASE) if patterns else None
+
+    def matches(self, blob_name: str) -> bool:
+        """
+        Checks whether blob_name matches any part of the wildcard
+        :param blob_name: the blob-name
+        :return: True if blob_name matches
+        """
+        if self._match_all:
+            return True
+        name = blob_name.lower()
+        if name in self._names:
+            return True
+        for length, suffixes in self._suffixes.items():
+            if name[-length:] in suffixes:
+                return True
+        return self._regex is not None and self._regex.match(blob_name) is not None
+
+
+class BlobFilter:
+    def __init__(self, blacklist: str, whitelist: str):
+        """
+        Filters blobs as follows:
+
+        - if whitelist is provided - blobs must match whitelist, but not blacklist
+        - if no whitelist, but blacklist is provided - blobs must not match blacklist
+        - if neither whitelist nor blacklist is provided - all blobs pass
+
+        :param blacklist: the blacklist-wildcard
+        :param whitelist: the whitelist-wildcard
+        """
+        self._blacklist = WildcardMatcher(blacklist) if blacklist else None
+        self._whitelist = WildcardMatcher(whitelist) if whitelist else None
+
+    @property
+    def active(self) -> bool:
+        return self._blacklist is not None or self._whitelist is not None
+
+    def passes(self, blob_name: str) -> bool:
+        """
+        Checks whether blob_name passes the filter-criteria
+        :param blob_name: the blob-name
+        :return: True if the blob should be moved, False if it should be deleted
+        """
+        if self._whitelist is not None and not self._whitelist.matches(blob_name):
+            return False
+        return self._blacklist is None or not self._blacklist.matches(blob_name)
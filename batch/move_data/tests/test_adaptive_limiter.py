@@ -0,0 +1,95 @@
+#  ****************************************************************************
+#  @copyright 2023 e:fs TechHub GmbH (sdk@efs-techhub.com)
+#
+#  @license Apache v2.0
+#  
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  
+#      http://www.apache.org/licenses/LICENSE-2.0
+#  
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+import threading
+import time
+import types
+import unittest
+from unittest import mock
+
+from storage.azure import adaptive_limiter
+from storage.azure.adaptive_limiter import AdaptiveLimiter
+
+
+def _response(status_code: int, headers: dict = None):
+    return types.SimpleNamespace(http_response=types.SimpleNamespace(status_code=status_code, headers=headers or {}))
+
+
+class AdaptiveLimiterTest(unittest.TestCase):
+    def test_additive_increase(self):
+        limiter = AdaptiveLimiter(4, 6)
+        # increased by 1/limit per successful response
+        for _ in range(4):
+            limiter.observe(_response(200))
+        self.assertEqual(limiter.limit, 4)
+        limiter.observe(_response(200))
+        self.assertEqual(limiter.limit, 5)
+        for _ in range(100):
+            limiter.observe(_response(201))
+        self.assertEqual(limiter.limit, 6)
+
+    def test_halved_on_throttling(self):
+        limiter = AdaptiveLimiter(16, 64)
+        limiter.observe(_response(503))
+        self.assertEqual(limiter.limit, 8)
+        # throttled responses within the cooldown count as one congestion-event
+        limiter.observe(_response(429))
+        self.assertEqual(limiter.limit, 8)
+        with mock.patch.object(adaptive_limiter, 'DECREASE_COOLDOWN', 0):
+            limiter.observe(_response(500, {'x-ms-error-code': 'ServerBusy'}))
+            self.assertEqual(limiter.limit, 4)
+            for _ in range(10):
+                limiter.observe(_response(503))
+        self.assertEqual(limiter.limit, 1)
+
+    def test_other_errors_do_not_change_the_limit(self):
+        limiter = AdaptiveLimiter(4, 8)
+        limiter.observe(_response(404))
+        limiter.observe(_response(500))
+        self.assertEqual(limiter.limit, 4)
+
+    def test_retry_after_pauses_requests(self):
+        limiter = AdaptiveLimiter(4, 8)
+        limiter.observe(_response(503, {'Retry-After': '0.2'}))
+        started_at = time.monotonic()
+        limiter.call(lambda: None)
+        self.assertGreaterEqual(time.monotonic() - started_at, 0.15)
+
+    def test_limits_concurrent_calls(self):
+        limiter = AdaptiveLimiter(2, 2)
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def request():
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.01)
+            with lock:
+                active.pop()
+
+        threads = [threading.Thread(target=limiter.call, args=(request,)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(max(peak), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
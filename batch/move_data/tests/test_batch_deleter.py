@@ -0,0 +1,101 @@
+#  ****************************************************************************
+#  @copyright 2023 e:fs TechHub GmbH (sdk@efs-techhub.com)
+#
+#  @license Apache v2.0
+#  
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  
+#      http://www.apache.org/licenses/LICENSE-2.0
+#  
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+import threading
+import types
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from azure.core.exceptions import HttpResponseError, ResourceNotFoundError
+
+from storage.azure.adaptive_limiter import AdaptiveLimiter
+from storage.azure.batch_deleter import BatchDeleter
+
+
+class StubContainerClient:
+    def __init__(self, statuses: dict = None, single_errors: dict = None, batch_error: Exception = None):
+        """
+        :param statuses: status-code of the sub-response per blob-name (default: 202)
+        :param single_errors: error raised by a single delete per blob-name
+        :param batch_error: error raised by each batch-request
+        """
+        self.statuses = statuses or {}
+        self.single_errors = single_errors or {}
+        self.batch_error = batch_error
+        self.batches = []
+        self.singles = []
+        self._lock = threading.Lock()
+
+    def delete_blobs(self, *names, raise_on_any_failure=True):
+        with self._lock:
+            self.batches.append(names)
+        if self.batch_error is not None:
+            raise self.batch_error
+        return iter([types.SimpleNamespace(status_code=self.statuses.get(name, 202)) for name in names])
+
+    def delete_blob(self, name: str):
+        with self._lock:
+            self.singles.append(name)
+        if name in self.single_errors:
+            raise self.single_errors[name]
+
+
+class BatchDeleterTest(unittest.TestCase):
+    def _delete(self, container_client: StubContainerClient, names: list, batch_size: int = 256) -> dict:
+        deleted = {}
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            deleter = BatchDeleter(container_client, executor, AdaptiveLimiter(2, 2),
+                                   lambda name, error: deleted.__setitem__(name, error), batch_size)
+            for name in names:
+                deleter.add(name)
+            self.assertEqual(deleter.pending, len(names) % batch_size)
+            deleter.flush()
+        return deleted
+
+    def test_batches(self):
+        container_client = StubContainerClient()
+        deleted = self._delete(container_client, [f'ds/f{i}' for i in range(5)], batch_size=2)
+
+        self.assertEqual(deleted, {f'ds/f{i}': None for i in range(5)})
+        self.assertCountEqual(container_client.batches, [('ds/f0', 'ds/f1'), ('ds/f2', 'ds/f3'), ('ds/f4',)])
+        self.assertEqual(container_client.singles, [])
+
+    def test_mixed_sub_responses(self):
+        forbidden = HttpResponseError(message='AuthorizationPermissionMismatch')
+        container_client = StubContainerClient(statuses={'ds/missing': 404, 'ds/busy': 500, 'ds/forbidden': 403},
+                                               single_errors={'ds/forbidden': forbidden})
+        deleted = self._delete(container_client, ['ds/ok', 'ds/missing', 'ds/busy', 'ds/forbidden'])
+
+        # blobs deleted by a previous attempt count as deleted
+        self.assertEqual(deleted, {'ds/ok': None, 'ds/missing': None, 'ds/busy': None, 'ds/forbidden': forbidden})
+        self.assertCountEqual(container_client.singles, ['ds/busy', 'ds/forbidden'])
+
+    def test_failed_batch_falls_back_to_single_deletes(self):
+        container_client = StubContainerClient(batch_error=HttpResponseError(message='FeatureNotSupported'),
+                                               single_errors={'ds/missing': ResourceNotFoundError('BlobNotFound')})
+        deleted = self._delete(container_client, ['ds/a', 'ds/missing'])
+
+        self.assertEqual(deleted, {'ds/a': None, 'ds/missing': None})
+        self.assertCountEqual(container_client.singles, ['ds/a', 'ds/missing'])
+
+    def test_invalid_batch_size(self):
+        with self.assertRaises(ValueError):
+            BatchDeleter(StubContainerClient(), None, None, None, batch_size=257)
+
+
+if __name__ == '__main__':
+    unittest.main()
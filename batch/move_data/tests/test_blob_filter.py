@@ -0,0 +1,75 @@
+#  ****************************************************************************
+#  @copyright 2023 e:fs TechHub GmbH (sdk@efs-techhub.com)
+#
+#  @license Apache v2.0
+#  
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  
+#      http://www.apache.org/licenses/LICENSE-2.0
+#  
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+import re
+import unittest
+
+from storage.storageaccess import BlobFilter, WildcardMatcher, wildcard2regex
+
+
+class WildcardMatcherTest(unittest.TestCase):
+    NAMES = ['ds/x.csv', 'ds/X.CSV', 'ds/x.csv.exe', 'ds/sub/x.exe', 'ds/meta.json', 'ds/a.js', 'raw/x.csv', 'x', '']
+
+    def test_star_matches_everything(self):
+        matcher = WildcardMatcher('*')
+        for name in self.NAMES:
+            self.assertTrue(matcher.matches(name), name)
+
+    def test_suffix(self):
+        matcher = WildcardMatcher('*.csv')
+        self.assertEqual([name for name in self.NAMES if matcher.matches(name)], ['ds/x.csv', 'ds/X.CSV', 'raw/x.csv'])
+
+    def test_suffix_is_anchored(self):
+        self.assertFalse(WildcardMatcher('*.js').matches('ds/meta.json'))
+        self.assertFalse(WildcardMatcher('*.csv').matches('ds/x.csv.exe'))
+
+    def test_prefix(self):
+        matcher = WildcardMatcher('ds/sub/*')
+        self.assertEqual([name for name in self.NAMES if matcher.matches(name)], ['ds/sub/x.exe'])
+
+    def test_name_and_question_mark(self):
+        matcher = WildcardMatcher(' ds/meta.json , ds/?.js,')
+        self.assertEqual([name for name in self.NAMES if matcher.matches(name)], ['ds/meta.json', 'ds/a.js'])
+
+    def test_equals_regex(self):
+        for wildcard in ['*', '*.csv', 'ds/*', '*.csv,*.exe', 'ds/*.csv', '*x*', 'ds/?.js', 'x', '*,*.csv']:
+            regex = re.compile(wildcard2regex(wildcard), re.IGNORECASE)
+            matcher = WildcardMatcher(wildcard)
+            for name in self.NAMES:
+                self.assertEqual(matcher.matches(name), regex.match(name) is not None, (wildcard, name))
+
+
+class BlobFilterTest(unittest.TestCase):
+    def test_whitelist_star_passes_everything(self):
+        self.assertTrue(BlobFilter(None, '*').passes('ds/x.csv'))
+
+    def test_blacklist_star_rejects_everything(self):
+        self.assertFalse(BlobFilter('*', None).passes('ds/x.exe'))
+
+    def test_blacklist_wins_over_whitelist(self):
+        blob_filter = BlobFilter('*.exe', '*')
+        self.assertTrue(blob_filter.passes('ds/x.csv'))
+        self.assertFalse(blob_filter.passes('ds/x.exe'))
+
+    def test_inactive(self):
+        blob_filter = BlobFilter(None, '')
+        self.assertFalse(blob_filter.active)
+        self.assertTrue(blob_filter.passes('ds/x.exe'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,274 @@
+#  ****************************************************************************
+#  @copyright 2023 e:fs TechHub GmbH (sdk@efs-techhub.com)
+#
+#  @license Apache v2.0
+#  
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  
+#      http://www.apache.org/licenses/LICENSE-2.0
+#  
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+import hashlib
+import os
+import tempfile
+import threading
+import types
+import unittest
+import urllib.parse
+from unittest import mock
+
+from azure.core.exceptions import ResourceNotFoundError
+from azure.storage.blob import BlobProperties, BlobType, ContentSettings
+
+from storage.azure import blob_mover
+from storage.azure.blob_mover import BlobMover
+from storage.move_journal import MoveJournal
+from storage.move_metrics import MoveMetrics
+from storage.move_options import VERIFY_OFF, MoveOptions
+from storage.storageaccess import MoveError, VerificationError
+
+SRC_URL = 'https://org.blob.core.windows.net/loadingzone'
+DST_URL = 'https://org.blob.core.windows.net/main'
+
+
+class StubStore:
+    def __init__(self, window: int = None):
+        """
+        Blobs of all containers - the service copies the content-md5 property along with the content
+        :param window: if given, checks that at most window blobs have been copied, but not deleted from source
+        """
+        self.blobs = {}  # (container, name) -> (data, content-md5 property)
+        self.corrupt = set()  # names of blobs, whose content is damaged when copied
+        self.pending_polls = 0  # number of polls an asynchronous copy stays pending
+        self.copies = []
+        self.max_in_flight = 0
+        self._window = window
+        self._pending = {}
+        self.lock = threading.Lock()
+
+    def put(self, container: str, name: str, data: bytes, with_md5: bool = True):
+        self.blobs[(container, name)] = (data, hashlib.md5(data).digest() if with_md5 else None)
+
+    def names(self, container: str) -> list:
+        return sorted(name for c, name in self.blobs if c == container)
+
+    def copy(self, src_url: str, dst_container: str, dst_name: str):
+        with self.lock:
+            data, md5 = self.blobs[_parse(src_url)]
+            if dst_name in self.corrupt:
+                data = b'!' + data[1:]
+            self.blobs[(dst_container, dst_name)] = (data, md5)
+            self.copies.append(dst_name)
+            self._pending[(dst_container, dst_name)] = self.pending_polls
+            in_flight = len(set(self.names('loadingzone')) & set(self.names('main')))
+            self.max_in_flight = max(self.max_in_flight, in_flight)
+
+    def poll(self, key: tuple) -> bool:
+        with self.lock:
+            remaining = self._pending.get(key, 0)
+            self._pending[key] = remaining - 1
+            return remaining > 0
+
+
+class StubBlobClient:
+    def __init__(self, store: StubStore, container: str, name: str):
+        self._store = store
+        self._key = (container, name)
+        self.url = f'https://org.blob.core.windows.net/{container}/{urllib.parse.quote(name)}?sas'
+
+    def upload_blob_from_url(self, src_url: str, overwrite: bool = False, metadata: dict = None):
+        self._store.copy(src_url, *self._key)
+
+    def start_copy_from_url(self, src_url: str) -> dict:
+        self._store.copy(src_url, *self._key)
+        return {'copy_status': 'pending' if self._store.pending_polls else 'success'}
+
+    def get_blob_properties(self) -> BlobProperties:
+        if self._key not in self._store.blobs:
+            raise ResourceNotFoundError('BlobNotFound')
+        data, md5 = self._store.blobs[self._key]
+        properties = _blob(self._key[1], data, md5)
+        properties.copy.status = 'pending' if self._store.poll(self._key) else 'success'
+        return properties
+
+    def download_blob(self, offset: int = 0, length: int = None):
+        data = self._store.blobs[self._key][0][offset:offset + length]
+        return types.SimpleNamespace(readall=lambda: data, chunks=lambda: iter([data]))
+
+
+class StubContainerClient:
+    def __init__(self, store: StubStore, container: str):
+        self._store = store
+        self._container = container
+
+    def delete_blobs(self, *names, raise_on_any_failure: bool = True):
+        responses = []
+        for name in names:
+            with self._store.lock:
+                found = self._store.blobs.pop((self._container, name), None) is not None
+            responses.append(types.SimpleNamespace(status_code=202 if found else 404))
+        return iter(responses)
+
+    def delete_blob(self, name: str):
+        with self._store.lock:
+            del self._store.blobs[(self._container, name)]
+
+
+class StubClientFactory:
+    def __init__(self, store: StubStore):
+        self._store = store
+
+    def container_client(self, container_url: str, sas: str) -> StubContainerClient:
+        return StubContainerClient(self._store, container_url.rsplit('/', 1)[1])
+
+    def blob_client(self, container_url: str, sas: str, blob_name: str) -> StubBlobClient:
+        return StubBlobClient(self._store, container_url.rsplit('/', 1)[1], blob_name)
+
+    def close(self):
+        pass
+
+
+def _parse(url: str) -> tuple:
+    container, name = urllib.parse.urlparse(url).path.lstrip('/').split('/', 1)
+    return container, urllib.parse.unquote(name)
+
+
+def _blob(name: str, data: bytes, md5: bytes = None) -> BlobProperties:
+    blob = BlobProperties()
+    blob.name = name
+    blob.size = len(data)
+    blob.blob_type = BlobType.BlockBlob
+    blob.metadata = {}
+    blob.content_settings = ContentSettings(content_md5=bytearray(md5) if md5 else None)
+    return blob
+
+
+class BlobMoverTest(unittest.TestCase):
+    def _move(self, store: StubStore, options: MoveOptions, moved: list = None, journal=None,
+              metrics: MoveMetrics = None):
+        """
+        Moves all blobs of loadingzone - blobs not in moved (if given) are deleted only
+        """
+        with mock.patch.object(blob_mover, 'ClientFactory', lambda *args, **kwargs: StubClientFactory(store)):
+            mover = BlobMover(SRC_URL, DST_URL, 'delete-sas', 'upload-sas', options, journal, metrics)
+        done = threading.Event()
+        errors = []
+
+        def _run():
+            try:
+                for name in store.names('loadingzone'):
+                    data, md5 = store.blobs[('loadingzone', name)]
+                    mover.submit(_blob(name, data, md5), moved is None or name in moved)
+                mover.join()
+            except Exception as e:
+                errors.append(e)
+            finally:
+                done.set()
+
+        threading.Thread(target=_run, daemon=True).start()
+        self.assertTrue(done.wait(30), 'move did not finish')
+        if errors:
+            raise errors[0]
+
+    def test_move(self):
+        store = StubStore()
+        for i in range(20):
+            store.put('loadingzone', f'ds/f{i}.csv', f'content {i}'.encode())
+        metrics = MoveMetrics()
+        self._move(store, MoveOptions(workers=4), metrics=metrics)
+
+        self.assertEqual(store.names('loadingzone'), [])
+        self.assertEqual(store.names('main'), sorted(f'ds/f{i}.csv' for i in range(20)))
+        self.assertEqual(MoveMetrics.total(metrics.blobs_deleted), 20)
+
+    def test_rejected_blobs_are_deleted_only(self):
+        store = StubStore()
+        store.put('loadingzone', 'ds/ok.csv', b'ok')
+        store.put('loadingzone', 'ds/bad.exe', b'bad')
+        self._move(store, MoveOptions(workers=2), moved=['ds/ok.csv'])
+
+        self.assertEqual(store.names('loadingzone'), [])
+        self.assertEqual(store.names('main'), ['ds/ok.csv'])
+
+    def test_window_bounds_blobs_in_flight(self):
+        store = StubStore()
+        for i in range(50):
+            store.put('loadingzone', f'ds/f{i:02d}.csv', b'x' * i)
+        self._move(store, MoveOptions(workers=8, window=5))
+
+        self.assertEqual(store.names('loadingzone'), [])
+        self.assertEqual(len(store.names('main')), 50)
+        self.assertLessEqual(store.max_in_flight, 5)
+
+    def test_window_smaller_than_delete_batch(self):
+        # queued deletions are sent as soon as the window is saturated - no batch of 256 blobs is ever filled
+        store = StubStore()
+        for i in range(30):
+            store.put('loadingzone', f'ds/f{i:02d}.csv', b'x')
+        self._move(store, MoveOptions(workers=4, window=3))
+
+        self.assertEqual(store.names('loadingzone'), [])
+
+    def test_pending_copies_are_polled(self):
+        store = StubStore()
+        store.pending_polls = 2
+        for i in range(5):
+            store.put('loadingzone', f'ds/f{i}.csv', b'x' * 10)
+        metrics = MoveMetrics()
+        self._move(store, MoveOptions(workers=2, sync_copy_threshold=0), metrics=metrics)
+
+        self.assertEqual(store.names('loadingzone'), [])
+        self.assertGreaterEqual(MoveMetrics.total(metrics.copy_polls), 10)
+
+    def test_failed_verification_keeps_source(self):
+        store = StubStore()
+        for name in ['ds/a.csv', 'ds/b.csv']:
+            store.put('loadingzone', name, b'content of ' + name.encode())
+        store.corrupt.add('ds/b.csv')
+        with self.assertRaises(MoveError) as raised:
+            self._move(store, MoveOptions(workers=2))
+
+        self.assertIsInstance(raised.exception.failures['ds/b.csv'], VerificationError)
+        self.assertEqual(list(raised.exception.failures), ['ds/b.csv'])
+        self.assertEqual(store.names('loadingzone'), ['ds/b.csv'])
+
+    def test_without_verification(self):
+        store = StubStore()
+        store.put('loadingzone', 'ds/b.csv', b'content')
+        store.corrupt.add('ds/b.csv')
+        self._move(store, MoveOptions(workers=2, verify=VERIFY_OFF))
+
+        self.assertEqual(store.names('loadingzone'), [])
+
+    def test_journaled_resume(self):
+        store = StubStore()
+        for name in ['ds/a.csv', 'ds/b.csv', 'ds/c.csv']:
+            store.put('loadingzone', name, name.encode())
+        # a previous run copied ds/a.csv and ds/b.csv, but only deleted ds/b.csv
+        store.put('main', 'ds/a.csv', b'ds/a.csv')
+        journal_dir = tempfile.mkdtemp()
+        journal = MoveJournal.open(journal_dir, 'org', 'loadingzone', 'main', 'ds')
+        for name in ['ds/a.csv', 'ds/b.csv']:
+            journal.copied(name)
+        journal.deleted('ds/b.csv')
+        journal.close(completed=False)
+        # ds/b.csv is uploaded again
+        journal = MoveJournal.open(journal_dir, 'org', 'loadingzone', 'main', 'ds')
+        self._move(store, MoveOptions(workers=2), journal=journal)
+        journal.close(completed=True)
+
+        self.assertCountEqual(store.copies, ['ds/b.csv', 'ds/c.csv'])
+        self.assertEqual(store.names('loadingzone'), [])
+        self.assertEqual(store.names('main'), ['ds/a.csv', 'ds/b.csv', 'ds/c.csv'])
+        self.assertEqual(os.listdir(journal_dir), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
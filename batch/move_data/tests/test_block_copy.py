@@ -0,0 +1,101 @@
+#  ****************************************************************************
+#  @copyright 2023 e:fs TechHub GmbH (sdk@efs-techhub.com)
+#
+#  @license Apache v2.0
+#  
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  
+#      http://www.apache.org/licenses/LICENSE-2.0
+#  
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+import types
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from azure.core.exceptions import ResourceNotFoundError
+
+from storage.azure.adaptive_limiter import AdaptiveLimiter
+from storage.azure.block_copy import copy_in_blocks
+
+SRC_URL = 'https://account.blob.core.windows.net/src/blob?sas'
+BLOCK_SIZE = 100
+
+
+class StubBlobClient:
+    def __init__(self, uncommitted: list = None):
+        self.uncommitted = uncommitted
+        self.staged = []
+        self.committed = None
+        self.commit_kwargs = None
+
+    def get_block_list(self, block_list_type: str):
+        assert block_list_type == 'uncommitted'
+        if self.uncommitted is None:
+            raise ResourceNotFoundError('blob not found')
+        return [], [types.SimpleNamespace(id=block_id, size=size) for block_id, size in self.uncommitted]
+
+    def stage_block_from_url(self, block_id: str, source_url: str, source_offset: int, source_length: int):
+        assert source_url == SRC_URL
+        self.staged.append((block_id, source_offset, source_length))
+
+    def commit_block_list(self, blocks: list, content_settings=None, metadata=None):
+        self.committed = [block.id for block in blocks]
+        self.commit_kwargs = {'content_settings': content_settings, 'metadata': metadata}
+
+
+def _blob(size: int):
+    return types.SimpleNamespace(name='blob', size=size, content_settings='settings', metadata={'key': 'value'})
+
+
+def _copy(dst_blob_client: StubBlobClient, size: int, block_size: int = BLOCK_SIZE):
+    with ThreadPoolExecutor(4) as executor:
+        copy_in_blocks(SRC_URL, dst_blob_client, _blob(size), block_size, executor, AdaptiveLimiter(4, 4))
+
+
+class CopyInBlocksTest(unittest.TestCase):
+    def test_new_blob(self):
+        dst_blob_client = StubBlobClient()
+        _copy(dst_blob_client, 250)
+        self.assertCountEqual(dst_blob_client.staged, [
+            ('000000000100-000000', 0, 100),
+            ('000000000100-000001', 100, 100),
+            ('000000000100-000002', 200, 50),
+        ])
+        self.assertEqual(dst_blob_client.committed,
+                         ['000000000100-000000', '000000000100-000001', '000000000100-000002'])
+        self.assertEqual(dst_blob_client.commit_kwargs, {'content_settings': 'settings', 'metadata': {'key': 'value'}})
+
+    def test_resume_stages_missing_blocks_only(self):
+        dst_blob_client = StubBlobClient([
+            ('000000000100-000000', 100),
+            # staged incompletely
+            ('000000000100-000001', 60),
+            ('000000000100-000003', 50),
+            # staged by a copy with another block-size
+            ('000000000050-000002', 50),
+        ])
+        _copy(dst_blob_client, 350)
+        self.assertCountEqual(dst_blob_client.staged, [
+            ('000000000100-000001', 100, 100),
+            ('000000000100-000002', 200, 100),
+        ])
+        self.assertEqual(dst_blob_client.committed, [
+            '000000000100-000000', '000000000100-000001', '000000000100-000002', '000000000100-000003'])
+
+    def test_block_size_increased_to_maximum_number_of_blocks(self):
+        dst_blob_client = StubBlobClient()
+        _copy(dst_blob_client, 100001, block_size=1)
+        self.assertEqual(len(dst_blob_client.committed), 33334)
+        self.assertEqual(dst_blob_client.committed[-1], '000000000003-033333')
+        self.assertIn(('000000000003-033333', 99999, 2), dst_blob_client.staged)
+
+
+if __name__ == '__main__':
+    unittest.main()
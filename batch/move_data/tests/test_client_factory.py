@@ -0,0 +1,48 @@
+#  ****************************************************************************
+#  @copyright 2023 e:fs TechHub GmbH (sdk@efs-techhub.com)
+#
+#  @license Apache v2.0
+#  
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  
+#      http://www.apache.org/licenses/LICENSE-2.0
+#  
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+import unittest
+
+from storage.azure.client_factory import MAX_CONTAINER_CLIENTS, ClientFactory
+
+CONTAINER_URL = 'https://account.blob.core.windows.net/container'
+
+
+class ClientFactoryTest(unittest.TestCase):
+    def setUp(self):
+        self.factory = ClientFactory()
+        self.addCleanup(self.factory.close)
+
+    def test_clients_are_cached(self):
+        container_client = self.factory.container_client(CONTAINER_URL, 'sig=a')
+        self.assertIs(self.factory.container_client(CONTAINER_URL, 'sig=a'), container_client)
+        self.assertIsNot(self.factory.container_client(CONTAINER_URL, 'sig=b'), container_client)
+        self.assertEqual(self.factory.blob_client(CONTAINER_URL, 'sig=a', 'dir/blob').blob_name, 'dir/blob')
+
+    def test_renewed_sas_are_evicted(self):
+        current = self.factory.container_client(CONTAINER_URL, 'sig=current')
+        for renewal in range(2 * MAX_CONTAINER_CLIENTS):
+            self.factory.container_client(CONTAINER_URL, f'sig={renewal}')
+            # the least recently used client is evicted first
+            self.factory.container_client(CONTAINER_URL, 'sig=current')
+        self.assertEqual(len(self.factory._container_clients), MAX_CONTAINER_CLIENTS)
+        self.assertIs(self.factory.container_client(CONTAINER_URL, 'sig=current'), current)
+        self.assertNotIn((CONTAINER_URL, 'sig=1'), self.factory._container_clients)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+#  ****************************************************************************
+#  @copyright 2023 e:fs TechHub GmbH (sdk@efs-techhub.com)
+#
+#  @license Apache v2.0
+#  
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  
+#      http://www.apache.org/licenses/LICENSE-2.0
+#  
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+import threading
+import time
+import types
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from storage.azure.adaptive_limiter import AdaptiveLimiter
+from storage.azure.copy_tracker import BACKOFF_FACTOR, CopyFailedError, CopyTracker
+
+
+class StubBlobClient:
+    def __init__(self, statuses: list):
+        """
+        :param statuses: copy-status returned by each poll - the last one is repeated
+        """
+        self._statuses = statuses
+        self.polled_at = []
+        self._lock = threading.Lock()
+
+    def get_blob_properties(self):
+        with self._lock:
+            self.polled_at.append(time.monotonic())
+            status = self._statuses[min(len(self.polled_at), len(self._statuses)) - 1]
+        return types.SimpleNamespace(copy=types.SimpleNamespace(status=status, status_description='boom',
+                                                                progress='1/2'))
+
+
+class CopyTrackerTest(unittest.TestCase):
+    def setUp(self):
+        self.executor = ThreadPoolExecutor(max_workers=4)
+        self.tracker = CopyTracker(self.executor, AdaptiveLimiter(4, 4), initial_delay=0.02, max_delay=0.08)
+        self.addCleanup(self.executor.shutdown)
+        self.addCleanup(self.tracker.close)
+
+    def test_completed_copy_is_not_polled(self):
+        blob_client = StubBlobClient(['success'])
+        self.assertIsNone(self.tracker.track('ds/a', blob_client, 'success').result(timeout=1))
+        self.assertEqual(blob_client.polled_at, [])
+
+    def test_backoff(self):
+        blob_client = StubBlobClient(['pending'] * 5 + ['success'])
+        started_at = time.monotonic()
+        properties = self.tracker.track('ds/a', blob_client, 'pending').result(timeout=5)
+
+        self.assertEqual(properties.copy.status, 'success')
+        self.assertEqual(self.tracker.polls, 6)
+        intervals = [later - earlier for earlier, later in zip([started_at] + blob_client.polled_at,
+                                                               blob_client.polled_at)]
+        # the delay doubles up to max_delay
+        expected = [min(0.02 * BACKOFF_FACTOR ** i, 0.08) for i in range(6)]
+        for interval, delay in zip(intervals, expected):
+            self.assertGreaterEqual(interval, delay * 0.9)
+
+    def test_failed_copy(self):
+        copied = self.tracker.track('ds/a', StubBlobClient(['pending', 'failed']), 'pending')
+        with self.assertRaises(CopyFailedError) as raised:
+            copied.result(timeout=5)
+        self.assertEqual(raised.exception.status, 'failed')
+
+        with self.assertRaises(CopyFailedError):
+            self.tracker.track('ds/b', StubBlobClient([]), 'aborted').result(timeout=1)
+
+    def test_copies_are_polled_independently(self):
+        fast = self.tracker.track('ds/fast', StubBlobClient(['success']), 'pending')
+        slow_client = StubBlobClient(['pending'] * 3 + ['success'])
+        slow = self.tracker.track('ds/slow', slow_client, 'pending')
+
+        fast.result(timeout=5)
+        self.assertFalse(slow.done())
+        slow.result(timeout=5)
+        self.assertEqual(len(slow_client.polled_at), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
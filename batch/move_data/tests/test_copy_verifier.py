@@ -0,0 +1,116 @@
+#  ****************************************************************************
+#  @copyright 2023 e:fs TechHub GmbH (sdk@efs-techhub.com)
+#
+#  @license Apache v2.0
+#  
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  
+#      http://www.apache.org/licenses/LICENSE-2.0
+#  
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+import hashlib
+import types
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from azure.storage.blob import BlobProperties, ContentSettings
+
+from storage.azure.adaptive_limiter import AdaptiveLimiter
+from storage.azure.copy_verifier import VERIFIED_CONTENT, VERIFIED_PROPERTIES, VERIFIED_RANGES, VERIFIED_SIZE, \
+    CopyVerifier
+from storage.move_options import VERIFY_AUTO, VERIFY_CHECKSUM, VERIFY_PROPERTIES
+from storage.storageaccess import VerificationError
+
+
+class StubBlobClient:
+    def __init__(self, data: bytes, content_md5: bytes = None):
+        self.data = data
+        self.content_md5 = content_md5
+        self.downloaded = 0
+
+    def get_blob_properties(self) -> BlobProperties:
+        return _properties('ds/f.bin', self.data, self.content_md5)
+
+    def download_blob(self, offset: int = 0, length: int = None):
+        data = self.data[offset:offset + length]
+        self.downloaded += len(data)
+        return types.SimpleNamespace(readall=lambda: data, chunks=lambda: iter([data[:3], data[3:]]))
+
+
+def _properties(name: str, data: bytes, content_md5: bytes = None) -> BlobProperties:
+    properties = BlobProperties()
+    properties.name = name
+    properties.size = len(data)
+    properties.content_settings = ContentSettings(content_md5=bytearray(content_md5) if content_md5 else None)
+    return properties
+
+
+class CopyVerifierTest(unittest.TestCase):
+    DATA = bytes(range(256)) * 4
+    MD5 = hashlib.md5(DATA).digest()
+    CORRUPT = b'!' + DATA[1:]
+
+    def setUp(self):
+        self.executor = ThreadPoolExecutor(max_workers=4)
+        self.addCleanup(self.executor.shutdown)
+
+    def _verify(self, mode: str, dst_data: bytes, with_md5: bool = True, staged: bool = False,
+                content_threshold: int = 1024) -> tuple:
+        """
+        Verifies a copy of DATA - the destination carries the content-md5 property of the source, as copied by the
+        service
+        :return: the verification-method and the number of bytes downloaded from the destination
+        """
+        md5 = self.MD5 if with_md5 else None
+        blob = _properties('ds/f.bin', self.DATA, md5)
+        dst_blob_client = StubBlobClient(dst_data, md5)
+        verifier = CopyVerifier(mode, self.executor, AdaptiveLimiter(4, 4), range_size=100,
+                                content_threshold=content_threshold)
+        method = verifier.verify(blob, StubBlobClient(self.DATA, md5), dst_blob_client, staged=staged)
+        return method, dst_blob_client.downloaded
+
+    def test_content_of_small_blobs(self):
+        self.assertEqual(self._verify(VERIFY_AUTO, self.DATA), (VERIFIED_CONTENT, len(self.DATA)))
+        with self.assertRaises(VerificationError):
+            self._verify(VERIFY_AUTO, self.CORRUPT)
+
+    def test_properties_of_large_blobs(self):
+        # the content-md5 property is copied from the source - a damaged content is not detected
+        self.assertEqual(self._verify(VERIFY_AUTO, self.CORRUPT, content_threshold=100), (VERIFIED_PROPERTIES, 0))
+        self.assertEqual(self._verify(VERIFY_PROPERTIES, self.CORRUPT), (VERIFIED_PROPERTIES, 0))
+
+    def test_checksum(self):
+        self.assertEqual(self._verify(VERIFY_CHECKSUM, self.DATA, content_threshold=0),
+                         (VERIFIED_CONTENT, len(self.DATA)))
+        with self.assertRaises(VerificationError):
+            self._verify(VERIFY_CHECKSUM, self.CORRUPT, content_threshold=0)
+
+    def test_ranges_without_content_md5(self):
+        self.assertEqual(self._verify(VERIFY_CHECKSUM, self.DATA, with_md5=False), (VERIFIED_RANGES, len(self.DATA)))
+        with self.assertRaises(VerificationError) as raised:
+            self._verify(VERIFY_CHECKSUM, self.CORRUPT, with_md5=False)
+        self.assertIn('bytes 0-99', str(raised.exception))
+
+    def test_size_only_without_content_md5(self):
+        with self.assertLogs('move_data', 'WARNING'):
+            self.assertEqual(self._verify(VERIFY_PROPERTIES, self.DATA, with_md5=False), (VERIFIED_SIZE, 0))
+
+    def test_size_differs(self):
+        with self.assertRaises(VerificationError):
+            self._verify(VERIFY_PROPERTIES, self.DATA[:-1])
+
+    def test_block_copies_are_verified_by_content(self):
+        self.assertEqual(self._verify(VERIFY_PROPERTIES, self.DATA, staged=True), (VERIFIED_CONTENT, len(self.DATA)))
+        with self.assertRaises(VerificationError):
+            self._verify(VERIFY_PROPERTIES, self.CORRUPT, staged=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,175 @@
+#  ****************************************************************************
+#  @copyright 2023 e:fs TechHub GmbH (sdk@efs-techhub.com)
+#
+#  @license Apache v2.0
+#  
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  
+#      http://www.apache.org/licenses/LICENSE-2.0
+#  
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+import datetime
+import hashlib
+import json
+import types
+import unittest
+
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceExistsError, ResourceModifiedError, ResourceNotFoundError
+
+from storage.azure.deduplicator import INDEX_BLOB, MANIFEST_SCHEMA, Deduplicator
+from storage.content_index import ContentIndex
+from storage.move_metrics import MoveMetrics
+
+ROOT_DIR = 'dataset'
+MANIFEST = f'{ROOT_DIR}/.sdk/dedup.json'
+CREATED = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def _properties(name: str, data: bytes):
+    return types.SimpleNamespace(name=name, size=len(data), creation_time=CREATED,
+                                 content_settings=types.SimpleNamespace(content_md5=hashlib.md5(data).digest()))
+
+
+class StubBlobClient:
+    def __init__(self, container_client, name: str):
+        self._container_client = container_client
+        self._name = name
+
+    def get_blob_properties(self):
+        if self._name not in self._container_client.blobs:
+            raise ResourceNotFoundError('blob not found')
+        data, _ = self._container_client.blobs[self._name]
+        return _properties(self._name, data)
+
+
+class StubContainerClient:
+    def __init__(self):
+        self.blobs = {}
+        self._version = 0
+
+    def put(self, name: str, data: bytes):
+        self._version += 1
+        self.blobs[name] = (data, f'etag-{self._version}')
+
+    def download_blob(self, name: str):
+        if name not in self.blobs:
+            raise ResourceNotFoundError('blob not found')
+        data, etag = self.blobs[name]
+        return types.SimpleNamespace(readall=lambda: data, properties=types.SimpleNamespace(etag=etag))
+
+    def upload_blob(self, name: str, data: bytes, overwrite: bool = False, etag: str = None,
+                    match_condition: MatchConditions = None):
+        if not overwrite and name in self.blobs:
+            raise ResourceExistsError('blob exists')
+        if match_condition == MatchConditions.IfNotModified and self.blobs.get(name, (None, None))[1] != etag:
+            raise ResourceModifiedError('blob modified')
+        self.put(name, data)
+
+    def get_blob_client(self, name: str):
+        return StubBlobClient(self, name)
+
+
+class DeduplicatorTest(unittest.TestCase):
+    def setUp(self):
+        self.container_client = StubContainerClient()
+
+    def _deduplicator(self) -> Deduplicator:
+        deduplicator = Deduplicator(self.container_client, self.container_client, ROOT_DIR, MoveMetrics())
+        self.addCleanup(deduplicator.close)
+        return deduplicator
+
+    def _manifest(self) -> dict:
+        data, _ = self.container_client.blobs[MANIFEST]
+        return json.loads(data)
+
+    def _index(self) -> ContentIndex:
+        data, _ = self.container_client.blobs[INDEX_BLOB]
+        return ContentIndex.parse(data)
+
+    def test_duplicate_recorded_as_reference(self):
+        self.container_client.put('other/a', b'content-a')
+        index = ContentIndex()
+        index.add(hashlib.md5(b'content-a').digest(), 9, 'other/a')
+        self.container_client.put(INDEX_BLOB, index.serialize())
+
+        deduplicator = self._deduplicator()
+        self.assertTrue(deduplicator.is_duplicate(_properties(f'{ROOT_DIR}/a', b'content-a')))
+        self.assertFalse(deduplicator.is_duplicate(_properties(f'{ROOT_DIR}/b', b'content-b')))
+        deduplicator.write_manifest()
+        deduplicator.save_index({})
+
+        manifest = self._manifest()
+        self.assertEqual(manifest['schema'], MANIFEST_SCHEMA)
+        self.assertEqual([(reference['name'], reference['target']) for reference in manifest['references']],
+                         [(f'{ROOT_DIR}/a', 'other/a')])
+        self.assertEqual(self._index().lookup(hashlib.md5(b'content-b').digest(), 9), f'{ROOT_DIR}/b')
+
+    def test_removed_target_is_not_a_duplicate(self):
+        index = ContentIndex()
+        index.add(hashlib.md5(b'content-a').digest(), 9, 'other/a')
+        self.container_client.put(INDEX_BLOB, index.serialize())
+
+        deduplicator = self._deduplicator()
+        self.assertFalse(deduplicator.is_duplicate(_properties(f'{ROOT_DIR}/a', b'content-a')))
+        deduplicator.save_index({})
+        self.assertEqual(self._index().lookup(hashlib.md5(b'content-a').digest(), 9), f'{ROOT_DIR}/a')
+
+    def test_failed_blobs_are_not_indexed(self):
+        deduplicator = self._deduplicator()
+        self.assertFalse(deduplicator.is_duplicate(_properties(f'{ROOT_DIR}/a', b'content-a')))
+        deduplicator.save_index({f'{ROOT_DIR}/a': 'copy failed'})
+        self.assertEqual(len(self._index()), 0)
+
+    def test_concurrent_manifests_are_merged(self):
+        self.container_client.put('other/a', b'content-a')
+        self.container_client.put('other/b', b'content-b')
+        index = ContentIndex()
+        index.add(hashlib.md5(b'content-a').digest(), 9, 'other/a')
+        index.add(hashlib.md5(b'content-b').digest(), 9, 'other/b')
+        self.container_client.put(INDEX_BLOB, index.serialize())
+
+        # two shards of the same move load the (missing) manifest before either writes it
+        first = self._deduplicator()
+        second = self._deduplicator()
+        self.assertTrue(first.is_duplicate(_properties(f'{ROOT_DIR}/a', b'content-a')))
+        self.assertTrue(second.is_duplicate(_properties(f'{ROOT_DIR}/b', b'content-b')))
+        first.write_manifest()
+        second.write_manifest()
+
+        self.assertEqual([reference['name'] for reference in self._manifest()['references']],
+                         [f'{ROOT_DIR}/a', f'{ROOT_DIR}/b'])
+
+    def test_concurrent_indexes_are_merged(self):
+        first = self._deduplicator()
+        second = self._deduplicator()
+        self.assertFalse(first.is_duplicate(_properties(f'{ROOT_DIR}/a', b'content-a')))
+        self.assertFalse(second.is_duplicate(_properties(f'{ROOT_DIR}/b', b'content-b')))
+        first.save_index({})
+        # modified again after the second has loaded the index
+        index = self._index()
+        index.add(hashlib.md5(b'content-c').digest(), 9, 'other/c')
+        self.container_client.put(INDEX_BLOB, index.serialize())
+        second.save_index({})
+
+        index = self._index()
+        self.assertEqual(len(index), 3)
+        self.assertEqual(index.lookup(hashlib.md5(b'content-a').digest(), 9), f'{ROOT_DIR}/a')
+        self.assertEqual(index.lookup(hashlib.md5(b'content-b').digest(), 9), f'{ROOT_DIR}/b')
+        self.assertEqual(index.lookup(hashlib.md5(b'content-c').digest(), 9), 'other/c')
+
+    def test_manifest_location_is_reserved(self):
+        self.container_client.put(MANIFEST, json.dumps({'user': 'data'}).encode('utf-8'))
+        with self.assertRaises(ValueError):
+            Deduplicator(self.container_client, self.container_client, ROOT_DIR, MoveMetrics())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,189 @@
+#  ****************************************************************************
+#  @copyright 2023 e:fs TechHub GmbH (sdk@efs-techhub.com)
+#
+#  @license Apache v2.0
+#  
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  
+#      http://www.apache.org/licenses/LICENSE-2.0
+#  
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+import os
+import threading
+import types
+import unittest
+from unittest import mock
+
+from azure.core.exceptions import HttpResponseError, ResourceNotFoundError
+from azure.storage.blob import BlobProperties
+
+from storage.azure import azure_storageaccess
+from storage.move_metrics import MoveMetrics
+from storage.move_options import MODE_AUTO, MODE_RENAME, MoveOptions
+from storage.move_progress import RejectedFiles
+from storage.storageaccess import BlobFilter, MoveError
+
+
+def _blob(name: str, directory: bool = False) -> BlobProperties:
+    blob = BlobProperties()
+    blob.name = name
+    blob.size = 1
+    blob.metadata = {'hdi_isfolder': 'true'} if directory else {}
+    return blob
+
+
+class StubContainerClient:
+    """
+    Container of a storage-account with hierarchical namespace - the Blob Batch API is not available
+    """
+
+    def __init__(self, blobs: dict, failing: set = frozenset()):
+        self.blobs = blobs
+        self.failing = failing
+        self.batches = 0
+        self._lock = threading.Lock()
+
+    def list_blobs(self, name_starts_with: str, include: list = None, results_per_page: int = None):
+        page = [blob for name, blob in sorted(self.blobs.items()) if name.startswith(name_starts_with)]
+        return types.SimpleNamespace(by_page=lambda: iter([page]))
+
+    def delete_blobs(self, *names, raise_on_any_failure=True):
+        with self._lock:
+            self.batches += 1
+        raise HttpResponseError(message='FeatureNotSupportedOnHierarchicalNamespace')
+
+    def delete_blob(self, name: str):
+        if name in self.failing:
+            raise HttpResponseError(message='AuthorizationPermissionMismatch')
+        with self._lock:
+            del self.blobs[name]
+
+
+class StubBlobMover:
+    def __init__(self, *args, **kwargs):
+        self.submitted = []
+        StubBlobMover.instance = self
+
+    def submit(self, blob: BlobProperties, move: bool):
+        self.submitted.append((blob.name, move))
+
+    def join(self):
+        pass
+
+    @property
+    def failures(self) -> dict:
+        return {}
+
+
+class HnsDirectoryTest(unittest.TestCase):
+    def _is_hns_directory(self, get_blob_properties) -> bool:
+        blob_client = types.SimpleNamespace(get_blob_properties=get_blob_properties)
+        with mock.patch.object(azure_storageaccess.BlobClient, 'from_blob_url', return_value=blob_client):
+            return azure_storageaccess._is_hns_directory('org', 'loadingzone', 'ds', 'sas')
+
+    def test_directory(self):
+        self.assertTrue(self._is_hns_directory(lambda: _blob('ds', directory=True)))
+
+    def test_blob(self):
+        self.assertFalse(self._is_hns_directory(lambda: _blob('ds')))
+
+    def test_missing(self):
+        def get_blob_properties():
+            raise ResourceNotFoundError('BlobNotFound')
+
+        self.assertFalse(self._is_hns_directory(get_blob_properties))
+
+
+class DeleteRejectedTest(unittest.TestCase):
+    def setUp(self):
+        self.blobs = {name: _blob(name, directory=name.endswith('raw'))
+                      for name in ['ds/a.csv', 'ds/b.exe', 'ds/raw', 'ds/raw/c.exe', 'ds/raw/d.csv']}
+
+    def _delete_rejected(self, container_client: StubContainerClient) -> MoveMetrics:
+        metrics = MoveMetrics()
+        with mock.patch.object(azure_storageaccess.ContainerClient, 'from_container_url',
+                               return_value=container_client):
+            azure_storageaccess._delete_rejected(container_client, 'org', 'loadingzone', 'ds',
+                                                 BlobFilter(None, '*.csv'), 'sas', 4, metrics,
+                                                 RejectedFiles(None, None, '*.csv'))
+        return metrics
+
+    def test_batches_fall_back_to_single_deletes(self):
+        container_client = StubContainerClient(self.blobs)
+        metrics = self._delete_rejected(container_client)
+
+        # directories are not subject to the filter-criteria
+        self.assertEqual(sorted(self.blobs), ['ds/a.csv', 'ds/raw', 'ds/raw/d.csv'])
+        self.assertEqual(container_client.batches, 1)
+        self.assertEqual(metrics.blobs_rejected._value.get(), 2)
+        self.assertEqual(metrics.blobs_deleted._value.get(), 2)
+
+    def test_failed_delete(self):
+        with self.assertRaises(MoveError) as raised:
+            self._delete_rejected(StubContainerClient(self.blobs, failing={'ds/b.exe'}))
+        self.assertEqual(list(raised.exception.failures), ['ds/b.exe'])
+        self.assertNotIn('ds/raw/c.exe', self.blobs)
+
+
+@mock.patch.dict(os.environ, {'READ_ENDPOINT': 'read', 'UPLOAD_ENDPOINT': 'upload', 'DELETE_ENDPOINT': 'delete'})
+@mock.patch.object(azure_storageaccess, '_get_sas_token', lambda *args: 'sas')
+@mock.patch.object(azure_storageaccess, 'BlobMover', StubBlobMover)
+class RenameFallbackTest(unittest.TestCase):
+    def setUp(self):
+        self.blobs = {name: _blob(name) for name in ['ds/a.csv', 'ds/b.csv']}
+        self.directory_client = mock.Mock()
+        patchers = [
+            mock.patch.object(azure_storageaccess.ContainerClient, 'from_container_url',
+                              return_value=StubContainerClient(self.blobs)),
+            mock.patch.object(azure_storageaccess, '_is_hns_directory', return_value=True),
+            mock.patch.object(azure_storageaccess, 'DataLakeDirectoryClient', return_value=self.directory_client),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        StubBlobMover.instance = None
+
+    def _move(self, mode: str = None) -> MoveMetrics:
+        metrics = MoveMetrics()
+        options = MoveOptions(workers=2) if mode is None else MoveOptions(workers=2, mode=mode)
+        azure_storageaccess.AzureStorageAccess().move_data('token', 'org', 'loadingzone', 'main', 'ds', None, None,
+                                                           options, metrics)
+        return metrics
+
+    def test_copy_by_default(self):
+        self._move()
+
+        azure_storageaccess._is_hns_directory.assert_not_called()
+        self.directory_client.rename_directory.assert_not_called()
+        self.assertEqual(StubBlobMover.instance.submitted, [('ds/a.csv', True), ('ds/b.csv', True)])
+
+    def test_rename(self):
+        metrics = self._move(MODE_AUTO)
+
+        self.directory_client.rename_directory.assert_called_once_with('main/ds?sas')
+        self.assertIsNone(StubBlobMover.instance)
+        self.assertEqual(metrics.directory_renames._value.get(), 1)
+
+    def test_failed_rename_falls_back_to_copy(self):
+        self.directory_client.rename_directory.side_effect = HttpResponseError(message='RenameFailed')
+        metrics = self._move(MODE_AUTO)
+
+        self.assertEqual(StubBlobMover.instance.submitted, [('ds/a.csv', True), ('ds/b.csv', True)])
+        self.assertEqual(metrics.directory_renames._value.get(), 0)
+
+    def test_failed_rename_is_raised_in_rename_mode(self):
+        self.directory_client.rename_directory.side_effect = HttpResponseError(message='RenameFailed')
+        with self.assertRaises(HttpResponseError):
+            self._move(MODE_RENAME)
+        self.assertIsNone(StubBlobMover.instance)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+#  ****************************************************************************
+#  @copyright 2023 e:fs TechHub GmbH (sdk@efs-techhub.com)
+#
+#  @license Apache v2.0
+#  
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  
+#      http://www.apache.org/licenses/LICENSE-2.0
+#  
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+import os
+import tempfile
+import unittest
+
+from storage.move_journal import MoveJournal
+
+
+class MoveJournalTest(unittest.TestCase):
+    def setUp(self):
+        self.journal_dir = tempfile.mkdtemp()
+
+    def _open(self, shard: int = None) -> MoveJournal:
+        return MoveJournal.open(self.journal_dir, 'org', 'loadingzone', 'main', 'ds', shard)
+
+    def test_resume(self):
+        journal = self._open()
+        journal.copied('ds/a')
+        journal.copied('ds/b')
+        journal.deleted('ds/b')
+        journal.close(completed=False)
+
+        journal = self._open()
+        # deleted blobs are not listed anymore
+        self.assertTrue(journal.is_copied('ds/a'))
+        self.assertFalse(journal.is_copied('ds/b'))
+        self.assertFalse(journal.is_copied('ds/c'))
+        journal.close(completed=False)
+
+    def test_incomplete_last_line(self):
+        journal = self._open()
+        journal.copied('ds/a')
+        journal.close(completed=False)
+        path, = [os.path.join(self.journal_dir, name) for name in os.listdir(self.journal_dir)]
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write('["copied", "ds/')
+
+        journal = self._open()
+        self.assertTrue(journal.is_copied('ds/a'))
+        journal.close(completed=False)
+
+    def test_completed_move_removes_journal(self):
+        journal = self._open()
+        journal.copied('ds/a')
+        journal.close(completed=True)
+
+        self.assertEqual(os.listdir(self.journal_dir), [])
+        self.assertFalse(self._open().is_copied('ds/a'))
+
+    def test_shards_have_journals_of_their_own(self):
+        journal = self._open(shard=1)
+        journal.copied('ds/a')
+        journal.close(completed=False)
+
+        self.assertFalse(self._open().is_copied('ds/a'))
+        self.assertFalse(self._open(shard=2).is_copied('ds/a'))
+        self.assertTrue(self._open(shard=1).is_copied('ds/a'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+#  ****************************************************************************
+#  @copyright 2023 e:fs TechHub GmbH (sdk@efs-techhub.com)
+#
+#  @license Apache v2.0
+#  
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  
+#      http://www.apache.org/licenses/LICENSE-2.0
+#  
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+import types
+import unittest
+
+from storage.move_metrics import MoveMetrics
+
+
+def _response(status_code: int):
+    return types.SimpleNamespace(http_response=types.SimpleNamespace(status_code=status_code))
+
+
+class ObserveResponseTest(unittest.TestCase):
+    def test_error_responses_are_counted_per_attempt(self):
+        metrics = MoveMetrics()
+        for status_code in [503, 503, 503, 200, 408, 500, 501, 404]:
+            metrics.observe_response(_response(status_code))
+
+        samples = {sample.labels['status']: sample.value for metric in metrics.request_errors.collect()
+                   for sample in metric.samples if sample.name.endswith('_total')}
+        self.assertEqual(samples, {'503': 3, '408': 1, '500': 1})
+        self.assertEqual(MoveMetrics.total(metrics.request_errors), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+#  ****************************************************************************
+#  @copyright 2023 e:fs TechHub GmbH (sdk@efs-techhub.com)
+#
+#  @license Apache v2.0
+#  
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  
+#      http://www.apache.org/licenses/LICENSE-2.0
+#  
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+import datetime
+import json
+import tempfile
+import unittest
+
+from azure.storage.blob import BlobProperties, BlobType, ContentSettings
+
+from storage.azure.azure_storageaccess import _blob_entry, _blob_from_entry
+from storage.move_plan import MoveShard, plan_shards, read_plan, read_shard, write_plan
+
+
+class PlanShardsTest(unittest.TestCase):
+    BLOBS = [{'name': f'ds/f{i}', 'size': size} for i, size in enumerate([100, 1, 1, 1, 50, 50, 2, 2])]
+
+    def test_balanced_by_bytes(self):
+        shards = plan_shards(self.BLOBS, 2)
+        self.assertEqual(sorted(shard.size for shard in shards), [103, 104])
+        self.assertEqual(sorted(name for shard in shards for name in shard.blob_names),
+                         sorted(blob['name'] for blob in self.BLOBS))
+
+    def test_empty_shards_are_omitted(self):
+        shards = plan_shards(self.BLOBS[:2], 4)
+        self.assertEqual([shard.index for shard in shards], [0, 1])
+
+    def test_shards_contain_listed_blobs(self):
+        blobs = [{'name': 'ds/a', 'size': 1, 'etag': '"a"'}, {'name': 'ds/b', 'size': 2, 'etag': '"b"'}]
+        shard, = plan_shards(blobs, 1)
+        self.assertEqual(shard.blob_names, {'ds/a', 'ds/b'})
+        self.assertCountEqual(shard.blobs, blobs)
+
+    def test_write_and_read(self):
+        with tempfile.TemporaryDirectory() as plan_dir:
+            write_plan(plan_dir, plan_shards(self.BLOBS, 3))
+            shards = read_plan(plan_dir)
+            self.assertEqual(len(shards), 3)
+            self.assertEqual(read_shard(plan_dir, 1).blobs, shards[1].blobs)
+            self.assertEqual(sum(len(shard.blobs) for shard in shards), len(self.BLOBS))
+
+    def test_manifest_without_blobs(self):
+        shard = MoveShard.from_dict({'index': 2, 'size': 3, 'blobNames': ['ds/a', 'ds/b']})
+        self.assertEqual(shard.blob_names, {'ds/a', 'ds/b'})
+        self.assertIsNone(shard.blobs)
+        self.assertTrue(MoveShard(0).whole)
+
+
+class BlobEntryTest(unittest.TestCase):
+    def test_roundtrip(self):
+        blob = BlobProperties()
+        blob.name = 'ds/f.csv'
+        blob.size = 42
+        blob.blob_type = BlobType.BlockBlob
+        blob.last_modified = datetime.datetime(2024, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc)
+        blob.creation_time = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+        blob.metadata = {'k': 'v'}
+        blob.content_settings = ContentSettings(content_type='text/csv', cache_control='no-cache',
+                                                content_md5=bytearray(b'0123456789abcdef'))
+
+        restored = _blob_from_entry(json.loads(json.dumps(_blob_entry(blob))))
+
+        self.assertEqual((restored.name, restored.size, restored.blob_type, restored.metadata),
+                         ('ds/f.csv', 42, BlobType.BlockBlob, {'k': 'v'}))
+        self.assertEqual(restored.last_modified, blob.last_modified)
+        self.assertEqual(restored.creation_time, blob.creation_time)
+        self.assertEqual(restored.content_settings.content_type, 'text/csv')
+        self.assertEqual(restored.content_settings.cache_control, 'no-cache')
+        self.assertEqual(bytes(restored.content_settings.content_md5), b'0123456789abcdef')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,181 @@
+#  ****************************************************************************
+#  @copyright 2023 e:fs TechHub GmbH (sdk@efs-techhub.com)
+#
+#  @license Apache v2.0
+#  
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  
+#      http://www.apache.org/licenses/LICENSE-2.0
+#  
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+import json
+import logging
+import os
+import unittest
+from unittest import mock
+
+try:
+    import boto3  # noqa: F401
+    from moto.server import ThreadedMotoServer
+except ImportError:  # pragma: no cover
+    ThreadedMotoServer = None
+
+from storage.move_metrics import MoveMetrics
+from storage.move_options import MODE_RENAME, VERIFY_CHECKSUM, MoveOptions
+from storage.move_plan import MoveShard, plan_shards
+
+BUCKET = 'sdk'
+MiB = 1024 * 1024
+
+
+def _samples(counter) -> dict:
+    return {sample.labels.get('method'): sample.value for metric in counter.collect() for sample in metric.samples
+            if sample.name.endswith('_total')}
+
+
+@unittest.skipIf(ThreadedMotoServer is None, 'requires boto3 and moto')
+class S3MoveTest(unittest.TestCase):
+    """
+    Moves objects between two spaces of a moto-server - temporary credentials are not requested from accessmanager,
+    but the requested scopes are recorded.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        cls.server = ThreadedMotoServer(ip_address='127.0.0.1', port=0, verbose=False)
+        cls.server.start()
+        host, port = cls.server.get_host_and_port()
+        cls.env = mock.patch.dict(os.environ, {
+            'STORAGE_DOMAIN': f'http://{host}:{port}', 'BUCKET': BUCKET, 'AWS_DEFAULT_REGION': 'us-east-1',
+            'READ_ENDPOINT': 'read', 'UPLOAD_ENDPOINT': 'upload', 'DELETE_ENDPOINT': 'delete'})
+        cls.env.start()
+        from storage.s3 import s3_storageaccess
+        cls.s3 = s3_storageaccess
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.env.stop()
+        cls.server.stop()
+
+    def setUp(self):
+        self.requested = []
+
+        def get_credentials(endpoint, access_token, organization, space):
+            self.requested.append((endpoint, space))
+            return {'AccessKeyId': 'key', 'SecretAccessKey': 'secret', 'SessionToken': 'token'}
+
+        patcher = mock.patch.object(self.s3, '_get_credentials', get_credentials)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.storage = self.s3.S3StorageAccess()
+        self.client = self.storage._client({'AccessKeyId': 'key', 'SecretAccessKey': 'secret'})
+        self.client.create_bucket(Bucket=BUCKET)
+        self.addCleanup(self._clear)
+
+    def _clear(self):
+        for key in self._keys(''):
+            self.client.delete_object(Bucket=BUCKET, Key=key)
+
+    def _put(self, name: str, data: bytes, **kwargs):
+        self.client.put_object(Bucket=BUCKET, Key=f'org/loadingzone/{name}', Body=data, **kwargs)
+
+    def _get(self, name: str) -> dict:
+        return self.client.get_object(Bucket=BUCKET, Key=f'org/main/{name}')
+
+    def _keys(self, prefix: str) -> list:
+        return sorted(item['Key'] for page in self.client.get_paginator('list_objects_v2').paginate(Bucket=BUCKET,
+                                                                                                   Prefix=prefix)
+                      for item in page.get('Contents', []))
+
+    def _move(self, root_dir: str, blacklist: str = None, options: MoveOptions = None, shard: MoveShard = None):
+        metrics = MoveMetrics()
+        self.storage.move_data('token', 'org', 'loadingzone', 'main', root_dir, blacklist, None,
+                               options or MoveOptions(workers=4), metrics, shard)
+        return metrics
+
+    def test_streamed_move(self):
+        for i in range(20):
+            self._put(f'ds/f{i}.csv', f'content {i}'.encode(), ContentType='text/csv', Metadata={'index': str(i)})
+        metrics = self._move('ds', options=MoveOptions(workers=4, window=8))
+
+        self.assertEqual(self._keys('org/loadingzone/'), [])
+        self.assertEqual(self._keys('org/main/'), sorted(f'org/main/ds/f{i}.csv' for i in range(20)))
+        copy = self._get('ds/f7.csv')
+        self.assertEqual(copy['Body'].read(), b'content 7')
+        self.assertEqual(copy['ContentType'], 'text/csv')
+        self.assertEqual(copy['Metadata'], {'index': '7'})
+        self.assertEqual(_samples(metrics.blobs_copied), {'stream': 20})
+        self.assertEqual(_samples(metrics.blobs_verified), {'content': 20})
+        # the source is only read with the read-scope of the source-space
+        self.assertCountEqual(self.requested, [('delete', 'loadingzone'), ('read', 'loadingzone'), ('upload', 'main')])
+
+    def test_window_smaller_than_delete_batch(self):
+        for i in range(30):
+            self._put(f'ds/f{i}.csv', b'x')
+        metrics = self._move('ds', options=MoveOptions(workers=4, window=3))
+
+        self.assertEqual(self._keys('org/loadingzone/'), [])
+        self.assertEqual(metrics.blobs_deleted._value.get(), 30)
+
+    def test_streamed_move_in_parts(self):
+        data = os.urandom(12 * MiB)
+        self._put('ds/big.bin', data, ContentType='application/octet-stream')
+        with mock.patch('storage.s3.object_mover.STREAM_PART_SIZE', 5 * MiB), \
+                mock.patch('storage.s3.streamed_copy.STREAM_PART_SIZE', 5 * MiB):
+            metrics = self._move('ds')
+
+        copy = self._get('ds/big.bin')
+        self.assertEqual(copy['Body'].read(), data)
+        self.assertEqual(copy['ContentType'], 'application/octet-stream')
+        self.assertTrue(copy['ETag'].endswith('-3"'))
+        self.assertEqual(_samples(metrics.blobs_verified), {'size': 1})
+        self.assertEqual(self._keys('org/loadingzone/'), [])
+
+    def test_filter(self):
+        self._put('ds/ok.txt', b'ok')
+        self._put('ds/bad.exe', b'bad')
+        metrics = self._move('ds', blacklist='*.exe')
+
+        self.assertEqual(self._keys('org/main/'), ['org/main/ds/ok.txt'])
+        self.assertEqual(self._keys('org/loadingzone/'), [])
+        self.assertEqual(metrics.blobs_rejected._value.get(), 1)
+
+    def test_shard(self):
+        self._put('ds/a', b'a')
+        self._put('ds/b', b'b')
+        self._move('ds', shard=MoveShard(0, ['ds/a']))
+
+        self.assertEqual(self._keys('org/main/'), ['org/main/ds/a'])
+        self.assertEqual(self._keys('org/loadingzone/'), ['org/loadingzone/ds/b'])
+
+    def test_planned_shards(self):
+        for i in range(10):
+            self._put(f'ds/f{i}.csv', b'x' * i)
+        shards = [MoveShard.from_dict(json.loads(json.dumps(shard.to_dict())))
+                  for shard in plan_shards(self.storage.list_entries('token', 'org', 'loadingzone', 'ds'), 3)]
+        # shards move the objects as planned - without listing the root-directory again
+        with mock.patch.object(self.s3, '_iter_objects', side_effect=AssertionError('listed')):
+            for shard in shards:
+                self._move('ds', shard=shard)
+
+        self.assertEqual(self._keys('org/loadingzone/'), [])
+        self.assertEqual(len(self._keys('org/main/ds/')), 10)
+
+    def test_unsupported_options(self):
+        for options in [MoveOptions(mode=MODE_RENAME), MoveOptions(incremental=True), MoveOptions(dedup=True),
+                        MoveOptions(verify=VERIFY_CHECKSUM)]:
+            with self.assertRaises(ValueError):
+                self._move('ds', options=options)
+        self.assertEqual(self.requested, [])
+
+
+if __name__ == '__main__':
+    unittest.main()